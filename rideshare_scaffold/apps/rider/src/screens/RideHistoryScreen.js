@@ -14,16 +14,19 @@ const RideHistoryScreen = ({ navigation }) => {
   const [rides, setRides] = useState([]);
   const [loading, setLoading] = useState(false);
   const [refreshing, setRefreshing] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     loadRides();
   }, []);
 
-  const loadRides = async () => {
+  const loadRides = async (cursor = null) => {
     setLoading(true);
     try {
-      const response = await ridesAPI.getRides();
-      setRides(response.data);
+      const response = await ridesAPI.getRides(cursor);
+      const { items, next_cursor } = response.data;
+      setRides(cursor ? (previous) => [...previous, ...items] : items);
+      setNextCursor(next_cursor);
     } catch (error) {
       Alert.alert('Error', 'Could not load ride history');
     } finally {
@@ -31,6 +34,12 @@ const RideHistoryScreen = ({ navigation }) => {
     }
   };
 
+  const loadMore = () => {
+    if (nextCursor && !loading) {
+      loadRides(nextCursor);
+    }
+  };
+
   const onRefresh = async () => {
     setRefreshing(true);
     await loadRides();
@@ -111,6 +120,8 @@ const RideHistoryScreen = ({ navigation }) => {
         refreshControl={
           <RefreshControl refreshing={refreshing} onRefresh={onRefresh} />
         }
+        onEndReached={loadMore}
+        onEndReachedThreshold={0.5}
         contentContainerStyle={styles.listContainer}
       />
     </View>
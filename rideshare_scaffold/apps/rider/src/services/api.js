@@ -60,7 +60,8 @@ export const ridesAPI = {
   requestRide: (rideRequest) => 
     api.post('/rides/request', rideRequest),
   
-  getRides: () => api.get('/rides'),
+  // Newest first; pass the previous page's next_cursor to continue
+  getRides: (cursor) => api.get('/rides', { params: cursor ? { cursor } : {} }),
   
   getRide: (rideId) => api.get(`/rides/${rideId}`),
   
@@ -75,7 +76,7 @@ export const tipsAPI = {
   createTip: (tipRequest) => 
     api.post('/tips', tipRequest),
   
-  getTips: () => api.get('/tips'),
+  getTips: (cursor) => api.get('/tips', { params: cursor ? { cursor } : {} }),
   
   getTip: (tipId) => api.get(`/tips/${tipId}`),
 };
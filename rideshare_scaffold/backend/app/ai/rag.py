@@ -1,29 +1,45 @@
 import os
-import markdown
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any
 from pathlib import Path
-import openai
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.vectorstores import PGVector
-from langchain.llms import OpenAI
-from langchain.chains import RetrievalQA
-from langchain.chat_models import ChatOpenAI
-from langchain.schema import Document
 from sqlalchemy import create_engine, text
 from ..config import settings
 
-# Initialize OpenAI
-openai.api_key = os.getenv("OPENAI_API_KEY")
+if TYPE_CHECKING:
+    from langchain.chains import RetrievalQA
 
 class RAGService:
+    """Support answers over the embedded docs.
+
+    The langchain stack and the OpenAI client are imported, and the
+    embeddings built, on first use rather than at import, so workers that
+    never serve /ai pay nothing for them.
+    """
+
     def __init__(self):
-        self.embeddings = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=512,
-            chunk_overlap=50,
-            separators=["\n\n", "\n", " ", ""]
-        )
+        self._embeddings = None
+        self._text_splitter = None
+    
+    @property
+    def embeddings(self):
+        """OpenAI embeddings, built on first use"""
+        if self._embeddings is None:
+            import openai
+            from langchain.embeddings import OpenAIEmbeddings
+            openai.api_key = os.getenv("OPENAI_API_KEY")
+            self._embeddings = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
+        return self._embeddings
+    
+    @property
+    def text_splitter(self):
+        """Markdown chunker, built on first use"""
+        if self._text_splitter is None:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+            self._text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=512,
+                chunk_overlap=50,
+                separators=["\n\n", "\n", " ", ""]
+            )
+        return self._text_splitter
         
     def embed_docs(self, docs_path: str, collection_name: str) -> bool:
         """
@@ -37,6 +53,10 @@ class RAGService:
             bool: Success status
         """
         try:
+            import markdown
+            from langchain.schema import Document
+            from langchain.vectorstores import PGVector
+            
             # Create vector store connection
             connection_string = f"postgresql+psycopg2://{settings.DATABASE_URL.split('://')[1]}"
             vectorstore = PGVector(
@@ -100,7 +120,7 @@ class RAGService:
             print(f"Error embedding documents: {str(e)}")
             return False
     
-    def build_support_qa(self, collection_name: str = "support_docs") -> RetrievalQA:
+    def build_support_qa(self, collection_name: str = "support_docs") -> "RetrievalQA":
         """
         Build a RetrievalQA chain for support queries
         
@@ -111,6 +131,10 @@ class RAGService:
             RetrievalQA: Configured QA chain
         """
         try:
+            from langchain.chains import RetrievalQA
+            from langchain.chat_models import ChatOpenAI
+            from langchain.vectorstores import PGVector
+            
             # Create vector store connection
             connection_string = f"postgresql+psycopg2://{settings.DATABASE_URL.split('://')[1]}"
             vectorstore = PGVector(
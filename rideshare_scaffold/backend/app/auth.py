@@ -1,14 +1,17 @@
+import hmac
 import jwt
 import random
 import string
 from datetime import datetime, timedelta
-from typing import Optional
-from fastapi import HTTPException, status, Depends
+from typing import AsyncIterator, Optional
+from fastapi import HTTPException, status, Depends, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from .database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import AsyncSessionLocal, ReplicaSessionLocal, get_async_db
 from .models import User
 from .config import settings
+from .principal_cache import Principal, principal_cache
+from .write_pins import write_pins
 
 security = HTTPBearer()
 
@@ -43,20 +46,19 @@ def verify_token(token: str) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> User:
-    """Get current authenticated user"""
-    token = credentials.credentials
-    payload = verify_token(token)
-    user_id: int = payload.get("sub")
+async def _user_from_payload(payload: dict, db: AsyncSession) -> User:
+    """Load the user a verified token was issued to"""
+    user_id: Optional[str] = payload.get("sub")
     
-    if user_id is None:
+    # asyncpg will not coerce a string parameter to an integer column
+    if user_id is None or not str(user_id).isdigit():
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, int(user_id))
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -66,6 +68,67 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     
     return user
 
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db)) -> User:
+    """Get current authenticated user"""
+    payload = verify_token(credentials.credentials)
+    user = await _user_from_payload(payload, db)
+    db.info["user_id"] = user.id
+    return user
+
+async def get_current_principal(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db)) -> Principal:
+    """Get the current user's id and role, from the principal cache when the token was seen recently
+
+    The session is only used on a miss, so a hit neither decodes the JWT nor
+    checks out a connection. Routes that need the full User row (email,
+    phone) keep depending on get_current_user.
+    """
+    token = credentials.credentials
+    principal = principal_cache.get(token)
+    if principal is None:
+        payload = verify_token(token)
+        principal = Principal.from_user(await _user_from_payload(payload, db))
+        principal_cache.put(token, principal, payload.get("exp"))
+    
+    # Lets a commit on this session pin the caller to the primary
+    db.info["user_id"] = principal.id
+    return principal
+
+async def get_read_db(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
+) -> AsyncIterator[AsyncSession]:
+    """Session for read-only endpoints: the replica, unless the caller wrote within READ_YOUR_WRITES_SECONDS
+
+    Without a replica, or while pinned, this is the request's primary session
+    so the request still uses a single connection.
+    """
+    if ReplicaSessionLocal is AsyncSessionLocal:
+        write_pins.record_read(replica=False)
+        yield db
+        return
+    if await write_pins.is_pinned(current_user.id):
+        write_pins.record_read(replica=False, pinned=True)
+        yield db
+        return
+    
+    write_pins.record_read(replica=True)
+    async with ReplicaSessionLocal() as replica:
+        yield replica
+
+def verify_ops_key(key: Optional[str]) -> bool:
+    """Check an ops dashboard key; ops access is off while OPS_API_KEY is unset"""
+    if not settings.OPS_API_KEY or not key:
+        return False
+    return hmac.compare_digest(key, settings.OPS_API_KEY)
+
+def require_ops_key(x_ops_key: Optional[str] = Header(default=None)) -> None:
+    """Dependency guarding ops endpoints with the X-Ops-Key header"""
+    if not verify_ops_key(x_ops_key):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid ops key"
+        )
+
 def send_magic_link(email: str, phone: str, role: str) -> str:
     """Send magic link and return verification code"""
     code = generate_verification_code()
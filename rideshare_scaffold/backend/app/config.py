@@ -6,11 +6,24 @@ load_dotenv()
 class Settings:
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "postgresql://mahdinzahere@localhost:5432/rideshare")
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")  # Derived from DATABASE_URL when empty
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))  # Per engine, per worker
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))  # -1 disables
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    DB_POOL_SLOW_CHECKOUT_MS: float = float(os.getenv("DB_POOL_SLOW_CHECKOUT_MS", "10"))
+    DATABASE_REPLICA_URL: str = os.getenv("DATABASE_REPLICA_URL", "")  # Empty sends every read to the primary
+    READ_YOUR_WRITES_SECONDS: float = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))  # Primary-only reads after a user's write
+    SCHEMA_REVISION_CHECK: str = os.getenv("SCHEMA_REVISION_CHECK", "error")  # error, warn or off; run `alembic upgrade head` to migrate
+    SCHEMA_CHECK_TIMEOUT_SECONDS: float = float(os.getenv("SCHEMA_CHECK_TIMEOUT_SECONDS", "30"))  # How long startup waits for the database
     
     # JWT
     JWT_SECRET: str = os.getenv("JWT_SECRET", "your-secret-key")
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "50000"))
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))  # Never past the token's exp
     
     # Stripe
     STRIPE_SECRET_KEY: str = os.getenv("STRIPE_SECRET_KEY", "")
@@ -23,9 +36,67 @@ class Settings:
     # Ride Pricing
     BASE_FARE: float = 2.50
     PER_MILE_RATE: float = 1.75
+    QUOTE_BATCH_MAX_SIZE: int = int(os.getenv("QUOTE_BATCH_MAX_SIZE", "10000"))
+    QUOTE_CACHE_MAX_ENTRIES: int = int(os.getenv("QUOTE_CACHE_MAX_ENTRIES", "10000"))
+    QUOTE_CACHE_TTL_SECONDS: float = float(os.getenv("QUOTE_CACHE_TTL_SECONDS", "60"))
+    QUOTE_CACHE_CELL_DEG: float = float(os.getenv("QUOTE_CACHE_CELL_DEG", "0.001"))
+    
+    # Ride and tip history pages
+    HISTORY_PAGE_SIZE: int = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+    HISTORY_MAX_PAGE_SIZE: int = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "200"))
+    EXPORT_CHUNK_SIZE: int = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))  # Rows per server-side cursor fetch
+    EARNINGS_MAX_DAYS: int = int(os.getenv("EARNINGS_MAX_DAYS", "366"))  # Longest window GET /drivers/earnings accepts
     
     # Socket.IO
     SOCKET_CORS_ORIGINS: str = "*"
+    # Empty runs a single worker; "memory://" is an in-process stand-in; otherwise a Redis URL
+    REDIS_URL: str = os.getenv("REDIS_URL", "")
+    SOCKETIO_CHANNEL: str = os.getenv("SOCKETIO_CHANNEL", "valey-socketio")
+    # Redis driver and sid entries expire this long after their worker's last heartbeat
+    PRESENCE_TTL_SECONDS: int = int(os.getenv("PRESENCE_TTL_SECONDS", "90"))
+
+    # Dispatch
+    DISPATCH_MAX_DRIVERS: int = int(os.getenv("DISPATCH_MAX_DRIVERS", "10"))
+    DISPATCH_RADIUS_MILES: float = float(os.getenv("DISPATCH_RADIUS_MILES", "5.0"))
+    DISPATCH_CELL_DEG: float = float(os.getenv("DISPATCH_CELL_DEG", "0.01"))
+    MATCHING_WINDOW_SECONDS: float = float(os.getenv("MATCHING_WINDOW_SECONDS", "0"))
+    MATCHING_CANDIDATES_PER_RIDE: int = int(os.getenv("MATCHING_CANDIDATES_PER_RIDE", "5"))
+
+    # Ops dashboard
+    OPS_API_KEY: str = os.getenv("OPS_API_KEY", "")
+    OPS_HEATMAP_PUSH_SECONDS: float = float(os.getenv("OPS_HEATMAP_PUSH_SECONDS", "2"))
+
+    # Surge pricing
+    SURGE_CELL_DEG: float = float(os.getenv("SURGE_CELL_DEG", "0.01"))
+    SURGE_INTERVAL_SECONDS: float = float(os.getenv("SURGE_INTERVAL_SECONDS", "10"))
+    SURGE_SMOOTHING: float = float(os.getenv("SURGE_SMOOTHING", "0.3"))
+    SURGE_SENSITIVITY: float = float(os.getenv("SURGE_SENSITIVITY", "0.5"))
+    SURGE_MAX_MULTIPLIER: float = float(os.getenv("SURGE_MAX_MULTIPLIER", "3.0"))
+    SURGE_DEMAND_WINDOW_SECONDS: float = float(os.getenv("SURGE_DEMAND_WINDOW_SECONDS", "1800"))  # Older REQUESTED rides are not recounted at startup
+
+    # Learned ETA table (bounds are min_lat,min_lng,max_lat,max_lng)
+    ETA_TABLE_PATH: str = os.getenv("ETA_TABLE_PATH", "data/eta_table.npz")
+    ETA_RELOAD_SECONDS: float = float(os.getenv("ETA_RELOAD_SECONDS", "300"))
+    ETA_BOUNDS: str = os.getenv("ETA_BOUNDS", "37.70,-122.55,38.00,-122.13")
+    ETA_CELL_DEG: float = float(os.getenv("ETA_CELL_DEG", "0.03"))
+    ETA_MIN_SAMPLES: int = int(os.getenv("ETA_MIN_SAMPLES", "5"))
+    ETA_TIMEZONE: str = os.getenv("ETA_TIMEZONE", "America/Los_Angeles")
+    ETA_REBUILD_CHUNK_SIZE: int = int(os.getenv("ETA_REBUILD_CHUNK_SIZE", "50000"))
+
+    # Driver location write-behind
+    LOCATION_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("LOCATION_FLUSH_INTERVAL_SECONDS", "5"))
+    LOCATION_MAX_STALENESS_SECONDS: float = float(os.getenv("LOCATION_MAX_STALENESS_SECONDS", "10"))
+    LOCATION_FLUSH_CHUNK_SIZE: int = int(os.getenv("LOCATION_FLUSH_CHUNK_SIZE", "1000"))
+
+    # Ride archiving (finished rides older than the cutoff move to rides_archive)
+    RIDE_ARCHIVE_AFTER_DAYS: int = int(os.getenv("RIDE_ARCHIVE_AFTER_DAYS", "30"))  # 0 disables the archiver
+    RIDE_ARCHIVE_BATCH_SIZE: int = int(os.getenv("RIDE_ARCHIVE_BATCH_SIZE", "1000"))
+    RIDE_ARCHIVE_INTERVAL_SECONDS: float = float(os.getenv("RIDE_ARCHIVE_INTERVAL_SECONDS", "300"))
+    RIDE_ARCHIVE_BATCH_PAUSE_SECONDS: float = float(os.getenv("RIDE_ARCHIVE_BATCH_PAUSE_SECONDS", "0.05"))
+
+    # Driver location fan-out to riders
+    LOCATION_FANOUT_HZ: float = float(os.getenv("LOCATION_FANOUT_HZ", "1.0"))
+    LOCATION_FANOUT_MIN_MOVE_METERS: float = float(os.getenv("LOCATION_FANOUT_MIN_MOVE_METERS", "5"))
     
     # Twilio
     TWILIO_ACCOUNT_SID: str = os.getenv("TWILIO_ACCOUNT_SID", "")
@@ -1,11 +1,90 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from .config import settings
+from .db_pool import instrument, pool_options
+from .write_pins import write_pins
 
-engine = create_engine(settings.DATABASE_URL)
+# Async drivers for the sync DATABASE_URL dialects we support
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite"
+}
+
+def async_database_url(url: str) -> str:
+    """Swap a sync database URL onto the matching async driver"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        return url
+    return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+# Sync engine for background jobs that run in executor threads (location flush, ETA rebuild)
+engine = create_engine(settings.DATABASE_URL, **pool_options(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+class WriteTrackingSession(Session):
+    """Session that notes whether its current transaction wrote anything"""
+
+@event.listens_for(WriteTrackingSession, "after_flush")
+def _flushed(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(WriteTrackingSession, "do_orm_execute")
+def _executed(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(WriteTrackingSession, "after_rollback")
+def _rolled_back(session):
+    session.info.pop("wrote", None)
+    session.info.pop("pin_user_ids", None)
+
+class PrimaryAsyncSession(AsyncSession):
+    """Request session on the primary; a commit that wrote pins the caller to the primary
+
+    The pin is set before commit() returns, so it is in place before the
+    response that reports the write leaves the server. The caller's id is put
+    in `info["user_id"]` by the auth dependencies; code that writes on other
+    users' behalf adds them to `info["pin_user_ids"]`.
+    """
+
+    sync_session_class = WriteTrackingSession
+
+    async def commit(self) -> None:
+        # Pending objects are flushed inside commit, so read the flags afterwards
+        await super().commit()
+        wrote = self.info.pop("wrote", False)
+        user_ids = self.info.pop("pin_user_ids", set())
+        if self.info.get("user_id") is not None:
+            user_ids.add(self.info["user_id"])
+        if wrote and settings.DATABASE_REPLICA_URL:
+            for user_id in user_ids:
+                await write_pins.pin(user_id)
+
+# Async engine for request handlers, so a query never blocks the event loop
+ASYNC_URL = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(ASYNC_URL, **pool_options(ASYNC_URL, asyncio=True))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=PrimaryAsyncSession, autoflush=False, expire_on_commit=False)
+
+# Optional read replica for read-only endpoints; without one, reads share the primary
+replica_engine = None
+ReplicaSessionLocal = AsyncSessionLocal
+if settings.DATABASE_REPLICA_URL:
+    REPLICA_URL = async_database_url(settings.DATABASE_REPLICA_URL)
+    replica_engine = create_async_engine(REPLICA_URL, **pool_options(REPLICA_URL, asyncio=True))
+    ReplicaSessionLocal = async_sessionmaker(replica_engine, autoflush=False, expire_on_commit=False)
+
+# Pool checkout and occupancy counters, reported on /metrics
+pool_stats = {
+    "sync": instrument(engine, "sync"),
+    "async": instrument(async_engine.sync_engine, "async")
+}
+if replica_engine is not None:
+    pool_stats["replica"] = instrument(replica_engine.sync_engine, "replica")
+
 Base = declarative_base()
 
 def get_db():
@@ -14,3 +93,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
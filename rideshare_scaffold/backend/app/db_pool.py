@@ -0,0 +1,126 @@
+import time
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+from .config import settings
+
+class PoolStats:
+    """Checkout wait, in-use and overflow counters for one engine's pool.
+
+    Waits are timed around the pool's own checkout, so they cover queueing for
+    a free connection plus opening a new one, but not the pre-ping. Counters
+    are updated without a lock; they are for sizing pools, not billing.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool: Optional[Pool] = None
+
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.slow_checkouts = 0
+        self.timeouts = 0
+        self.peak_in_use = 0
+        self.connects = 0
+        self.overflow_connects = 0
+        self.invalidations = 0
+
+    def record_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+        if seconds * 1000 >= settings.DB_POOL_SLOW_CHECKOUT_MS:
+            self.slow_checkouts += 1
+
+    def on_connect(self, dbapi_connection, connection_record) -> None:
+        self.connects += 1
+        if isinstance(self.pool, QueuePool) and self.pool.overflow() > 0:
+            self.overflow_connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        if isinstance(self.pool, QueuePool):
+            self.peak_in_use = max(self.peak_in_use, self.pool.checkedout())
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        self.invalidations += 1
+
+    def metrics(self) -> Dict:
+        """Current pool occupancy and checkout latency since startup"""
+        pool = self.pool
+        sized = isinstance(pool, QueuePool)
+        return {
+            "pool": type(pool).__name__ if pool is not None else None,
+            "size": pool.size() if sized else None,
+            "max_overflow": pool._max_overflow if sized else None,
+            "in_use": pool.checkedout() if sized else None,
+            "idle": pool.checkedin() if sized else None,
+            "overflow_in_use": max(pool.overflow(), 0) if sized else None,
+            "peak_in_use": self.peak_in_use,
+            "checkouts": self.checkouts,
+            "avg_wait_ms": round(self.wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            "slow_checkouts": self.slow_checkouts,
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "overflow_connects": self.overflow_connects,
+            "invalidations": self.invalidations
+        }
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times every checkout; there is no pool event before a checkout starts"""
+
+    stats: Optional[PoolStats] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            if self.stats is not None:
+                self.stats.timeouts += 1
+            raise
+        if self.stats is not None:
+            self.stats.record_wait(time.perf_counter() - started)
+        return record
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep reporting into the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        if self.stats is not None:
+            self.stats.pool = pool
+        return pool
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    pass
+
+def pool_options(url: str, asyncio: bool = False) -> Dict:
+    """create_engine keyword arguments for the configured pool
+
+    SQLite keeps SQLAlchemy's default pool (single-connection or thread-local
+    for :memory:), which does not take sizing arguments.
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if asyncio else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING
+    }
+
+def instrument(engine: Engine, name: str) -> PoolStats:
+    """Attach checkout timing and pool event hooks to a sync engine (or an async engine's sync_engine)"""
+    stats = PoolStats(name)
+    stats.pool = engine.pool
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.stats = stats
+    event.listen(engine, "connect", stats.on_connect)
+    event.listen(engine, "checkout", stats.on_checkout)
+    event.listen(engine, "invalidate", stats.on_invalidate)
+    return stats
@@ -0,0 +1,93 @@
+import heapq
+import math
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from .config import settings
+from .geo import Cell, cell_for, cell_size_miles, haversine_miles
+
+class DriverIndex:
+    """Grid index of online driver positions for nearest-K dispatch lookups.
+
+    Drivers are bucketed into square lat/lng cells. A lookup walks rings of
+    cells outward from the pickup cell and stops as soon as the K closest
+    candidates are provably found or the search radius is exhausted, so the
+    cost depends on local driver density rather than on total drivers online.
+    """
+
+    def __init__(self, cell_deg: Optional[float] = None):
+        self.cell_deg = cell_deg or settings.DISPATCH_CELL_DEG
+        self._positions: Dict[int, Tuple[float, float, Cell]] = {}
+        self._cells: Dict[Cell, Set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, driver_id: int) -> bool:
+        return driver_id in self._positions
+
+    def upsert(self, driver_id: int, latitude: float, longitude: float) -> None:
+        """Insert a driver or move them to a new position"""
+        cell = cell_for(latitude, longitude, self.cell_deg)
+        previous = self._positions.get(driver_id)
+        if previous is not None and previous[2] != cell:
+            self._discard_from_cell(driver_id, previous[2])
+        self._cells[cell].add(driver_id)
+        self._positions[driver_id] = (latitude, longitude, cell)
+
+    def remove(self, driver_id: int) -> None:
+        """Remove a driver from the index if present"""
+        previous = self._positions.pop(driver_id, None)
+        if previous is not None:
+            self._discard_from_cell(driver_id, previous[2])
+
+    def position(self, driver_id: int) -> Optional[Tuple[float, float]]:
+        """Get a driver's last indexed position"""
+        entry = self._positions.get(driver_id)
+        if entry is None:
+            return None
+        return entry[0], entry[1]
+
+    def nearest(self, latitude: float, longitude: float, k: int, radius_miles: float) -> List[Tuple[float, int]]:
+        """Return up to k (distance_miles, driver_id) pairs within radius, closest first"""
+        if k <= 0 or not self._positions:
+            return []
+
+        ring_miles = cell_size_miles(latitude, self.cell_deg)
+        max_ring = int(math.ceil(radius_miles / ring_miles))
+        center = cell_for(latitude, longitude, self.cell_deg)
+        candidates: List[Tuple[float, int]] = []
+
+        for ring in range(max_ring + 1):
+            for cell in _ring_cells(center, ring):
+                for driver_id in self._cells.get(cell, ()):
+                    driver_lat, driver_lng, _ = self._positions[driver_id]
+                    distance = haversine_miles(latitude, longitude, driver_lat, driver_lng)
+                    if distance <= radius_miles:
+                        candidates.append((distance, driver_id))
+
+            # Everything within ring * ring_miles has been visited by now
+            if len(candidates) >= k and heapq.nsmallest(k, candidates)[-1][0] <= ring * ring_miles:
+                break
+
+        return heapq.nsmallest(k, candidates)
+
+    def _discard_from_cell(self, driver_id: int, cell: Cell) -> None:
+        members = self._cells.get(cell)
+        if members is None:
+            return
+        members.discard(driver_id)
+        if not members:
+            del self._cells[cell]
+
+def _ring_cells(center: Cell, ring: int) -> Iterator[Cell]:
+    """Yield the cells on the square ring at Chebyshev distance `ring` from center"""
+    ci, cj = center
+    if ring == 0:
+        yield center
+        return
+    for dj in range(-ring, ring + 1):
+        yield (ci - ring, cj + dj)
+        yield (ci + ring, cj + dj)
+    for di in range(-ring + 1, ring):
+        yield (ci + di, cj - ring)
+        yield (ci + di, cj + ring)
@@ -0,0 +1,128 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import DriverDailyStats, DriverProfile, Ride, Tip
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert
+}
+
+def _utc(moment: Optional[datetime]) -> datetime:
+    """Aware UTC datetime; naive values (datetime.utcnow(), SQLite reads) are taken as UTC"""
+    if moment is None:
+        return datetime.now(timezone.utc)
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+def _split_by_day(start: datetime, end: datetime):
+    """Yield (day, seconds) for the part of [start, end) that falls on each UTC day"""
+    while start < end:
+        midnight = datetime.combine(start.date() + timedelta(days=1), time.min, tzinfo=timezone.utc)
+        until = min(end, midnight)
+        yield start.date(), int((until - start).total_seconds())
+        start = until
+
+async def _add_to_day(db: AsyncSession, driver_id: int, day: date, **deltas) -> None:
+    """Add `deltas` to one driver-day rollup row, creating it if needed, in a single statement"""
+    insert = UPSERT_INSERTS[db.get_bind().dialect.name]
+    row = {"rides": 0, "fare_total": 0.0, "tip_total": 0.0, "online_seconds": 0, **deltas}
+    stmt = insert(DriverDailyStats).values(driver_id=driver_id, day=day, **row)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DriverDailyStats.driver_id, DriverDailyStats.day],
+        set_={column: getattr(DriverDailyStats, column) + getattr(stmt.excluded, column) for column in deltas}
+    )
+    await db.execute(stmt)
+
+async def _add_to_profile(db: AsyncSession, driver_id: int, rides: int, earnings: float) -> None:
+    await db.execute(
+        update(DriverProfile)
+        .where(DriverProfile.user_id == driver_id)
+        .values(
+            total_rides=func.coalesce(DriverProfile.total_rides, 0) + rides,
+            total_earnings=func.coalesce(DriverProfile.total_earnings, 0.0) + earnings
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+async def record_ride_completed(db: AsyncSession, ride: Ride) -> None:
+    """Count a completed ride toward its driver's totals and daily rollup; the caller commits
+
+    Call in the same transaction as the transition to COMPLETED, which only
+    one request can win, so a ride is never counted twice.
+    """
+    if ride.driver_id is None:
+        return
+    fare = ride.fare or 0.0
+    await _add_to_profile(db, ride.driver_id, 1, fare)
+    await _add_to_day(db, ride.driver_id, _utc(ride.completed_at).date(), rides=1, fare_total=fare)
+
+async def record_tip(db: AsyncSession, tip: Tip) -> None:
+    """Count a new tip toward its driver's earnings and daily rollup; the caller commits"""
+    if tip.to_user_id is None:
+        return
+    await _add_to_profile(db, tip.to_user_id, 0, tip.amount)
+    await _add_to_day(db, tip.to_user_id, _utc(tip.created_at).date(), tip_total=tip.amount)
+
+async def record_online_session(db: AsyncSession, driver_id: int, since: datetime, until: Optional[datetime] = None) -> None:
+    """Add an online session to the daily rollups, split at UTC midnight; the caller commits"""
+    for day, seconds in _split_by_day(_utc(since), _utc(until)):
+        await _add_to_day(db, driver_id, day, online_seconds=seconds)
+
+async def driver_earnings(db: AsyncSession, driver_id: int, days: int) -> Optional[Dict]:
+    """Lifetime totals and the last `days` UTC days of rollups for a driver
+
+    Reads the profile row and at most `days` rollup rows, however many rides
+    the driver has. The only live part is the current online session, which
+    is not in the rollups until the driver goes offline.
+    """
+    today = datetime.now(timezone.utc).date()
+    first_day = today - timedelta(days=days - 1)
+
+    profile = (await db.execute(
+        select(DriverProfile.total_rides, DriverProfile.total_earnings, DriverProfile.rating, DriverProfile.online_since)
+        .where(DriverProfile.user_id == driver_id)
+    )).first()
+    if profile is None:
+        return None
+
+    rollups = (await db.scalars(
+        select(DriverDailyStats)
+        .where(DriverDailyStats.driver_id == driver_id, DriverDailyStats.day >= first_day)
+    )).all()
+
+    by_day = {
+        row.day: {"rides": row.rides, "fare_total": row.fare_total, "tip_total": row.tip_total, "online_seconds": row.online_seconds}
+        for row in rollups
+    }
+    if profile.online_since is not None:
+        for day, seconds in _split_by_day(_utc(profile.online_since), datetime.now(timezone.utc)):
+            if day >= first_day:
+                entry = by_day.setdefault(day, {"rides": 0, "fare_total": 0.0, "tip_total": 0.0, "online_seconds": 0})
+                entry["online_seconds"] += seconds
+
+    day_rows = [
+        {
+            "day": day,
+            "rides": entry["rides"],
+            "fare_total": round(entry["fare_total"], 2),
+            "tip_total": round(entry["tip_total"], 2),
+            "earnings": round(entry["fare_total"] + entry["tip_total"], 2),
+            "online_minutes": round(entry["online_seconds"] / 60, 1)
+        }
+        for day, entry in sorted(by_day.items(), reverse=True)
+    ]
+    return {
+        "total_rides": profile.total_rides or 0,
+        "total_earnings": round(profile.total_earnings or 0.0, 2),
+        "rating": profile.rating or 0.0,
+        "days": days,
+        "period_rides": sum(row["rides"] for row in day_rows),
+        "period_earnings": round(sum(row["earnings"] for row in day_rows), 2),
+        "period_online_minutes": round(sum(row["online_minutes"] for row in day_rows), 1),
+        "by_day": day_rows
+    }
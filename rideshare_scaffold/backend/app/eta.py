@@ -0,0 +1,355 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+import numpy as np
+from sqlalchemy import extract, select
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 168
+
+# Trips slower or faster than this are GPS glitches or abandoned meters
+MIN_PACE_MINUTES_PER_MILE = 0.5
+MAX_PACE_MINUTES_PER_MILE = 30.0
+
+Bounds = Tuple[float, float, float, float]  # min_lat, min_lng, max_lat, max_lng
+
+def parse_bounds(value: str) -> Bounds:
+    min_lat, min_lng, max_lat, max_lng = (float(part) for part in value.split(","))
+    return min_lat, min_lng, max_lat, max_lng
+
+def hour_of_week(moment: datetime, tz: ZoneInfo) -> int:
+    """Local hour of the week, 0 = Monday 00:00"""
+    local = moment.astimezone(tz)
+    return local.weekday() * 24 + local.hour
+
+class HourOfWeekLookup:
+    """Vectorized hour_of_week for UNIX timestamps.
+
+    Each distinct UTC hour is converted through the timezone once and kept,
+    so streaming a year of rides costs ~8760 conversions in total.
+    """
+
+    def __init__(self, tz: ZoneInfo):
+        self.tz = tz
+        self._first = 0
+        self._lookup = np.empty(0, dtype=np.int64)
+
+    def _convert(self, first: int, last: int) -> np.ndarray:
+        return np.fromiter(
+            (hour_of_week(datetime.fromtimestamp(hour * 3600, timezone.utc), self.tz) for hour in range(first, last + 1)),
+            dtype=np.int64,
+            count=last - first + 1
+        )
+
+    def __call__(self, epoch_seconds) -> np.ndarray:
+        hours = np.floor_divide(np.asarray(epoch_seconds, dtype=np.float64), 3600).astype(np.int64)
+        if hours.size == 0:
+            return hours
+        first, last = int(hours.min()), int(hours.max())
+        if not self._lookup.size:
+            self._first, self._lookup = first, self._convert(first, last)
+        else:
+            cached_last = self._first + self._lookup.size - 1
+            if first < self._first:
+                self._lookup = np.concatenate([self._convert(first, self._first - 1), self._lookup])
+                self._first = first
+            if last > cached_last:
+                self._lookup = np.concatenate([self._lookup, self._convert(cached_last + 1, last)])
+        return self._lookup[hours - self._first]
+
+class EtaGrid:
+    """Fixed lat/lng grid the ETA table is bucketed on"""
+
+    def __init__(self, bounds: Bounds, cell_deg: float):
+        self.bounds = bounds
+        self.cell_deg = cell_deg
+        self.rows = math.ceil((bounds[2] - bounds[0]) / cell_deg)
+        self.cols = math.ceil((bounds[3] - bounds[1]) / cell_deg)
+        self.cells = self.rows * self.cols
+
+    def cell_indices(self, latitude, longitude) -> np.ndarray:
+        """Flat cell index per point, -1 outside the grid"""
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        row = np.floor((latitude - self.bounds[0]) / self.cell_deg).astype(np.int64)
+        col = np.floor((longitude - self.bounds[1]) / self.cell_deg).astype(np.int64)
+        inside = (row >= 0) & (row < self.rows) & (col >= 0) & (col < self.cols)
+        return np.where(inside, row * self.cols + col, -1)
+
+class EtaTable:
+    """Dense pace table: minutes per mile by origin cell, destination cell and hour of week.
+
+    Buckets without enough history hold NaN and callers fall back to the flat
+    heuristic. Stored as float16, so the default grid is a few megabytes.
+    """
+
+    def __init__(self, pace: np.ndarray, grid: EtaGrid, timezone_name: str, rides: int = 0, built_at: float = 0.0):
+        self.pace = pace
+        self.grid = grid
+        self.timezone_name = timezone_name
+        self.tz = ZoneInfo(timezone_name)
+        self.rides = rides
+        self.built_at = built_at
+
+    def pace_array(self, pickup_lat, pickup_lng, dropoff_lat, dropoff_lng, when: datetime) -> np.ndarray:
+        """Minutes per mile per trip departing at `when`, NaN where the table has no answer"""
+        # One pass over pickups and dropoffs together keeps single quotes cheap
+        origin, destination = self.grid.cell_indices([pickup_lat, dropoff_lat], [pickup_lng, dropoff_lng])
+        pace = self.pace[origin, destination, hour_of_week(when, self.tz)].astype(np.float64)
+        pace[(origin < 0) | (destination < 0)] = np.nan
+        return pace
+
+    def coverage(self) -> float:
+        """Share of buckets with an estimate"""
+        return float(np.count_nonzero(~np.isnan(self.pace))) / self.pace.size
+
+    def save(self, path: str) -> None:
+        """Write the table atomically so a reloading worker never reads a partial file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            pace=self.pace,
+            bounds=np.array(self.grid.bounds, dtype=np.float64),
+            cell_deg=np.float64(self.grid.cell_deg),
+            timezone=np.array(self.timezone_name),
+            rides=np.int64(self.rides),
+            built_at=np.float64(self.built_at)
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "EtaTable":
+        with np.load(path) as data:
+            grid = EtaGrid(tuple(data["bounds"].tolist()), float(data["cell_deg"]))
+            return cls(
+                pace=data["pace"],
+                grid=grid,
+                timezone_name=str(data["timezone"]),
+                rides=int(data["rides"]),
+                built_at=float(data["built_at"])
+            )
+
+class EtaTableBuilder:
+    """Accumulates completed rides chunk by chunk and produces an EtaTable.
+
+    Memory is three dense accumulators the size of the table, independent of
+    how many rides are fed in.
+    """
+
+    def __init__(self, bounds: Optional[Bounds] = None, cell_deg: Optional[float] = None, timezone_name: Optional[str] = None):
+        self.grid = EtaGrid(bounds or parse_bounds(settings.ETA_BOUNDS), cell_deg or settings.ETA_CELL_DEG)
+        self.timezone_name = timezone_name or settings.ETA_TIMEZONE
+        self.hour_of_week = HourOfWeekLookup(ZoneInfo(self.timezone_name))
+        size = self.grid.cells * self.grid.cells * HOURS_PER_WEEK
+        self._minutes = np.zeros(size, dtype=np.float64)
+        self._miles = np.zeros(size, dtype=np.float64)
+        self._counts = np.zeros(size, dtype=np.int32)
+        self.rides_seen = 0
+        self.rides_used = 0
+
+    def add(self, started_epoch, completed_epoch, distance_miles, pickup_lat, pickup_lng, dropoff_lat, dropoff_lng) -> int:
+        """Fold one chunk of rides (parallel arrays) into the table and return how many were used"""
+        started_epoch = np.asarray(started_epoch, dtype=np.float64)
+        minutes = (np.asarray(completed_epoch, dtype=np.float64) - started_epoch) / 60
+        distance_miles = np.asarray(distance_miles, dtype=np.float64)
+        origin = self.grid.cell_indices(pickup_lat, pickup_lng)
+        destination = self.grid.cell_indices(dropoff_lat, dropoff_lng)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pace = minutes / distance_miles
+        usable = (
+            (origin >= 0) & (destination >= 0) & (distance_miles > 0)
+            & (pace >= MIN_PACE_MINUTES_PER_MILE) & (pace <= MAX_PACE_MINUTES_PER_MILE)
+        )
+        self.rides_seen += len(started_epoch)
+        if not usable.any():
+            return 0
+
+        bucket = (
+            (origin[usable] * self.grid.cells + destination[usable]) * HOURS_PER_WEEK
+            + self.hour_of_week(started_epoch[usable])
+        )
+        np.add.at(self._minutes, bucket, minutes[usable])
+        np.add.at(self._miles, bucket, distance_miles[usable])
+        np.add.at(self._counts, bucket, 1)
+
+        used = int(usable.sum())
+        self.rides_used += used
+        return used
+
+    def build(self, min_samples: Optional[int] = None) -> EtaTable:
+        """Turn the accumulators into a pace table.
+
+        Hours with fewer than `min_samples` rides borrow the all-week pace of
+        their cell pair when that pair has enough history.
+        """
+        min_samples = min_samples or settings.ETA_MIN_SAMPLES
+        shape = (self.grid.cells, self.grid.cells, HOURS_PER_WEEK)
+        minutes = self._minutes.reshape(shape)
+        miles = self._miles.reshape(shape)
+        counts = self._counts.reshape(shape)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            hourly = minutes / miles
+            weekly = minutes.sum(axis=2) / miles.sum(axis=2)
+        weekly[counts.sum(axis=2) < min_samples] = np.nan
+        pace = np.where(counts >= min_samples, hourly, weekly[:, :, np.newaxis])
+
+        return EtaTable(
+            pace=pace.astype(np.float16),
+            grid=self.grid,
+            timezone_name=self.timezone_name,
+            rides=self.rides_used,
+            built_at=time.time()
+        )
+
+def rebuild_eta_table(path: Optional[str] = None, chunk_size: Optional[int] = None) -> EtaTable:
+    """Rebuild the ETA table from completed rides, streaming them in chunks"""
+    from .database import engine
+    from .models import RideStatus
+    from .ride_archive import across_archive
+
+    path = path or settings.ETA_TABLE_PATH
+    chunk_size = chunk_size or settings.ETA_REBUILD_CHUNK_SIZE
+    builder = EtaTableBuilder()
+
+    def completed(model):
+        return (
+            select(
+                extract("epoch", model.started_at),
+                extract("epoch", model.completed_at),
+                model.distance_miles,
+                model.pickup_latitude,
+                model.pickup_longitude,
+                model.dropoff_latitude,
+                model.dropoff_longitude
+            )
+            .where(
+                model.status == RideStatus.COMPLETED,
+                model.started_at.is_not(None),
+                model.completed_at.is_not(None),
+                model.distance_miles > 0
+            )
+        )
+
+    # Archived rides are most of the history
+    stmt = across_archive(completed)
+
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+        for rows in result.partitions():
+            columns = np.array(rows, dtype=np.float64).T
+            builder.add(*columns)
+
+    table = builder.build()
+    table.save(path)
+    logger.info(
+        f"Rebuilt ETA table from {builder.rides_used}/{builder.rides_seen} rides "
+        f"in {time.perf_counter() - started:.1f}s ({table.coverage():.1%} coverage)"
+    )
+    return table
+
+class EtaModel:
+    """Serves the current ETA table and picks up rebuilt files on a schedule"""
+
+    def __init__(self, path: Optional[str] = None, reload_interval: Optional[float] = None):
+        self.path = path or settings.ETA_TABLE_PATH
+        self.reload_interval = reload_interval or settings.ETA_RELOAD_SECONDS
+        self.table: Optional[EtaTable] = None
+        self._mtime: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.reloads = 0
+        self.reload_errors = 0
+        self.trips_estimated = 0
+        self.trips_fallback = 0
+
+    def reload_if_changed(self) -> bool:
+        """Load the table file if it changed since the last load"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+
+        try:
+            self.table = EtaTable.load(self.path)
+        except Exception as e:
+            self.reload_errors += 1
+            logger.error(f"Failed to load ETA table {self.path}: {e}")
+            return False
+        self._mtime = mtime
+        self.reloads += 1
+        return True
+
+    def pace_array(self, pickup_lat, pickup_lng, dropoff_lat, dropoff_lng, fallback: float, when: Optional[datetime] = None) -> np.ndarray:
+        """Minutes per mile per trip, `fallback` wherever the table has no estimate"""
+        table = self.table
+        if table is None:
+            pace = np.full(np.shape(pickup_lat), float(fallback))
+            self.trips_estimated += pace.size
+            self.trips_fallback += pace.size
+            return pace
+
+        pace = table.pace_array(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng, when or datetime.now(timezone.utc))
+        missing = np.isnan(pace)
+        pace[missing] = fallback
+        self.trips_estimated += pace.size
+        self.trips_fallback += int(missing.sum())
+        return pace
+
+    async def run(self) -> None:
+        """Check for a rebuilt table on the configured interval until cancelled"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await loop.run_in_executor(None, self.reload_if_changed)
+            await asyncio.sleep(self.reload_interval)
+
+    def start(self) -> None:
+        """Start the background reload loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the reload loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> Dict:
+        """Table freshness and fallback counters"""
+        table = self.table
+        return {
+            "loaded": table is not None,
+            "rides": table.rides if table else 0,
+            "built_at": table.built_at if table else None,
+            "coverage": round(table.coverage(), 6) if table else 0.0,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "trips_estimated": self.trips_estimated,
+            "trips_fallback": self.trips_fallback
+        }
+
+# Global instance
+eta_model = EtaModel()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    rebuild_eta_table()
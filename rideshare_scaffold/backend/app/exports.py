@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Optional
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, or_, select
+from .config import settings
+from .database import ReplicaSessionLocal
+from .models import Ride, Tip
+from .ride_archive import across_archive
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+EXPORT_FORMAT_PATTERN = "^(csv|ndjson)$"
+
+RIDE_EXPORT_COLUMNS = [
+    Ride.id, Ride.created_at, Ride.started_at, Ride.completed_at, Ride.status,
+    Ride.rider_id, Ride.driver_id, Ride.pickup_address, Ride.dropoff_address,
+    Ride.distance_miles, Ride.fare, Ride.payment_intent_id
+]
+
+TIP_EXPORT_COLUMNS = [
+    Tip.id, Tip.created_at, Tip.ride_id, Tip.from_user_id, Tip.to_user_id,
+    Tip.amount, Tip.payment_intent_id
+]
+
+def _in_range(stmt: Select, column, start: Optional[datetime], end: Optional[datetime]) -> Select:
+    if start is not None:
+        stmt = stmt.where(column >= start)
+    if end is not None:
+        stmt = stmt.where(column < end)
+    return stmt
+
+def ride_export_query(start: Optional[datetime], end: Optional[datetime], user_column: Optional[str] = None, user_id: Optional[int] = None) -> Select:
+    """Rides created in [start, end) from rides and rides_archive, optionally only those where `user_column` is `user_id`"""
+    def part(model):
+        stmt = _in_range(select(*[getattr(model, column.key) for column in RIDE_EXPORT_COLUMNS]), model.created_at, start, end)
+        if user_column is not None:
+            stmt = stmt.where(getattr(model, user_column) == user_id)
+        return stmt
+
+    merged = across_archive(part).subquery()
+    if user_column is None:
+        # Finance exports span every user; id order merges the two primary key scans instead of sorting the range
+        return select(merged).order_by(merged.c.id)
+    return select(merged).order_by(merged.c.created_at, merged.c.id)
+
+def tip_export_query(start: Optional[datetime], end: Optional[datetime], user_id: Optional[int] = None) -> Select:
+    """Tips created in [start, end), optionally only those given or received by `user_id`"""
+    stmt = _in_range(select(*TIP_EXPORT_COLUMNS), Tip.created_at, start, end)
+    if user_id is None:
+        return stmt.order_by(Tip.id)
+    return stmt.where(or_(Tip.from_user_id == user_id, Tip.to_user_id == user_id)).order_by(Tip.created_at, Tip.id)
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+async def stream_export(stmt: Select, fmt: str, chunk_size: Optional[int] = None) -> AsyncIterator[str]:
+    """Yield the rows of `stmt` as CSV or NDJSON text, one server-side cursor batch at a time
+
+    The session is opened here rather than taken from a dependency so it
+    lives exactly as long as the response body, and on the read replica when
+    one is configured. Memory stays bounded by `chunk_size` rows however many
+    the query returns.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    names = [column.key for column in stmt.selected_columns]
+
+    if fmt == "csv":
+        header = io.StringIO()
+        csv.writer(header).writerow(names)
+        yield header.getvalue()
+
+    async with ReplicaSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=chunk_size))
+        async for rows in result.partitions():
+            buffer = io.StringIO()
+            if fmt == "csv":
+                writer = csv.writer(buffer)
+                writer.writerows([_plain(value) for value in row] for row in rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps({name: _plain(value) for name, value in zip(names, row)}))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+
+def export_response(stmt: Select, fmt: str, name: str) -> StreamingResponse:
+    """Stream an export as a file download"""
+    return StreamingResponse(
+        stream_export(stmt, fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    )
@@ -0,0 +1,29 @@
+import math
+from typing import Tuple
+
+EARTH_RADIUS_MILES = 3959
+MILES_PER_DEGREE_LAT = 69.0
+METERS_PER_MILE = 1609.344
+
+Cell = Tuple[int, int]
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Calculate distance between two points in miles using Haversine formula"""
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+
+    return EARTH_RADIUS_MILES * c
+
+def cell_for(latitude: float, longitude: float, cell_deg: float) -> Cell:
+    """Map a coordinate onto a uniform lat/lng grid cell"""
+    return (math.floor(latitude / cell_deg), math.floor(longitude / cell_deg))
+
+def cell_size_miles(latitude: float, cell_deg: float) -> float:
+    """Smallest side of a grid cell at the given latitude, in miles"""
+    lat_miles = cell_deg * MILES_PER_DEGREE_LAT
+    lng_miles = lat_miles * math.cos(math.radians(min(abs(latitude) + cell_deg, 89.0)))
+    return min(lat_miles, lng_miles)
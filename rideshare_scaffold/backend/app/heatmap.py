@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+from .config import settings
+from .geo import Cell
+from .surge import SurgeEngine
+
+logger = logging.getLogger(__name__)
+
+class HeatmapPublisher:
+    """Pushes changed demand/supply cells to ops viewers.
+
+    Every `interval` seconds the cells touched since the last push are sent as
+    one delta carrying a sequence number. Each cell entry is its full current
+    state rather than an increment, so a delta that overlaps a snapshot is
+    harmless, and a viewer that sees a gap in sequence numbers just refetches
+    the snapshot.
+
+    When the engine's counters are shared through Redis, every worker's
+    viewers sit in the same room, so only the worker holding the publisher
+    lease pushes deltas. It diffs the shared counters against what it last
+    pushed and numbers deltas from a shared sequence. Snapshots from any
+    worker read the same shared state. A worker that takes the lease over
+    skips one sequence number, so viewers refetch rather than trust a
+    baseline it never saw.
+    """
+
+    def __init__(self, engine: SurgeEngine, emit: Callable[[Dict], Awaitable[None]], interval: Optional[float] = None):
+        self.engine = engine
+        self.emit = emit
+        self.interval = interval or settings.OPS_HEATMAP_PUSH_SECONDS
+        self.sequence = 0
+        self.shared = engine.shared
+        self.worker_id = uuid.uuid4().hex
+        self.leading = False
+        self._published: Dict[Cell, Dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.deltas_sent = 0
+        self.cells_sent = 0
+
+    async def _shared_cells(self) -> Dict[Cell, Dict]:
+        demand, supply, multipliers = await self.shared.read()
+        return {
+            cell: self.engine.summarize(cell, demand, supply, multipliers)
+            for cell in set(demand) | set(supply) | set(multipliers)
+        }
+
+    async def snapshot(self) -> Dict:
+        """Full heatmap tagged with the sequence of the last delta it supersedes"""
+        if self.shared is None:
+            return {
+                "sequence": self.sequence,
+                "cell_deg": self.engine.cell_deg,
+                "cells": self.engine.snapshot()
+            }
+        # Sequence before state: a later delta may repeat a cell but never miss a change
+        sequence = await self.shared.heatmap_sequence()
+        return {
+            "sequence": sequence,
+            "cell_deg": self.engine.cell_deg,
+            "cells": list((await self._shared_cells()).values())
+        }
+
+    async def _shared_changes(self) -> List[Dict]:
+        """Cells that differ from the last push, if this worker holds the publisher lease"""
+        held = await self.shared.hold_heatmap_lease(self.worker_id, self.interval * 3)
+        if not held:
+            self.leading = False
+            return []
+        if held == 2 or not self.leading:
+            await self.shared.next_heatmap_sequence()
+            self.leading = True
+            self._published = {}
+        current = await self._shared_cells()
+        cells = [summary for cell, summary in current.items() if self._published.get(cell) != summary]
+        cells += [self.engine.summarize(cell, {}, {}, {}) for cell in self._published if cell not in current]
+        self._published = current
+        return cells
+
+    async def tick(self) -> int:
+        """Send one delta if anything changed and return the number of cells in it"""
+        # The engine tracks its own changes either way; shared mode ignores them
+        cells: List[Dict] = self.engine.take_changed_cells()
+        if self.shared is not None:
+            cells = await self._shared_changes()
+        if not cells:
+            return 0
+        if self.shared is not None:
+            self.sequence = await self.shared.next_heatmap_sequence()
+        else:
+            self.sequence += 1
+        try:
+            await self.emit({"sequence": self.sequence, "cells": cells})
+        except Exception as e:
+            logger.error(f"Failed to push heatmap delta {self.sequence}: {e}")
+            # Resend every cell next time; viewers refetch on the gap meanwhile
+            self._published = {}
+            return 0
+        self.deltas_sent += 1
+        self.cells_sent += len(cells)
+        return len(cells)
+
+    async def run(self) -> None:
+        """Push deltas on the configured interval until cancelled"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Heatmap tick failed: {e}")
+
+    def start(self) -> None:
+        """Start the background push loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the push loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> Dict:
+        return {
+            "shared": self.shared is not None,
+            "leading": self.leading,
+            "sequence": self.sequence,
+            "deltas_sent": self.deltas_sent,
+            "cells_sent": self.cells_sent
+        }
@@ -0,0 +1,44 @@
+from itertools import permutations
+from typing import Dict, List, Tuple
+
+# Pickup hotspots and airports from docs/campus_playbook.md, with approximate coordinates
+CAMPUS_HOTSPOTS: Dict[str, Tuple[float, float]] = {
+    # Campus Core
+    "Sather Gate": (37.8703, -122.2595),
+    "Sproul Plaza": (37.8695, -122.2590),
+    "Memorial Stadium": (37.8712, -122.2508),
+    "UC Berkeley Library": (37.8722, -122.2592),
+    "Student Union": (37.8690, -122.2597),
+    # North Campus
+    "Hearst Mining Circle": (37.8746, -122.2577),
+    "Lawrence Hall of Science": (37.8793, -122.2467),
+    "UC Botanical Garden": (37.8752, -122.2383),
+    "Clark Kerr Campus": (37.8634, -122.2494),
+    "Foothill Student Housing": (37.8756, -122.2560),
+    # South Campus
+    "Telegraph Avenue": (37.8677, -122.2590),
+    "Bancroft Way": (37.8688, -122.2588),
+    "College Avenue": (37.8590, -122.2530),
+    "Ashby BART": (37.8529, -122.2700),
+    "UC Berkeley Extension": (37.8717, -122.2721),
+    # West Campus
+    "Oxford Street": (37.8720, -122.2660),
+    "University Avenue": (37.8720, -122.2680),
+    "San Pablo Avenue": (37.8695, -122.2930),
+    "West Berkeley": (37.8700, -122.3005),
+    # East Campus
+    "Gayley Road": (37.8730, -122.2530),
+    "Piedmont Avenue": (37.8690, -122.2520),
+    "Claremont Avenue": (37.8600, -122.2420),
+    "Rockridge BART": (37.8447, -122.2513),
+    # Airports
+    "Oakland International Airport": (37.7126, -122.2197),
+    "San Francisco International Airport": (37.6213, -122.3790),
+}
+
+def hotspot_pairs() -> List[Tuple[float, float, float, float]]:
+    """Every ordered (pickup, dropoff) pair of distinct hotspots"""
+    return [
+        (pickup[0], pickup[1], dropoff[0], dropoff[1])
+        for pickup, dropoff in permutations(CAMPUS_HOTSPOTS.values(), 2)
+    ]
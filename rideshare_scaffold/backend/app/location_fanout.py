@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from .config import settings
+from .geo import METERS_PER_MILE, haversine_miles
+
+logger = logging.getLogger(__name__)
+
+class LocationFanout:
+    """Coalesces driver GPS samples and rate-caps what riders receive.
+
+    Samples are held per driver and only the newest one survives until the
+    next tick, which runs at `rate_hz`. Each ride room therefore gets at most
+    one position per tick, and a position is skipped entirely when the driver
+    has moved less than `min_move_meters` since the last one sent.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[int, int, float, float], Awaitable[None]],
+        rate_hz: Optional[float] = None,
+        min_move_meters: Optional[float] = None
+    ):
+        self.emit = emit
+        self.rate_hz = rate_hz or settings.LOCATION_FANOUT_HZ
+        self.min_move_meters = min_move_meters if min_move_meters is not None else settings.LOCATION_FANOUT_MIN_MOVE_METERS
+        self._pending: Dict[int, Tuple[int, float, float]] = {}  # driver_id -> (ride_id, lat, lng)
+        self._last_sent: Dict[int, Tuple[int, float, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.samples_received = 0
+        self.samples_coalesced = 0
+        self.samples_stationary = 0
+        self.samples_emitted = 0
+
+    def submit(self, driver_id: int, ride_id: int, latitude: float, longitude: float) -> None:
+        """Queue a location sample for the driver's ride room"""
+        self.samples_received += 1
+        if driver_id in self._pending:
+            self.samples_coalesced += 1
+        self._pending[driver_id] = (ride_id, latitude, longitude)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def forget(self, driver_id: int) -> None:
+        """Drop state for a driver whose ride has ended"""
+        self._pending.pop(driver_id, None)
+        self._last_sent.pop(driver_id, None)
+
+    async def tick(self) -> int:
+        """Emit the newest pending sample per driver and return how many were sent"""
+        batch, self._pending = self._pending, {}
+        sent = 0
+        for driver_id, (ride_id, latitude, longitude) in batch.items():
+            last = self._last_sent.get(driver_id)
+            if last is not None and last[0] == ride_id:
+                moved_meters = haversine_miles(last[1], last[2], latitude, longitude) * METERS_PER_MILE
+                if moved_meters < self.min_move_meters:
+                    self.samples_stationary += 1
+                    continue
+
+            self._last_sent[driver_id] = (ride_id, latitude, longitude)
+            try:
+                await self.emit(driver_id, ride_id, latitude, longitude)
+            except Exception as e:
+                logger.error(f"Failed to fan out location for driver {driver_id}: {e}")
+                continue
+            sent += 1
+
+        self.samples_emitted += sent
+        return sent
+
+    async def run(self) -> None:
+        """Tick at the configured rate until there is nothing left to send"""
+        interval = 1.0 / self.rate_hz
+        while True:
+            await asyncio.sleep(interval)
+            if not self._pending:
+                return
+            await self.tick()
+
+    def metrics(self) -> Dict:
+        """Sample counters for the fan-out pipeline"""
+        return {
+            "rate_hz": self.rate_hz,
+            "samples_received": self.samples_received,
+            "samples_coalesced": self.samples_coalesced,
+            "samples_stationary": self.samples_stationary,
+            "samples_emitted": self.samples_emitted
+        }
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import Float, Integer, bindparam, column, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from .config import settings
+from .database import engine
+from .models import DriverProfile
+
+logger = logging.getLogger(__name__)
+
+driver_profiles = DriverProfile.__table__
+
+class LocationStore:
+    """Write-behind buffer for driver location pings.
+
+    Pings are kept in memory, latest position per driver only, and written to
+    driver_profiles in periodic bulk UPDATEs. A flush happens every
+    `flush_interval` seconds, or sooner once the oldest unflushed ping is
+    `max_staleness` seconds old, so no ping waits longer than that. The loop
+    never waits less than MIN_FLUSH_DELAY_SECONDS, so zero settings do not
+    spin.
+    """
+
+    MIN_FLUSH_DELAY_SECONDS = 0.05
+
+    def __init__(self, flush_interval: Optional[float] = None, max_staleness: Optional[float] = None):
+        self.flush_interval = flush_interval if flush_interval is not None else settings.LOCATION_FLUSH_INTERVAL_SECONDS
+        self.max_staleness = max_staleness if max_staleness is not None else settings.LOCATION_MAX_STALENESS_SECONDS
+        self._pending: Dict[int, Tuple[float, float]] = {}
+        self._oldest_pending: Optional[float] = None
+        self._lock = threading.Lock()  # flush() runs in an executor thread
+        self._first_pending = asyncio.Event()  # wakes run() to shorten its wait to the staleness deadline
+        self._profiles: Set[int] = set()  # drivers known to have a driver_profiles row
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.pings_received = 0
+        self.pings_coalesced = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.flush_errors = 0
+        self.last_flush_size = 0
+        self.max_flush_size = 0
+        self.last_flush_lag_ms = 0.0
+        self.max_flush_lag_ms = 0.0
+        self.last_flush_ms = 0.0
+
+    def record(self, user_id: int, latitude: float, longitude: float) -> None:
+        """Accept a location ping, replacing any unflushed ping for the same driver"""
+        now = time.monotonic()
+        with self._lock:
+            self.pings_received += 1
+            if user_id in self._pending:
+                self.pings_coalesced += 1
+            self._pending[user_id] = (latitude, longitude)
+
+            if self._oldest_pending is None:
+                self._oldest_pending = now
+                self._first_pending.set()
+
+    async def has_profile(self, db: AsyncSession, user_id: int) -> bool:
+        """Whether a driver has a profile for their pings to land in; profiles are never deleted, so hits are cached"""
+        if user_id in self._profiles:
+            return True
+        if await db.scalar(select(DriverProfile.id).where(DriverProfile.user_id == user_id)) is None:
+            return False
+        self._profiles.add(user_id)
+        return True
+
+    def latest(self, user_id: int) -> Optional[Tuple[float, float]]:
+        """Get a driver's unflushed position, if any"""
+        return self._pending.get(user_id)
+
+    def forget(self, user_id: int) -> None:
+        """Drop a driver's unflushed ping, e.g. when their position is written directly"""
+        with self._lock:
+            self._pending.pop(user_id, None)
+
+    def flush(self) -> int:
+        """Write all pending positions to the database and return the row count"""
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            oldest, self._oldest_pending = self._oldest_pending, None
+        started = time.monotonic()
+        rows = [(user_id, lat, lng) for user_id, (lat, lng) in batch.items()]
+
+        try:
+            with engine.begin() as conn:
+                for offset in range(0, len(rows), settings.LOCATION_FLUSH_CHUNK_SIZE):
+                    _bulk_update_locations(conn, rows[offset:offset + settings.LOCATION_FLUSH_CHUNK_SIZE])
+        except Exception as e:
+            # Put the batch back unless a newer ping arrived in the meantime
+            with self._lock:
+                self.flush_errors += 1
+                for user_id, position in batch.items():
+                    self._pending.setdefault(user_id, position)
+                if self._oldest_pending is None or (oldest is not None and oldest < self._oldest_pending):
+                    self._oldest_pending = oldest
+            logger.error(f"Failed to flush {len(rows)} driver locations: {e}")
+            return 0
+
+        finished = time.monotonic()
+        self.flushes += 1
+        self.rows_flushed += len(rows)
+        self.last_flush_size = len(rows)
+        self.max_flush_size = max(self.max_flush_size, len(rows))
+        self.last_flush_lag_ms = (finished - oldest) * 1000 if oldest is not None else 0.0
+        self.max_flush_lag_ms = max(self.max_flush_lag_ms, self.last_flush_lag_ms)
+        self.last_flush_ms = (finished - started) * 1000
+        return len(rows)
+
+    def flush_delay(self) -> float:
+        """Seconds until the next flush is due: the interval, or sooner when the oldest ping goes stale"""
+        oldest = self._oldest_pending
+        if oldest is None:
+            return max(self.MIN_FLUSH_DELAY_SECONDS, self.flush_interval)
+        return max(self.MIN_FLUSH_DELAY_SECONDS, min(self.flush_interval, oldest + self.max_staleness - time.monotonic()))
+
+    async def run(self) -> None:
+        """Flush on the configured interval, or at the staleness deadline, until cancelled"""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._first_pending.clear()
+            try:
+                # A ping arriving into an empty buffer may move the deadline closer
+                await asyncio.wait_for(self._first_pending.wait(), timeout=self.flush_delay())
+                continue
+            except asyncio.TimeoutError:
+                pass
+            errors = self.flush_errors
+            await loop.run_in_executor(None, self.flush)
+            if self.flush_errors > errors:
+                # The failed batch is already stale; retry on the interval instead of spinning
+                await asyncio.sleep(max(self.MIN_FLUSH_DELAY_SECONDS, self.flush_interval))
+
+    def start(self) -> None:
+        """Start the background flush loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write out anything still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    def metrics(self) -> Dict:
+        """Flush batch size and lag counters"""
+        return {
+            "pending": len(self._pending),
+            "pings_received": self.pings_received,
+            "pings_coalesced": self.pings_coalesced,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "flush_errors": self.flush_errors,
+            "last_flush_size": self.last_flush_size,
+            "max_flush_size": self.max_flush_size,
+            "last_flush_lag_ms": round(self.last_flush_lag_ms, 3),
+            "max_flush_lag_ms": round(self.max_flush_lag_ms, 3),
+            "last_flush_ms": round(self.last_flush_ms, 3)
+        }
+
+def _bulk_update_locations(conn, rows: List[Tuple[int, float, float]]) -> None:
+    """Apply one chunk of (user_id, latitude, longitude) rows"""
+    if conn.dialect.name == "postgresql":
+        # One UPDATE ... FROM (VALUES ...) statement per chunk
+        pings = values(
+            column("user_id", Integer),
+            column("latitude", Float),
+            column("longitude", Float),
+            name="pings"
+        ).data(rows)
+        conn.execute(
+            update(driver_profiles)
+            .where(driver_profiles.c.user_id == pings.c.user_id)
+            .values(current_latitude=pings.c.latitude, current_longitude=pings.c.longitude)
+        )
+    else:
+        conn.execute(
+            update(driver_profiles)
+            .where(driver_profiles.c.user_id == bindparam("b_user_id"))
+            .values(current_latitude=bindparam("b_latitude"), current_longitude=bindparam("b_longitude")),
+            [{"b_user_id": user_id, "b_latitude": lat, "b_longitude": lng} for user_id, lat, lng in rows]
+        )
+
+# Global instance
+location_store = LocationStore()
@@ -1,22 +1,30 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from pathlib import Path
-from .database import engine
-from .models import Base
+from .database import async_engine, pool_stats, replica_engine
+from .schema_check import schema_check
+from .location_store import location_store
+from .eta import eta_model
+from .surge import surge_engine
+from .quote_cache import quote_cache
+from .principal_cache import principal_cache
+from .write_pins import write_pins
+from .ride_archive import ride_archiver
+from .hotspots import hotspot_pairs
+from .socket_manager import batch_matcher, location_fanout, heatmap_publisher, presence_heartbeat
 # from .socket_manager import sio
-from .routes import auth
-# from .routes import rides, drivers, tips, webhooks
-
-# Create database tables
-Base.metadata.create_all(bind=engine)  # Temporarily disabled for testing
+from .routes import auth, ops
+# from .routes import rides, drivers, tips, webhooks, exports
 
 # Create FastAPI app
 app = FastAPI(
     title="Valey - Your Trusted Rideshare Partner",
     description="Valey Rideshare API - Safe, Reliable, Valey",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -28,12 +36,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def start_background_tasks():
+    # Tables come from `alembic upgrade head`; refuse to serve against an unmigrated database
+    await schema_check.run()
+    location_store.start()
+    # Load the ETA table before warming so warm quotes are not keyed to the fallback
+    await asyncio.get_running_loop().run_in_executor(None, eta_model.reload_if_changed)
+    eta_model.start()
+    # Recount open rides and online drivers before warming so warm quotes carry their surge
+    await surge_engine.rebuild_from_database()
+    surge_engine.start()
+    quote_cache.warm(hotspot_pairs())
+    heatmap_publisher.start()
+    presence_heartbeat.start()
+    ride_archiver.start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await location_store.stop()
+    await eta_model.stop()
+    await surge_engine.stop()
+    await heatmap_publisher.stop()
+    await presence_heartbeat.stop()
+    await ride_archiver.stop()
+    await async_engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
+app.include_router(ops.router)
 # app.include_router(rides.router)
 # app.include_router(drivers.router)
 # app.include_router(tips.router)
 # app.include_router(webhooks.router)
+# app.include_router(exports.router)
 # app.include_router(ai.router)  # Temporarily disabled - needs OpenAI API key
 
 # Create Socket.IO app
@@ -107,6 +145,25 @@ async def api_info():
 async def health_check():
     return {"status": "healthy", "service": "Valey"}
 
+# Runtime metrics
+@app.get("/metrics")
+async def metrics():
+    return {
+        "location_store": location_store.metrics(),
+        "location_fanout": location_fanout.metrics(),
+        "batch_matcher": batch_matcher.metrics(),
+        "eta": eta_model.metrics(),
+        "surge": surge_engine.metrics(),
+        "quote_cache": quote_cache.metrics(),
+        "principal_cache": principal_cache.metrics(),
+        "read_routing": write_pins.metrics(),
+        "ride_archiver": ride_archiver.metrics(),
+        "schema": schema_check.metrics(),
+        "heatmap": heatmap_publisher.metrics(),
+        "presence_heartbeat": presence_heartbeat.metrics(),
+        "db_pool": {name: stats.metrics() for name, stats in pool_stats.items()}
+    }
+
 # Socket.IO health check
 # @app.get("/socket-health")
 # async def socket_health():
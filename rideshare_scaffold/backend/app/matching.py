@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+import numpy as np
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from .config import settings
+from .pricing import haversine_miles_array
+
+logger = logging.getLogger(__name__)
+
+# Cost assigned to pairs outside the dispatch radius so the solver avoids them
+UNREACHABLE_COST = 1e6
+
+Match = Tuple[int, int, float]
+
+def solve_assignment(pickups: np.ndarray, drivers: np.ndarray, max_miles: float) -> List[Match]:
+    """Min-cost matching of pickups to drivers on a haversine cost matrix
+
+    Args:
+        pickups: (n, 2) array of pickup latitude/longitude
+        drivers: (m, 2) array of driver latitude/longitude
+        max_miles: Pairs further apart than this are never matched
+
+    Returns:
+        List of (pickup_index, driver_index, distance_miles)
+    """
+    if len(pickups) == 0 or len(drivers) == 0:
+        return []
+
+    cost = haversine_miles_array(
+        pickups[:, 0:1], pickups[:, 1:2],
+        drivers[np.newaxis, :, 0], drivers[np.newaxis, :, 1]
+    )
+    cost[cost > max_miles] = UNREACHABLE_COST
+
+    # scipy.optimize takes ~0.5 s to import; pay it on the first batch, not on every worker boot
+    from scipy.optimize import linear_sum_assignment
+    rows, cols = linear_sum_assignment(cost)
+    return [
+        (int(row), int(col), float(cost[row, col]))
+        for row, col in zip(rows, cols)
+        if cost[row, col] < UNREACHABLE_COST
+    ]
+
+class BatchMatcher:
+    """Collects ride requests over a short window and assigns them in one solve.
+
+    Requests arriving within `window_seconds` of the first pending request are
+    solved together as an assignment problem against nearby online drivers,
+    minimizing total pickup distance across the batch. The solve runs in the
+    default executor so a large batch never stalls the event loop. Rides left
+    unmatched are handed to `on_unmatched` (normally the nearest-K offer).
+    """
+
+    def __init__(
+        self,
+        candidate_drivers: Callable[[float, float], Awaitable[List[Tuple[int, float, float]]]],
+        on_match: Callable[[Dict, int, float], Awaitable[None]],
+        on_unmatched: Callable[[Dict], Awaitable[None]],
+        window_seconds: Optional[float] = None
+    ):
+        self.candidate_drivers = candidate_drivers
+        self.on_match = on_match
+        self.on_unmatched = on_unmatched
+        self.window_seconds = window_seconds if window_seconds is not None else settings.MATCHING_WINDOW_SECONDS
+        self._pending: List[Dict] = []
+        self._window_started: Optional[float] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self.last_batch: Dict = {}
+        self.batches = 0
+        self.rides_matched = 0
+        self.rides_unmatched = 0
+        self.dispatch_errors = 0
+
+    async def submit(self, ride: Dict) -> None:
+        """Queue a ride request for the current matching window"""
+        self._pending.append(ride)
+        if self._flush_task is None:
+            self._window_started = time.perf_counter()
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.window_seconds)
+        batch, self._pending = self._pending, []
+        window_started, self._window_started = self._window_started, None
+        self._flush_task = None
+        dispatched: Set[int] = set()
+        try:
+            await self.match_batch(batch, window_started, dispatched)
+        except Exception as e:
+            self.dispatch_errors += 1
+            logger.error(f"Batch matching failed, falling back to direct offers for {len(batch) - len(dispatched)} rides: {e}")
+            for ride_index, ride in enumerate(batch):
+                if ride_index in dispatched:
+                    continue
+                try:
+                    await self.on_unmatched(ride)
+                except Exception as e:
+                    self.dispatch_errors += 1
+                    logger.error(f"Direct offer for ride {ride.get('ride_id')} failed: {e}")
+
+    async def match_batch(self, batch: List[Dict], window_started: Optional[float] = None, dispatched: Optional[Set[int]] = None) -> Dict:
+        """Solve one batch of ride requests and dispatch the resulting offers
+
+        The index of each ride is added to `dispatched` once its on_match or
+        on_unmatched call returns, so after a failure the caller knows which
+        rides were already offered.
+        """
+        if dispatched is None:
+            dispatched = set()
+        started = time.perf_counter()
+
+        # Only drivers near at least one pickup are worth a column in the cost matrix
+        drivers: Dict[int, Tuple[float, float]] = {}
+        for ride in batch:
+            for driver_id, latitude, longitude in await self.candidate_drivers(ride['pickup_latitude'], ride['pickup_longitude']):
+                drivers[driver_id] = (latitude, longitude)
+
+        driver_ids = list(drivers)
+        pickups = np.array([[ride['pickup_latitude'], ride['pickup_longitude']] for ride in batch], dtype=np.float64).reshape(-1, 2)
+        positions = np.array([drivers[driver_id] for driver_id in driver_ids], dtype=np.float64).reshape(-1, 2)
+
+        loop = asyncio.get_running_loop()
+        solve_started = time.perf_counter()
+        matches = await loop.run_in_executor(
+            None, solve_assignment, pickups, positions, settings.DISPATCH_RADIUS_MILES
+        )
+        solve_ms = (time.perf_counter() - solve_started) * 1000
+
+        matched_rides = set()
+        for ride_index, driver_index, distance_miles in matches:
+            matched_rides.add(ride_index)
+            await self.on_match(batch[ride_index], driver_ids[driver_index], distance_miles)
+            dispatched.add(ride_index)
+
+        for ride_index, ride in enumerate(batch):
+            if ride_index not in matched_rides:
+                await self.on_unmatched(ride)
+                dispatched.add(ride_index)
+
+        distances = [distance_miles for _, _, distance_miles in matches]
+        self.batches += 1
+        self.rides_matched += len(matches)
+        self.rides_unmatched += len(batch) - len(matches)
+        self.last_batch = {
+            "rides": len(batch),
+            "candidate_drivers": len(driver_ids),
+            "matched": len(matches),
+            "mean_pickup_miles": round(sum(distances) / len(distances), 3) if distances else None,
+            "solve_ms": round(solve_ms, 3),
+            "matching_ms": round((time.perf_counter() - started) * 1000, 3),
+            "window_ms": round((started - window_started) * 1000, 3) if window_started else None
+        }
+        logger.info(f"Matched ride batch: {self.last_batch}")
+        return self.last_batch
+
+    def metrics(self) -> Dict:
+        """Cumulative matching counters plus the most recent batch report"""
+        return {
+            "window_seconds": self.window_seconds,
+            "batches": self.batches,
+            "rides_matched": self.rides_matched,
+            "rides_unmatched": self.rides_unmatched,
+            "pending": len(self._pending),
+            "dispatch_errors": self.dispatch_errors,
+            "last_batch": self.last_batch
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Enum, Text, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
@@ -16,6 +16,16 @@ class RideStatus(PyEnum):
     COMPLETED = "completed"
     CANCELLED = "cancelled"
 
+# Legal ride status transitions: current status -> statuses it may move to
+RIDE_TRANSITIONS = {
+    RideStatus.REQUESTED: {RideStatus.ACCEPTED, RideStatus.CANCELLED},
+    RideStatus.ACCEPTED: {RideStatus.ARRIVED, RideStatus.STARTED, RideStatus.CANCELLED},
+    RideStatus.ARRIVED: {RideStatus.STARTED, RideStatus.CANCELLED},
+    RideStatus.STARTED: {RideStatus.COMPLETED},
+    RideStatus.COMPLETED: set(),
+    RideStatus.CANCELLED: set(),
+}
+
 class User(Base):
     __tablename__ = "users"
     
@@ -46,6 +56,7 @@ class DriverProfile(Base):
     license_plate = Column(String)
     stripe_account_id = Column(String)
     is_online = Column(Boolean, default=False)
+    online_since = Column(DateTime(timezone=True))  # Start of the current online session, folded into daily stats on going offline
     current_latitude = Column(Float)
     current_longitude = Column(Float)
     total_rides = Column(Integer, default=0)
@@ -56,6 +67,11 @@ class DriverProfile(Base):
     
     # Relationships
     user = relationship("User", back_populates="driver_profile")
+    
+    __table_args__ = (
+        # Online drivers are a small slice of all profiles
+        Index("ix_driver_profiles_online", "user_id", postgresql_where=text("is_online"), sqlite_where=text("is_online")),
+    )
 
 class Ride(Base):
     __tablename__ = "rides"
@@ -70,6 +86,7 @@ class Ride(Base):
     dropoff_latitude = Column(Float)
     dropoff_longitude = Column(Float)
     status = Column(Enum(RideStatus), default=RideStatus.REQUESTED)
+    version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped on every status transition
     fare = Column(Float)
     distance_miles = Column(Float)
     payment_intent_id = Column(String)
@@ -81,13 +98,51 @@ class Ride(Base):
     # Relationships
     rider = relationship("User", foreign_keys=[rider_id], back_populates="rides_as_rider")
     driver = relationship("User", foreign_keys=[driver_id], back_populates="rides_as_driver")
-    tips = relationship("Tip", back_populates="ride")
+    tips = relationship("Tip", primaryjoin="Ride.id == foreign(Tip.ride_id)", back_populates="ride")
+    
+    # Enum columns store member names, hence 'REQUESTED' in the partial indexes
+    __table_args__ = (
+        Index("ix_rides_rider_created_id", "rider_id", created_at.desc(), id.desc()),
+        Index("ix_rides_driver_created_id", "driver_id", created_at.desc(), id.desc(),
+              postgresql_where=text("driver_id IS NOT NULL"), sqlite_where=text("driver_id IS NOT NULL")),
+        Index("ix_rides_requested", "created_at",
+              postgresql_where=text("status = 'REQUESTED'"), sqlite_where=text("status = 'REQUESTED'")),
+    )
+
+class RideArchive(Base):
+    """Finished rides moved out of `rides` by the archiver; same columns, read-only to the app"""
+    __tablename__ = "rides_archive"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    rider_id = Column(Integer, ForeignKey("users.id"))
+    driver_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    pickup_address = Column(String)
+    pickup_latitude = Column(Float)
+    pickup_longitude = Column(Float)
+    dropoff_address = Column(String)
+    dropoff_latitude = Column(Float)
+    dropoff_longitude = Column(Float)
+    status = Column(Enum(RideStatus))
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    fare = Column(Float)
+    distance_miles = Column(Float)
+    payment_intent_id = Column(String)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        Index("ix_rides_archive_rider_created_id", "rider_id", created_at.desc(), id.desc()),
+        Index("ix_rides_archive_driver_created_id", "driver_id", created_at.desc(), id.desc(),
+              postgresql_where=text("driver_id IS NOT NULL"), sqlite_where=text("driver_id IS NOT NULL")),
+    )
 
 class Tip(Base):
     __tablename__ = "tips"
     
     id = Column(Integer, primary_key=True, index=True)
-    ride_id = Column(Integer, ForeignKey("rides.id"))
+    ride_id = Column(Integer)  # No foreign key: the ride may have moved to rides_archive
     from_user_id = Column(Integer, ForeignKey("users.id"))
     to_user_id = Column(Integer, ForeignKey("users.id"))
     amount = Column(Float)
@@ -95,6 +150,23 @@ class Tip(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
-    ride = relationship("Ride", back_populates="tips")
+    ride = relationship("Ride", primaryjoin="foreign(Tip.ride_id) == Ride.id", back_populates="tips")
     from_user = relationship("User", foreign_keys=[from_user_id], back_populates="tips_given")
     to_user = relationship("User", foreign_keys=[to_user_id], back_populates="tips_received")
+    
+    __table_args__ = (
+        Index("ix_tips_payment_intent", "payment_intent_id"),
+        Index("ix_tips_from_user_created_id", "from_user_id", created_at.desc(), id.desc()),
+        Index("ix_tips_to_user_created_id", "to_user_id", created_at.desc(), id.desc()),
+    )
+
+class DriverDailyStats(Base):
+    """Per-driver, per-UTC-day rollup, upserted in the same transaction as the ride or tip it counts"""
+    __tablename__ = "driver_daily_stats"
+    
+    driver_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    rides = Column(Integer, nullable=False, default=0)
+    fare_total = Column(Float, nullable=False, default=0.0)
+    tip_total = Column(Float, nullable=False, default=0.0)
+    online_seconds = Column(Integer, nullable=False, default=0)
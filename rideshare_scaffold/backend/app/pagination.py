@@ -0,0 +1,42 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import Select, tuple_
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque cursor pointing just past a (created_at, id) row"""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; a malformed cursor is the client's error"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def keyset_page(stmt: Select, created_at_column, id_column, cursor: Optional[str], limit: int) -> Select:
+    """Newest-first page of `stmt` that starts after `cursor`
+
+    Orders by (created_at, id) descending so ties on created_at still page
+    deterministically, and fetches one extra row to tell whether another
+    page exists. Pair with an index on (filter column, created_at DESC, id DESC).
+    """
+    if cursor:
+        stmt = stmt.where(tuple_(created_at_column, id_column) < tuple_(*decode_cursor(cursor)))
+    return stmt.order_by(created_at_column.desc(), id_column.desc()).limit(limit + 1)
+
+def page_of(rows: Sequence, limit: int) -> Tuple[List, Optional[str]]:
+    """Split the limit + 1 rows from keyset_page into a page and the next cursor"""
+    items = list(rows[:limit])
+    if len(rows) <= limit:
+        return items, None
+    last = items[-1]
+    return items, encode_cursor(last.created_at, last.id)
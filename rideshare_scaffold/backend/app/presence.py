@@ -0,0 +1,351 @@
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from .config import settings
+from .driver_index import DriverIndex
+from .wire import ENCODING_JSON
+
+logger = logging.getLogger(__name__)
+
+# (distance_miles, driver_id, latitude, longitude)
+NearbyDriver = Tuple[float, int, float, float]
+
+class InMemoryPresence:
+    """Online drivers, user connections and active rides for a single process.
+
+    Also serves as the stand-in store for tests. Every method is a coroutine
+    so it can be swapped for RedisPresence without touching callers.
+    """
+
+    def __init__(self):
+        self._drivers: Dict[int, Dict] = {}
+        self._index = DriverIndex()
+        self._user_sids: Dict[int, Dict[str, str]] = {}  # user_id -> {sid: encoding}
+        self._driver_rides: Dict[int, int] = {}
+
+    async def set_driver_online(
+        self,
+        driver_id: int,
+        sid: str,
+        latitude: Optional[float],
+        longitude: Optional[float],
+        encoding: str = ENCODING_JSON
+    ) -> None:
+        self._drivers[driver_id] = {'sid': sid, 'latitude': latitude, 'longitude': longitude, 'encoding': encoding}
+        if latitude is not None and longitude is not None:
+            self._index.upsert(driver_id, latitude, longitude)
+
+    async def update_driver_position(self, driver_id: int, latitude: float, longitude: float) -> bool:
+        """Move an online driver; returns False if the driver is not online"""
+        driver = self._drivers.get(driver_id)
+        if driver is None:
+            return False
+        driver['latitude'] = latitude
+        driver['longitude'] = longitude
+        self._index.upsert(driver_id, latitude, longitude)
+        return True
+
+    async def remove_driver(self, driver_id: int, sid: Optional[str] = None) -> bool:
+        """Take a driver offline, optionally only if registered from `sid`"""
+        driver = self._drivers.get(driver_id)
+        if driver is None or (sid is not None and driver['sid'] != sid):
+            return False
+        del self._drivers[driver_id]
+        self._index.remove(driver_id)
+        return True
+
+    async def get_driver(self, driver_id: int) -> Optional[Dict]:
+        return self._drivers.get(driver_id)
+
+    async def online_drivers(self) -> List[Dict]:
+        return list(self._drivers.values())
+
+    async def nearest_drivers(self, latitude: float, longitude: float, k: int, radius_miles: float) -> List[NearbyDriver]:
+        """Up to k idle drivers within radius, closest first; drivers on a ride are skipped"""
+        nearby = []
+        # Every busy driver could be closer than the k-th idle one
+        for distance_miles, driver_id in self._index.nearest(latitude, longitude, k + len(self._driver_rides), radius_miles):
+            if driver_id in self._driver_rides:
+                continue
+            driver = self._drivers[driver_id]
+            nearby.append((distance_miles, driver_id, driver['latitude'], driver['longitude']))
+        return nearby[:k]
+
+    async def refresh(self, driver_ids: Iterable[int], user_ids: Iterable[int]) -> None:
+        """Nothing to do: entries live exactly as long as this process"""
+
+    async def add_user_sid(self, user_id: int, sid: str, encoding: str = ENCODING_JSON) -> None:
+        self._user_sids.setdefault(user_id, {})[sid] = encoding
+
+    async def remove_user_sid(self, user_id: int, sid: str) -> None:
+        sids = self._user_sids.get(user_id)
+        if sids is not None:
+            sids.pop(sid, None)
+            if not sids:
+                del self._user_sids[user_id]
+
+    async def user_sids(self, user_id: int) -> Dict[str, str]:
+        """Get {sid: encoding} for every connection of a user"""
+        return dict(self._user_sids.get(user_id, {}))
+
+    async def set_driver_ride(self, driver_id: int, ride_id: int) -> None:
+        self._driver_rides[driver_id] = ride_id
+
+    async def get_driver_ride(self, driver_id: int) -> Optional[int]:
+        return self._driver_rides.get(driver_id)
+
+    async def clear_driver_ride(self, driver_id: int, ride_id: int) -> bool:
+        """Forget a driver's active ride if it is still `ride_id`"""
+        if self._driver_rides.get(driver_id) != ride_id:
+            return False
+        del self._driver_rides[driver_id]
+        return True
+
+# Move a driver only while their entry exists, so a concurrent remove_driver is never undone
+UPDATE_POSITION_SCRIPT = """
+local raw = redis.call('GET', KEYS[1])
+if not raw then
+    return 0
+end
+local driver = cjson.decode(raw)
+driver['latitude'] = tonumber(ARGV[1])
+driver['longitude'] = tonumber(ARGV[2])
+redis.call('SET', KEYS[1], cjson.encode(driver), 'EX', ARGV[4])
+redis.call('GEOADD', KEYS[2], ARGV[2], ARGV[1], ARGV[3])
+return 1
+"""
+
+# Take a driver offline, only if still registered from ARGV[2] when it is given
+REMOVE_DRIVER_SCRIPT = """
+local raw = redis.call('GET', KEYS[1])
+if raw and ARGV[2] ~= '' and cjson.decode(raw)['sid'] ~= ARGV[2] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('SREM', KEYS[3], ARGV[1])
+return raw and 1 or 0
+"""
+
+class RedisPresence:
+    """Presence shared by every worker through Redis.
+
+    Each online driver is a JSON key with a TTL, indexed by a set of ids and
+    a GEO set so nearest-driver lookups are a single GEOSEARCH. User
+    connections are one hash of sid -> encoding per user and active rides a
+    hash keyed by driver. Driver and sid entries expire after `ttl` seconds
+    unless the owning worker refreshes them (PresenceHeartbeat), so a crashed
+    worker's drivers drop offline instead of receiving offers forever; index
+    members whose key has expired are pruned when a read finds them.
+    """
+
+    def __init__(self, url: str, prefix: str = "valey", ttl: Optional[int] = None):
+        from redis import asyncio as aioredis
+
+        self.redis = aioredis.from_url(url, decode_responses=True)
+        self.ttl = ttl or settings.PRESENCE_TTL_SECONDS
+        self._driver_prefix = f"{prefix}:driver:"
+        self._drivers_key = f"{prefix}:drivers"
+        self._geo_key = f"{prefix}:drivers:geo"
+        self._rides_key = f"{prefix}:driver_rides"
+        self._sids_prefix = f"{prefix}:user_sids:"
+        self._update_position = self.redis.register_script(UPDATE_POSITION_SCRIPT)
+        self._remove_driver = self.redis.register_script(REMOVE_DRIVER_SCRIPT)
+
+    def _driver_key(self, driver_id: int) -> str:
+        return f"{self._driver_prefix}{driver_id}"
+
+    async def set_driver_online(
+        self,
+        driver_id: int,
+        sid: str,
+        latitude: Optional[float],
+        longitude: Optional[float],
+        encoding: str = ENCODING_JSON
+    ) -> None:
+        driver = {'sid': sid, 'latitude': latitude, 'longitude': longitude, 'encoding': encoding}
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._driver_key(driver_id), json.dumps(driver), ex=self.ttl)
+            pipe.sadd(self._drivers_key, driver_id)
+            if latitude is not None and longitude is not None:
+                pipe.geoadd(self._geo_key, (longitude, latitude, driver_id))
+            else:
+                pipe.zrem(self._geo_key, driver_id)
+            await pipe.execute()
+
+    async def update_driver_position(self, driver_id: int, latitude: float, longitude: float) -> bool:
+        moved = await self._update_position(
+            keys=[self._driver_key(driver_id), self._geo_key],
+            args=[latitude, longitude, driver_id, self.ttl],
+            client=self.redis
+        )
+        return bool(moved)
+
+    async def remove_driver(self, driver_id: int, sid: Optional[str] = None) -> bool:
+        removed = await self._remove_driver(
+            keys=[self._driver_key(driver_id), self._geo_key, self._drivers_key],
+            args=[driver_id, sid or ""],
+            client=self.redis
+        )
+        return bool(removed)
+
+    async def get_driver(self, driver_id: int) -> Optional[Dict]:
+        raw = await self.redis.get(self._driver_key(driver_id))
+        return json.loads(raw) if raw else None
+
+    async def _prune(self, driver_ids: List) -> None:
+        """Drop index entries whose driver key has expired"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.srem(self._drivers_key, *driver_ids)
+            pipe.zrem(self._geo_key, *driver_ids)
+            await pipe.execute()
+
+    async def online_drivers(self) -> List[Dict]:
+        driver_ids = list(await self.redis.smembers(self._drivers_key))
+        if not driver_ids:
+            return []
+        raws = await self.redis.mget([self._driver_key(driver_id) for driver_id in driver_ids])
+        expired = [driver_id for driver_id, raw in zip(driver_ids, raws) if raw is None]
+        if expired:
+            await self._prune(expired)
+        return [json.loads(raw) for raw in raws if raw is not None]
+
+    async def nearest_drivers(self, latitude: float, longitude: float, k: int, radius_miles: float) -> List[NearbyDriver]:
+        """Up to k idle drivers within radius, closest first
+
+        Hits whose key has expired are pruned and drivers with an active ride
+        skipped; the search over-fetches and widens its COUNT until k idle
+        drivers are found or the radius has no more members.
+        """
+        count = 2 * k
+        while True:
+            results = await self.redis.geosearch(
+                self._geo_key,
+                longitude=longitude,
+                latitude=latitude,
+                radius=radius_miles,
+                unit="mi",
+                sort="ASC",
+                count=count,
+                withdist=True,
+                withcoord=True
+            )
+            if not results:
+                return []
+            members = [member for member, _, _ in results]
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.mget([self._driver_key(member) for member in members])
+                pipe.hmget(self._rides_key, members)
+                raws, rides = await pipe.execute()
+            expired = [member for member, raw in zip(members, raws) if raw is None]
+            if expired:
+                await self._prune(expired)
+            idle = [
+                (float(distance_miles), int(member), float(coords[1]), float(coords[0]))
+                for (member, distance_miles, coords), raw, ride_id in zip(results, raws, rides)
+                if raw is not None and ride_id is None
+            ]
+            if len(idle) >= k or len(results) < count:
+                return idle[:k]
+            count *= 2
+
+    async def refresh(self, driver_ids: Iterable[int], user_ids: Iterable[int]) -> None:
+        """Extend the TTL of drivers and user connections this worker still holds"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for driver_id in driver_ids:
+                pipe.expire(self._driver_key(driver_id), self.ttl)
+            for user_id in user_ids:
+                pipe.expire(f"{self._sids_prefix}{user_id}", self.ttl)
+            await pipe.execute()
+
+    async def add_user_sid(self, user_id: int, sid: str, encoding: str = ENCODING_JSON) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(f"{self._sids_prefix}{user_id}", sid, encoding)
+            pipe.expire(f"{self._sids_prefix}{user_id}", self.ttl)
+            await pipe.execute()
+
+    async def remove_user_sid(self, user_id: int, sid: str) -> None:
+        await self.redis.hdel(f"{self._sids_prefix}{user_id}", sid)
+
+    async def user_sids(self, user_id: int) -> Dict[str, str]:
+        return await self.redis.hgetall(f"{self._sids_prefix}{user_id}")
+
+    async def set_driver_ride(self, driver_id: int, ride_id: int) -> None:
+        await self.redis.hset(self._rides_key, driver_id, ride_id)
+
+    async def get_driver_ride(self, driver_id: int) -> Optional[int]:
+        ride_id = await self.redis.hget(self._rides_key, driver_id)
+        return int(ride_id) if ride_id is not None else None
+
+    async def clear_driver_ride(self, driver_id: int, ride_id: int) -> bool:
+        if await self.get_driver_ride(driver_id) != ride_id:
+            return False
+        await self.redis.hdel(self._rides_key, driver_id)
+        return True
+
+class PresenceHeartbeat:
+    """Refreshes the presence TTL of every connection this worker holds.
+
+    Beats every third of PRESENCE_TTL_SECONDS, so an entry survives two
+    missed beats; when the worker dies its entries simply expire.
+    """
+
+    def __init__(self, store, connections: Callable[[], Iterable[Dict]], interval: Optional[float] = None):
+        self.store = store
+        self.connections = connections
+        self.interval = interval or settings.PRESENCE_TTL_SECONDS / 3
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.beats = 0
+        self.errors = 0
+        self.last_connections = 0
+
+    async def beat(self) -> None:
+        """Refresh every driver and user connected to this worker"""
+        connections = list(self.connections())
+        driver_ids = {c['user_id'] for c in connections if c.get('role') == 'driver'}
+        user_ids = {c['user_id'] for c in connections}
+        await self.store.refresh(driver_ids, user_ids)
+        self.beats += 1
+        self.last_connections = len(connections)
+
+    async def run(self) -> None:
+        """Beat on the configured interval until cancelled"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.beat()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Presence heartbeat failed: {e}")
+
+    def start(self) -> None:
+        """Start the background heartbeat loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the heartbeat loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> Dict:
+        return {
+            "interval_seconds": self.interval,
+            "beats": self.beats,
+            "errors": self.errors,
+            "last_connections": self.last_connections
+        }
+
+def create_presence_store():
+    """Pick the presence backend matching the Socket.IO client manager"""
+    if settings.REDIS_URL and not settings.REDIS_URL.startswith("memory://"):
+        return RedisPresence(settings.REDIS_URL)
+    return InMemoryPresence()
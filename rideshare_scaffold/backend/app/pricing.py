@@ -0,0 +1,58 @@
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from .config import settings
+from .eta import eta_model
+from .geo import EARTH_RADIUS_MILES
+from .surge import surge_engine
+
+# Rough city driving pace, used where the ETA table has no estimate
+MINUTES_PER_MILE = 2
+
+def haversine_miles_array(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Vectorized Haversine distance in miles between paired coordinate arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    c = 2 * np.arcsin(np.sqrt(a))
+
+    return EARTH_RADIUS_MILES * c
+
+def scalar_fare(distance_miles: float, surge_multiplier: float = 1.0) -> float:
+    """Ride fare for one trip; the scalar reference for fare_array"""
+    return (settings.BASE_FARE + distance_miles * settings.PER_MILE_RATE) * surge_multiplier
+
+def fare_array(distance_miles, surge_multiplier=1.0) -> np.ndarray:
+    """Vectorized ride fare based on distance and the pickup cell's surge multiplier"""
+    return (settings.BASE_FARE + np.asarray(distance_miles, dtype=np.float64) * settings.PER_MILE_RATE) * surge_multiplier
+
+def estimate_minutes_array(distance_miles, minutes_per_mile=MINUTES_PER_MILE) -> np.ndarray:
+    """Vectorized trip time estimate in whole minutes"""
+    return (np.asarray(distance_miles, dtype=np.float64) * minutes_per_mile).astype(np.int64)
+
+def quote_arrays(
+    pickup_lat,
+    pickup_lng,
+    dropoff_lat,
+    dropoff_lng,
+    departure: Optional[datetime] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Quote a batch of trips, returning (distance_miles, fare, estimated_minutes, surge_multiplier) arrays"""
+    distance_miles = haversine_miles_array(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng)
+    pace = eta_model.pace_array(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng, MINUTES_PER_MILE, departure)
+    surge = surge_engine.multiplier_array(pickup_lat, pickup_lng)
+    return distance_miles, fare_array(distance_miles, surge), estimate_minutes_array(distance_miles, pace), surge
+
+def quote_list(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng) -> List[Dict]:
+    """Quote a batch of trips as response-shaped dicts"""
+    distance_miles, fares, minutes, surge = quote_arrays(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng)
+    return [
+        {"fare": fare, "distance_miles": distance, "estimated_time_minutes": eta, "surge_multiplier": multiplier}
+        for distance, fare, eta, multiplier in zip(distance_miles.tolist(), fares.tolist(), minutes.tolist(), surge.tolist())
+    ]
+
+def pricing_version() -> Tuple:
+    """Everything besides coordinates and surge that can change a quote"""
+    return (settings.BASE_FARE, settings.PER_MILE_RATE, eta_model.reloads)
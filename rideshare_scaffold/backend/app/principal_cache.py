@@ -0,0 +1,147 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from .config import settings
+from .models import User, UserRole
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as most routes need it: identity and role, no row"""
+    id: int
+    role: UserRole
+    is_verified: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(id=user.id, role=user.role, is_verified=bool(user.is_verified))
+
+class PrincipalCache:
+    """Bounded LRU of verified bearer token -> Principal.
+
+    An entry lives for `ttl` seconds but never past the token's own `exp`, so
+    a cached token stops authenticating exactly when the JWT would. Entries
+    are dropped per user once a transaction that updated or deleted the User
+    row through the ORM in this worker commits; other workers pick the change
+    up within `ttl`.
+    """
+
+    WINDOW_SECONDS = 60
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_entries = max_entries or settings.PRINCIPAL_CACHE_MAX_ENTRIES
+        self.ttl = ttl or settings.PRINCIPAL_CACHE_TTL_SECONDS
+        self._entries: "OrderedDict[str, tuple[float, Principal]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+
+        # Metrics; hits are per-second buckets over the last WINDOW_SECONDS
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._hit_buckets = [0] * self.WINDOW_SECONDS
+        self._bucket_seconds = [0] * self.WINDOW_SECONDS
+
+    def _forget(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry[1].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry[1].id]
+
+    def _count_hit(self, now: float) -> None:
+        self.hits += 1
+        second = int(now)
+        slot = second % self.WINDOW_SECONDS
+        if self._bucket_seconds[slot] != second:
+            self._bucket_seconds[slot] = second
+            self._hit_buckets[slot] = 0
+        self._hit_buckets[slot] += 1
+
+    def get(self, token: str) -> Optional[Principal]:
+        """Cached principal for a token, or None on a miss or expiry"""
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        now = time.time()
+        if entry[0] <= now:
+            self._forget(token)
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self._count_hit(now)
+        return entry[1]
+
+    def put(self, token: str, principal: Principal, token_expires_at: Optional[float]) -> None:
+        """Cache a principal for a token that has just been verified"""
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        self._forget(token)
+        self._entries[token] = (expires_at, principal)
+        self._tokens_by_user.setdefault(principal.id, set()).add(token)
+        while len(self._entries) > self.max_entries:
+            self._forget(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate_user(self, user_id: int) -> int:
+        """Drop every cached token of a user; returns how many were dropped"""
+        tokens = self._tokens_by_user.pop(user_id, set())
+        for token in tokens:
+            self._entries.pop(token, None)
+        self.invalidations += len(tokens)
+        return len(tokens)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def metrics(self) -> Dict:
+        """Hit rate and the user lookups it saved the database"""
+        now = int(time.time())
+        recent = sum(
+            hits for hits, second in zip(self._hit_buckets, self._bucket_seconds)
+            if now - second < self.WINDOW_SECONDS
+        )
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "db_queries_saved": self.hits,
+            "db_queries_saved_per_second": round(recent / self.WINDOW_SECONDS, 2),
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+# Global instance
+principal_cache = PrincipalCache()
+
+# Updates are seen at flush, but a request authenticating before the commit would
+# re-cache the old row; so collect the users and drop their entries on commit
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _changed_principal(mapper, connection, target: User) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_principals", set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_principals(session) -> None:
+    for user_id in session.info.pop("changed_principals", ()):
+        principal_cache.invalidate_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _keep_principals(session) -> None:
+    session.info.pop("changed_principals", None)
@@ -0,0 +1,44 @@
+import asyncio
+import pickle
+from typing import Dict, List
+import socketio
+from socketio.async_pubsub_manager import AsyncPubSubManager
+from .config import settings
+
+class InMemoryPubSubManager(AsyncPubSubManager):
+    """In-process stand-in for AsyncRedisManager.
+
+    Every manager created in this process on the same channel shares one
+    broker, so several AsyncServer instances behave like separate workers
+    connected through Redis. Messages are pickled just as the Redis manager
+    does. Intended for tests and local experiments.
+    """
+    name = 'inmemory'
+    _channels: Dict[str, List[asyncio.Queue]] = {}
+
+    def __init__(self, channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        if not write_only:
+            self._channels.setdefault(channel, []).append(self._queue)
+
+    async def _publish(self, data):
+        message = pickle.dumps(data)
+        for queue in self._channels.get(self.channel, []):
+            queue.put_nowait(message)
+
+    async def _listen(self):
+        while True:
+            yield await self._queue.get()
+
+def create_client_manager():
+    """Build the Socket.IO client manager selected by REDIS_URL
+
+    Empty keeps the default single-process manager, "memory://" uses the
+    in-process stand-in, and anything else is treated as a Redis URL.
+    """
+    if not settings.REDIS_URL:
+        return None
+    if settings.REDIS_URL.startswith("memory://"):
+        return InMemoryPubSubManager(channel=settings.SOCKETIO_CHANNEL)
+    return socketio.AsyncRedisManager(settings.REDIS_URL, channel=settings.SOCKETIO_CHANNEL)
@@ -0,0 +1,114 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from .config import settings
+from .geo import cell_for
+from .pricing import pricing_version, quote_list
+from .surge import surge_engine
+
+class QuoteCache:
+    """Bounded LRU cache of ride quotes with a TTL.
+
+    Pickup and dropoff are snapped to `cell_deg` cells and the quote is
+    computed for the cell centers, so every caller in the same pair of cells
+    gets the same answer; POST /rides/request prices through the same
+    cache, so a ride costs what /rides/quote showed. Keys also carry the pricing version and the pickup
+    cell's surge multiplier; a fare or surge change simply stops matching the
+    old entries, which then age out.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None, cell_deg: Optional[float] = None):
+        self.max_entries = max_entries or settings.QUOTE_CACHE_MAX_ENTRIES
+        self.ttl = ttl or settings.QUOTE_CACHE_TTL_SECONDS
+        self.cell_deg = cell_deg or settings.QUOTE_CACHE_CELL_DEG
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict]]" = OrderedDict()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.warmed = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    def _center(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        row, col = cell_for(latitude, longitude, self.cell_deg)
+        return (row + 0.5) * self.cell_deg, (col + 0.5) * self.cell_deg
+
+    def _key(self, pickup: Tuple[float, float], dropoff: Tuple[float, float]) -> Tuple:
+        return (pickup, dropoff, pricing_version(), surge_engine.multiplier(*pickup))
+
+    def _store(self, key: Tuple, quote: Dict, now: float) -> None:
+        self._entries[key] = (now + self.ttl, quote)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_quote(self, pickup_lat: float, pickup_lng: float, dropoff_lat: float, dropoff_lng: float) -> Dict:
+        """Cached quote for a pickup/dropoff pair, computing it on a miss"""
+        started = time.perf_counter()
+        pickup = self._center(pickup_lat, pickup_lng)
+        dropoff = self._center(dropoff_lat, dropoff_lng)
+        key = self._key(pickup, dropoff)
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.hit_seconds += time.perf_counter() - started
+                return entry[1]
+            del self._entries[key]
+            self.expired += 1
+
+        quote = quote_list([pickup[0]], [pickup[1]], [dropoff[0]], [dropoff[1]])[0]
+        self._store(key, quote, now)
+        self.misses += 1
+        self.miss_seconds += time.perf_counter() - started
+        return quote
+
+    def warm(self, pairs: Iterable[Tuple[float, float, float, float]]) -> int:
+        """Quote (pickup_lat, pickup_lng, dropoff_lat, dropoff_lng) pairs in one batch and cache them"""
+        centers = [
+            (self._center(pickup_lat, pickup_lng), self._center(dropoff_lat, dropoff_lng))
+            for pickup_lat, pickup_lng, dropoff_lat, dropoff_lng in pairs
+        ]
+        if not centers:
+            return 0
+
+        quotes = quote_list(
+            [pickup[0] for pickup, _ in centers],
+            [pickup[1] for pickup, _ in centers],
+            [dropoff[0] for _, dropoff in centers],
+            [dropoff[1] for _, dropoff in centers]
+        )
+        now = time.monotonic()
+        for (pickup, dropoff), quote in zip(centers, quotes):
+            self._store(self._key(pickup, dropoff), quote, now)
+        self.warmed += len(quotes)
+        return len(quotes)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def metrics(self) -> Dict:
+        """Hit rate and lookup latency"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "warmed": self.warmed,
+            "avg_hit_us": round(self.hit_seconds / self.hits * 1_000_000, 2) if self.hits else 0.0,
+            "avg_miss_us": round(self.miss_seconds / self.misses * 1_000_000, 2) if self.misses else 0.0
+        }
+
+# Global instance
+quote_cache = QuoteCache()
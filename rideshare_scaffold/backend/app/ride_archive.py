@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Sequence, Union
+from sqlalchemy import Select, delete, insert, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from .config import settings
+from .database import engine
+from .models import Ride, RideArchive, RideStatus
+from .pagination import keyset_page
+
+logger = logging.getLogger(__name__)
+
+rides = Ride.__table__
+rides_archive = RideArchive.__table__
+COLUMNS = [column.name for column in rides.columns]
+
+# Rides in these states never change again, so they can leave the hot table
+FINISHED_STATUSES = (RideStatus.COMPLETED, RideStatus.CANCELLED)
+
+def across_archive(build: Callable[[type], Select]) -> Select:
+    """UNION ALL of `build(Ride)` and `build(RideArchive)`; order and limit the result yourself"""
+    return union_all(build(Ride), build(RideArchive))
+
+def ride_history_query(
+    user_column: str,
+    user_id: int,
+    cursor: Optional[str],
+    limit: int,
+    columns: Optional[Sequence[str]] = None
+) -> Select:
+    """One keyset page of a user's rides from both tables
+
+    Loaded as Ride objects, or as rows of just `columns` (which must include
+    created_at and id) when given. Each side is an ordered, limited scan of
+    its own (user, created_at, id) index; the outer query merges them and
+    keeps the top `limit + 1`.
+    """
+    def page(model):
+        selected = [getattr(model, name) for name in columns] if columns else [model]
+        stmt = select(*selected).where(getattr(model, user_column) == user_id)
+        return keyset_page(stmt, model.created_at, model.id, cursor, limit).subquery().select()
+
+    merged = across_archive(page).subquery()
+    if columns:
+        return select(merged).order_by(merged.c.created_at.desc(), merged.c.id.desc()).limit(limit + 1)
+    ride = aliased(Ride, merged)
+    return select(ride).order_by(ride.created_at.desc(), ride.id.desc()).limit(limit + 1)
+
+async def find_ride(db: AsyncSession, ride_id: int) -> Optional[Union[Ride, RideArchive]]:
+    """Look a ride up by id in the hot table, then in the archive"""
+    ride = await db.get(Ride, ride_id)
+    if ride is None:
+        ride = await db.get(RideArchive, ride_id)
+    return ride
+
+class RideArchiver:
+    """Moves finished rides older than `after_days` from rides to rides_archive.
+
+    Work is done in batches of at most `batch_size` rides, each its own short
+    transaction, with a pause in between so a backlog never holds locks or
+    saturates the primary for long. On Postgres a batch is one statement: the
+    candidates are picked FOR UPDATE SKIP LOCKED and deleted, and the deleted
+    rows are inserted into the archive. Every worker runs an archiver; SKIP
+    LOCKED keeps them from waiting on each other or on requests.
+    """
+
+    def __init__(
+        self,
+        after_days: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        interval: Optional[float] = None,
+        pause: Optional[float] = None
+    ):
+        self.after_days = after_days if after_days is not None else settings.RIDE_ARCHIVE_AFTER_DAYS
+        self.batch_size = batch_size or settings.RIDE_ARCHIVE_BATCH_SIZE
+        self.interval = interval or settings.RIDE_ARCHIVE_INTERVAL_SECONDS
+        self.pause = pause if pause is not None else settings.RIDE_ARCHIVE_BATCH_PAUSE_SECONDS
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Metrics
+        self.runs = 0
+        self.batches = 0
+        self.rides_archived = 0
+        self.errors = 0
+        self.last_run_rides = 0
+        self.last_batch_ms = 0.0
+        self.max_batch_ms = 0.0
+
+    def archive_batch(self, cutoff: datetime) -> int:
+        """Move one batch of finished rides created before `cutoff`; returns how many moved"""
+        started = time.perf_counter()
+        candidates = (
+            select(rides.c.id)
+            .where(rides.c.status.in_(FINISHED_STATUSES), rides.c.created_at < cutoff)
+            .limit(self.batch_size)
+        )
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                moved = (
+                    delete(rides)
+                    .where(rides.c.id.in_(candidates.with_for_update(skip_locked=True)))
+                    .returning(*rides.c)
+                    .cte("moved")
+                )
+                count = conn.execute(
+                    insert(rides_archive).from_select(COLUMNS, select(*[moved.c[name] for name in COLUMNS]))
+                ).rowcount
+            else:
+                ids = conn.execute(candidates).scalars().all()
+                if ids:
+                    conn.execute(insert(rides_archive).from_select(COLUMNS, select(rides).where(rides.c.id.in_(ids))))
+                    conn.execute(delete(rides).where(rides.c.id.in_(ids)))
+                count = len(ids)
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.batches += 1
+        self.rides_archived += count
+        self.last_batch_ms = elapsed
+        self.max_batch_ms = max(self.max_batch_ms, elapsed)
+        return count
+
+    def archive(self) -> int:
+        """Archive batches until the backlog is drained; returns how many rides moved"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.after_days)
+        total = 0
+        try:
+            while not self._stopping:
+                count = self.archive_batch(cutoff)
+                total += count
+                if count < self.batch_size:
+                    break
+                time.sleep(self.pause)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Ride archiving stopped after {total} rides: {e}")
+        self.runs += 1
+        self.last_run_rides = total
+        return total
+
+    async def run(self) -> None:
+        """Archive on the configured interval until cancelled"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await loop.run_in_executor(None, self.archive)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start the background archive loop, unless archiving is disabled"""
+        if self._task is None and self.after_days > 0:
+            self._stopping = False
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the archive loop; a batch already running finishes first"""
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> Dict:
+        """Batch counts and latency"""
+        return {
+            "enabled": self.after_days > 0,
+            "after_days": self.after_days,
+            "runs": self.runs,
+            "batches": self.batches,
+            "rides_archived": self.rides_archived,
+            "last_run_rides": self.last_run_rides,
+            "errors": self.errors,
+            "last_batch_ms": round(self.last_batch_ms, 3),
+            "max_batch_ms": round(self.max_batch_ms, 3)
+        }
+
+# Global instance
+ride_archiver = RideArchiver()
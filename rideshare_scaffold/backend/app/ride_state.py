@@ -0,0 +1,100 @@
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import Ride, RideStatus, RIDE_TRANSITIONS
+
+async def transition_ride(
+    db: AsyncSession,
+    ride_id: int,
+    new_status: RideStatus,
+    actor_id: Optional[int] = None,
+    expected_version: Optional[int] = None,
+    accepting_driver_id: Optional[int] = None,
+    **values
+) -> Ride:
+    """Move a ride to `new_status` with a single conditional UPDATE ... RETURNING
+
+    The UPDATE only matches while the ride is in a status that may legally move
+    to `new_status` (and, when given, still at `expected_version`), so of two
+    concurrent transitions exactly one wins. The loser gets a 409.
+
+    Args:
+        db: Database session; the caller commits
+        ride_id: Ride to transition
+        new_status: Target status
+        actor_id: If set, the user must be the ride's rider or driver
+        expected_version: If set, the ride must still be at this version
+        accepting_driver_id: If set, assign this driver to an unassigned ride
+        **values: Extra columns to set in the same statement
+
+    Returns:
+        Ride: The updated ride
+    """
+    sources = [source for source, targets in RIDE_TRANSITIONS.items() if new_status in targets]
+
+    conditions = [Ride.id == ride_id, Ride.status.in_(sources)]
+    if actor_id is not None:
+        conditions.append(or_(Ride.rider_id == actor_id, Ride.driver_id == actor_id))
+    if expected_version is not None:
+        conditions.append(Ride.version == expected_version)
+    if accepting_driver_id is not None:
+        conditions.append(Ride.driver_id.is_(None))
+        values["driver_id"] = accepting_driver_id
+
+    stmt = (
+        update(Ride)
+        .where(*conditions)
+        .values(status=new_status, version=Ride.version + 1, **values)
+        .returning(Ride)
+        .execution_options(synchronize_session=False)
+    )
+    ride = (await db.scalars(stmt)).first()
+    if ride is not None:
+        # The other party reads this ride next too; keep both on the primary once it commits
+        db.info.setdefault("pin_user_ids", set()).update(
+            user_id for user_id in (ride.rider_id, ride.driver_id) if user_id is not None
+        )
+        return ride
+
+    await db.rollback()
+    await _raise_transition_failure(db, ride_id, new_status, actor_id, expected_version)
+
+async def _raise_transition_failure(
+    db: AsyncSession,
+    ride_id: int,
+    new_status: RideStatus,
+    actor_id: Optional[int],
+    expected_version: Optional[int]
+) -> None:
+    """Explain why a conditional transition matched no rows (failure path only)"""
+    current = (await db.execute(
+        select(Ride.status, Ride.version, Ride.rider_id, Ride.driver_id).where(Ride.id == ride_id)
+    )).first()
+
+    if current is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ride not found"
+        )
+
+    if actor_id is not None and actor_id not in [current.rider_id, current.driver_id]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to update this ride"
+        )
+
+    if expected_version is not None and current.version != expected_version:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Ride was modified concurrently (current version {current.version})"
+        )
+
+    if new_status == RideStatus.ACCEPTED:
+        detail = "Ride is not available for acceptance"
+    else:
+        detail = f"Ride cannot move from {current.status.value} to {new_status.value}"
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=detail
+    )
@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from datetime import timedelta
 from typing import Optional
 import hashlib
 import secrets
 
-from ..database import get_db
+from ..database import get_async_db
 from ..models import User, UserRole
 from ..auth import create_access_token, verify_token, get_current_user
 from ..config import settings
@@ -24,13 +25,13 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return hash_password(plain_password) == hashed_password
 
 @router.post("/register", response_model=Token)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     try:
         # Check if user already exists
-        existing_user = db.query(User).filter(
+        existing_user = await db.scalar(select(User).where(
             (User.email == user_data.email) | (User.phone == user_data.phone)
-        ).first()
+        ))
         
         if existing_user:
             raise HTTPException(
@@ -48,8 +49,8 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
         
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         
         # Create access token
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -70,23 +71,23 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         }
         
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User with this email or phone already exists"
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create user"
         )
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     """Login user with email and password"""
     # Find user by email
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = await db.scalar(select(User).where(User.email == form_data.username))
     
     if not user or not verify_password(form_data.password, user.password_hash):
         raise HTTPException(
@@ -114,11 +115,11 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
     }
 
 @router.post("/google", response_model=Token)
-async def google_auth(google_user: GoogleUser, db: Session = Depends(get_db)):
+async def google_auth(google_user: GoogleUser, db: AsyncSession = Depends(get_async_db)):
     """Authenticate user with Google OAuth"""
     try:
         # Check if user already exists
-        user = db.query(User).filter(User.email == google_user.email).first()
+        user = await db.scalar(select(User).where(User.email == google_user.email))
         
         if not user:
             # Create new user from Google data
@@ -130,8 +131,8 @@ async def google_auth(google_user: GoogleUser, db: Session = Depends(get_db)):
             )
             
             db.add(new_user)
-            db.commit()
-            db.refresh(new_user)
+            await db.commit()
+            await db.refresh(new_user)
             user = new_user
         
         # Create access token
@@ -153,7 +154,7 @@ async def google_auth(google_user: GoogleUser, db: Session = Depends(get_db)):
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to authenticate with Google"
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from ..database import get_db
+from ..database import get_async_db
 from ..models import User, DriverProfile, UserRole
-from ..schemas import DriverProfileCreate, DriverProfileResponse, DriverLocationUpdate, DriverOnlineStatus, StripeConnectResponse
-from ..auth import get_current_user
+from ..schemas import DriverProfileCreate, DriverProfileResponse, DriverLocationUpdate, DriverOnlineStatus, DriverEarningsResponse, StripeConnectResponse
+from ..auth import get_current_user, get_current_principal, get_read_db
+from ..principal_cache import Principal
 from ..stripe_service import StripeService
-from ..socket_manager import sio
+from ..socket_manager import sio, publish_driver_location
+from ..location_store import location_store
+from ..surge import surge_engine
+from ..config import settings
+from ..driver_stats import driver_earnings, record_online_session
 
 router = APIRouter(prefix="/drivers", tags=["drivers"])
 
@@ -14,7 +21,7 @@ router = APIRouter(prefix="/drivers", tags=["drivers"])
 async def create_driver_profile(
     profile: DriverProfileCreate, 
     current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create driver profile"""
     try:
@@ -26,7 +33,7 @@ async def create_driver_profile(
             )
         
         # Check if profile already exists
-        existing_profile = db.query(DriverProfile).filter(DriverProfile.user_id == current_user.id).first()
+        existing_profile = await db.scalar(select(DriverProfile).where(DriverProfile.user_id == current_user.id))
         if existing_profile:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -50,8 +57,8 @@ async def create_driver_profile(
         )
         
         db.add(driver_profile)
-        db.commit()
-        db.refresh(driver_profile)
+        await db.commit()
+        await db.refresh(driver_profile)
         
         return DriverProfileResponse.from_orm(driver_profile)
     except HTTPException:
@@ -63,7 +70,7 @@ async def create_driver_profile(
         )
 
 @router.get("/profile", response_model=DriverProfileResponse)
-async def get_driver_profile(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_driver_profile(current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_read_db)):
     """Get driver profile"""
     try:
         # Verify user is a driver
@@ -73,14 +80,52 @@ async def get_driver_profile(current_user: User = Depends(get_current_user), db:
                 detail="Only drivers can access driver profiles"
             )
         
-        driver_profile = db.query(DriverProfile).filter(DriverProfile.user_id == current_user.id).first()
+        driver_profile = await db.scalar(select(DriverProfile).where(DriverProfile.user_id == current_user.id))
         if not driver_profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Driver profile not found"
             )
         
-        return DriverProfileResponse.from_orm(driver_profile)
+        response = DriverProfileResponse.from_orm(driver_profile)
+        
+        # Prefer a ping that has not been flushed to the database yet
+        pending = location_store.latest(current_user.id)
+        if pending:
+            response.current_latitude, response.current_longitude = pending
+        
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@router.get("/earnings", response_model=DriverEarningsResponse)
+async def get_driver_earnings(
+    days: int = Query(default=7, ge=1, le=settings.EARNINGS_MAX_DAYS),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get lifetime totals and per-day earnings for the last `days` UTC days"""
+    try:
+        # Verify user is a driver
+        if current_user.role.value != "driver":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only drivers can view earnings"
+            )
+        
+        earnings = await driver_earnings(db, current_user.id, days)
+        if earnings is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Driver profile not found"
+            )
+        
+        return DriverEarningsResponse(**earnings)
     except HTTPException:
         raise
     except Exception as e:
@@ -92,8 +137,8 @@ async def get_driver_profile(current_user: User = Depends(get_current_user), db:
 @router.put("/profile", response_model=DriverProfileResponse)
 async def update_driver_profile(
     profile: DriverProfileCreate, 
-    current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal), 
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update driver profile"""
     try:
@@ -104,7 +149,7 @@ async def update_driver_profile(
                 detail="Only drivers can update driver profiles"
             )
         
-        driver_profile = db.query(DriverProfile).filter(DriverProfile.user_id == current_user.id).first()
+        driver_profile = await db.scalar(select(DriverProfile).where(DriverProfile.user_id == current_user.id))
         if not driver_profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -117,8 +162,8 @@ async def update_driver_profile(
         driver_profile.vehicle_year = profile.vehicle_year
         driver_profile.license_plate = profile.license_plate
         
-        db.commit()
-        db.refresh(driver_profile)
+        await db.commit()
+        await db.refresh(driver_profile)
         
         return DriverProfileResponse.from_orm(driver_profile)
     except HTTPException:
@@ -132,8 +177,8 @@ async def update_driver_profile(
 @router.post("/online")
 async def go_online(
     location: DriverLocationUpdate, 
-    current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal), 
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Set driver as online"""
     try:
@@ -144,19 +189,23 @@ async def go_online(
                 detail="Only drivers can go online"
             )
         
-        driver_profile = db.query(DriverProfile).filter(DriverProfile.user_id == current_user.id).first()
+        driver_profile = await db.scalar(select(DriverProfile).where(DriverProfile.user_id == current_user.id))
         if not driver_profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Driver profile not found"
             )
         
-        # Update profile
+        # Update profile; going online twice keeps the session that is already open
+        location_store.forget(current_user.id)
+        if not driver_profile.is_online or driver_profile.online_since is None:
+            driver_profile.online_since = datetime.now(timezone.utc)
         driver_profile.is_online = True
         driver_profile.current_latitude = location.latitude
         driver_profile.current_longitude = location.longitude
         
-        db.commit()
+        await db.commit()
+        surge_engine.driver_online(current_user.id, location.latitude, location.longitude)
         
         # Notify via Socket.IO
         await sio.emit('driver_online', {
@@ -175,7 +224,7 @@ async def go_online(
         )
 
 @router.post("/offline")
-async def go_offline(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def go_offline(current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_async_db)):
     """Set driver as offline"""
     try:
         # Verify user is a driver
@@ -185,17 +234,21 @@ async def go_offline(current_user: User = Depends(get_current_user), db: Session
                 detail="Only drivers can go offline"
             )
         
-        driver_profile = db.query(DriverProfile).filter(DriverProfile.user_id == current_user.id).first()
+        driver_profile = await db.scalar(select(DriverProfile).where(DriverProfile.user_id == current_user.id))
         if not driver_profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Driver profile not found"
             )
         
-        # Update profile
+        # Update profile and fold the finished session into the daily rollups
+        if driver_profile.online_since is not None:
+            await record_online_session(db, current_user.id, driver_profile.online_since)
+            driver_profile.online_since = None
         driver_profile.is_online = False
         
-        db.commit()
+        await db.commit()
+        surge_engine.driver_offline(current_user.id)
         
         # Notify via Socket.IO
         await sio.emit('driver_offline', {
@@ -214,8 +267,8 @@ async def go_offline(current_user: User = Depends(get_current_user), db: Session
 @router.put("/location")
 async def update_location(
     location: DriverLocationUpdate, 
-    current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update driver location"""
     try:
@@ -226,25 +279,19 @@ async def update_location(
                 detail="Only drivers can update location"
             )
         
-        driver_profile = db.query(DriverProfile).filter(DriverProfile.user_id == current_user.id).first()
-        if not driver_profile:
+        # Cached per driver, so the session only connects for a driver's first ping
+        if not await location_store.has_profile(db, current_user.id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Driver profile not found"
             )
         
-        # Update location
-        driver_profile.current_latitude = location.latitude
-        driver_profile.current_longitude = location.longitude
+        # Buffer the ping; it reaches driver_profiles in the next bulk flush
+        location_store.record(current_user.id, location.latitude, location.longitude)
+        surge_engine.move_driver(current_user.id, location.latitude, location.longitude)
         
-        db.commit()
-        
-        # Notify via Socket.IO
-        await sio.emit('update_location', {
-            'user_id': current_user.id,
-            'latitude': location.latitude,
-            'longitude': location.longitude
-        })
+        # Forward to the rider of the driver's active ride, coalesced per tick
+        await publish_driver_location(current_user.id, location.latitude, location.longitude)
         
         return {"message": "Location updated successfully"}
     except HTTPException:
@@ -256,7 +303,7 @@ async def update_location(
         )
 
 @router.get("/stripe-connect", response_model=StripeConnectResponse)
-async def get_stripe_connect_link(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_stripe_connect_link(current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_async_db)):
     """Get Stripe Connect onboarding link"""
     try:
         # Verify user is a driver
@@ -266,7 +313,7 @@ async def get_stripe_connect_link(current_user: User = Depends(get_current_user)
                 detail="Only drivers can access Stripe Connect"
             )
         
-        driver_profile = db.query(DriverProfile).filter(DriverProfile.user_id == current_user.id).first()
+        driver_profile = await db.scalar(select(DriverProfile).where(DriverProfile.user_id == current_user.id))
         if not driver_profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..auth import get_current_principal
+from ..database import get_async_db
+from ..principal_cache import Principal
+from ..exports import EXPORT_FORMAT_PATTERN, export_response, ride_export_query, tip_export_query
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+async def get_export_principal(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """The caller, with the request session closed again
+
+    On a principal cache miss the lookup leaves that session holding a
+    connection in an open transaction, and FastAPI only closes it after the
+    response body is sent; the stream reads through its own session.
+    """
+    await db.close()
+    return current_user
+
+@router.get("/rides")
+async def export_rides(
+    format: str = Query(default="csv", pattern=EXPORT_FORMAT_PATTERN),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: Principal = Depends(get_export_principal)
+):
+    """Stream the user's rides created in [start, end) as CSV or NDJSON"""
+    try:
+        column = "rider_id" if current_user.role.value == "rider" else "driver_id"
+        return export_response(ride_export_query(start, end, column, current_user.id), format, "rides")
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@router.get("/tips")
+async def export_tips(
+    format: str = Query(default="csv", pattern=EXPORT_FORMAT_PATTERN),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: Principal = Depends(get_export_principal)
+):
+    """Stream the tips the user gave or received in [start, end) as CSV or NDJSON"""
+    try:
+        return export_response(tip_export_query(start, end, current_user.id), format, "tips")
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from ..auth import require_ops_key
+from ..exports import EXPORT_FORMAT_PATTERN, export_response, ride_export_query, tip_export_query
+from ..socket_manager import heatmap_publisher
+
+router = APIRouter(prefix="/ops", tags=["ops"], dependencies=[Depends(require_ops_key)])
+
+@router.get("/heatmap")
+async def get_heatmap():
+    """Open ride requests, idle drivers and surge per grid cell"""
+    return await heatmap_publisher.snapshot()
+
+@router.get("/exports/rides")
+async def export_all_rides(
+    format: str = Query(default="csv", pattern=EXPORT_FORMAT_PATTERN),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """Stream every ride created in [start, end) for finance"""
+    return export_response(ride_export_query(start, end), format, "rides")
+
+@router.get("/exports/tips")
+async def export_all_tips(
+    format: str = Query(default="csv", pattern=EXPORT_FORMAT_PATTERN),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """Stream every tip created in [start, end) for finance"""
+    return export_response(tip_export_query(start, end), format, "tips")
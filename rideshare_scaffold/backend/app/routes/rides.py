@@ -1,55 +1,65 @@
-import math
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_db
-from ..models import User, Ride, RideStatus, DriverProfile
-from ..schemas import RideRequest, RideQuoteResponse, RideResponse, RideStatusUpdate
-from ..auth import get_current_user
+import logging
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from ..database import get_async_db
+from ..models import Ride, RideStatus, DriverProfile
+from ..schemas import RideRequest, RideQuoteResponse, RideQuoteBatchRequest, RideQuoteBatchResponse, RideResponse, RidePage, RideStatusUpdate
+from ..auth import get_current_principal, get_read_db
+from ..principal_cache import Principal
 from ..stripe_service import StripeService
-from ..socket_manager import sio, get_online_drivers
+from ..socket_manager import offer_ride, join_ride_room, notify_ride_accepted, notify_ride_status
 from ..config import settings
+from ..pagination import page_of
+from ..pricing import quote_list
+from ..quote_cache import quote_cache
+from ..ride_archive import find_ride, ride_history_query
+from ..ride_state import transition_ride
+from ..serialization import page_response
+from ..driver_stats import record_ride_completed
 
-router = APIRouter(prefix="/rides", tags=["rides"])
+logger = logging.getLogger(__name__)
 
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate distance between two points in miles using Haversine formula"""
-    R = 3959  # Earth's radius in miles
-    
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    
-    return R * c
+router = APIRouter(prefix="/rides", tags=["rides"])
 
-def calculate_fare(distance_miles: float) -> float:
-    """Calculate ride fare based on distance"""
-    return settings.BASE_FARE + (distance_miles * settings.PER_MILE_RATE)
+def quote_pairs(pairs) -> List[dict]:
+    """Quote many pickup/dropoff pairs with one vectorized pass over the batch"""
+    return quote_list(
+        [pair.pickup_latitude for pair in pairs],
+        [pair.pickup_longitude for pair in pairs],
+        [pair.dropoff_latitude for pair in pairs],
+        [pair.dropoff_longitude for pair in pairs]
+    )
 
 @router.post("/quote", response_model=RideQuoteResponse)
-async def get_ride_quote(request: RideRequest, current_user: User = Depends(get_current_user)):
+async def get_ride_quote(request: RideRequest, current_user: Principal = Depends(get_current_principal)):
     """Get ride quote based on pickup and dropoff locations"""
     try:
-        # Calculate distance
-        distance_miles = calculate_distance(
-            request.pickup_latitude, request.pickup_longitude,
-            request.dropoff_latitude, request.dropoff_longitude
+        return RideQuoteResponse(**quote_cache.get_or_quote(
+            request.pickup_latitude,
+            request.pickup_longitude,
+            request.dropoff_latitude,
+            request.dropoff_longitude
+        ))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
         )
-        
-        # Calculate fare
-        fare = calculate_fare(distance_miles)
-        
-        # Estimate time (rough calculation: 1 mile = 2 minutes in city)
-        estimated_time_minutes = int(distance_miles * 2)
-        
-        return RideQuoteResponse(
-            fare=fare,
-            distance_miles=distance_miles,
-            estimated_time_minutes=estimated_time_minutes
+
+@router.post("/quote/batch", response_model=RideQuoteBatchResponse)
+async def get_ride_quote_batch(request: RideQuoteBatchRequest, current_user: Principal = Depends(get_current_principal)):
+    """Get ride quotes for many pickup/dropoff pairs in one call"""
+    if len(request.pairs) > settings.QUOTE_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch size cannot exceed {settings.QUOTE_BATCH_MAX_SIZE} pairs"
         )
+    
+    try:
+        return {"quotes": quote_pairs(request.pairs)}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -57,7 +67,7 @@ async def get_ride_quote(request: RideRequest, current_user: User = Depends(get_
         )
 
 @router.post("/request", response_model=RideResponse)
-async def request_ride(request: RideRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def request_ride(request: RideRequest, current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_async_db)):
     """Request a new ride"""
     try:
         # Verify user is a rider
@@ -67,12 +77,15 @@ async def request_ride(request: RideRequest, current_user: User = Depends(get_cu
                 detail="Only riders can request rides"
             )
         
-        # Calculate fare
-        distance_miles = calculate_distance(
-            request.pickup_latitude, request.pickup_longitude,
-            request.dropoff_latitude, request.dropoff_longitude
+        # Charge exactly what /quote showed for this pickup and dropoff
+        quote = quote_cache.get_or_quote(
+            request.pickup_latitude,
+            request.pickup_longitude,
+            request.dropoff_latitude,
+            request.dropoff_longitude
         )
-        fare = calculate_fare(distance_miles)
+        distance_miles = quote["distance_miles"]
+        fare = quote["fare"]
         
         # Create ride record
         ride = Ride(
@@ -89,11 +102,12 @@ async def request_ride(request: RideRequest, current_user: User = Depends(get_cu
         )
         
         db.add(ride)
-        db.commit()
-        db.refresh(ride)
+        await db.commit()
+        await db.refresh(ride)
         
-        # Broadcast ride request to online drivers via Socket.IO
-        await sio.emit('request_ride', {
+        # Offer ride request to the nearest online drivers via Socket.IO
+        await join_ride_room(ride.id, current_user.id)
+        await offer_ride({
             'ride_id': ride.id,
             'pickup_latitude': ride.pickup_latitude,
             'pickup_longitude': ride.pickup_longitude,
@@ -111,8 +125,15 @@ async def request_ride(request: RideRequest, current_user: User = Depends(get_cu
             detail=str(e)
         )
 
+def cancel_unused_payment_intent(payment_intent_id: str) -> None:
+    """Cancel the intent of an accept that lost; if that fails the uncaptured intent just expires"""
+    try:
+        StripeService.cancel_payment_intent(payment_intent_id)
+    except Exception as e:
+        logger.error(f"Failed to cancel unused payment intent {payment_intent_id}: {e}")
+
 @router.post("/{ride_id}/accept")
-async def accept_ride(ride_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def accept_ride(ride_id: int, current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_async_db)):
     """Accept a ride request (driver only)"""
     try:
         # Verify user is a driver
@@ -123,49 +144,39 @@ async def accept_ride(ride_id: int, current_user: User = Depends(get_current_use
             )
         
         # Check if driver has a profile
-        driver_profile = db.query(DriverProfile).filter(DriverProfile.user_id == current_user.id).first()
+        driver_profile = await db.scalar(select(DriverProfile).where(DriverProfile.user_id == current_user.id))
         if not driver_profile:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Driver profile not found"
             )
         
-        # Get ride
-        ride = db.query(Ride).filter(Ride.id == ride_id).first()
-        if not ride:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Ride not found"
-            )
-        
-        if ride.status != RideStatus.REQUESTED:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Ride is not available for acceptance"
-            )
-        
-        # Update ride
-        ride.driver_id = current_user.id
-        ride.status = RideStatus.ACCEPTED
-        
-        # Create PaymentIntent with transfer to driver
-        if driver_profile.stripe_account_id:
+        # Create PaymentIntent with transfer to driver before claiming, so a
+        # Stripe failure leaves the ride REQUESTED and the driver can retry
+        values = {}
+        fare = await db.scalar(
+            select(Ride.fare).where(Ride.id == ride_id, Ride.status == RideStatus.REQUESTED, Ride.driver_id.is_(None))
+        )
+        if driver_profile.stripe_account_id and fare is not None:
             payment_intent = StripeService.create_payment_intent(
-                amount=int(ride.fare * 100),  # Convert to cents
+                amount=int(fare * 100),  # Convert to cents
                 driver_account_id=driver_profile.stripe_account_id,
                 application_fee_amount=0,  # 0% platform fee
-                metadata={"ride_id": str(ride.id)}
+                metadata={"ride_id": str(ride_id)}
             )
-            ride.payment_intent_id = payment_intent["payment_intent_id"]
+            values["payment_intent_id"] = payment_intent["payment_intent_id"]
         
-        db.commit()
-        db.refresh(ride)
+        # Claim the ride atomically; concurrent acceptors get a 409 and their intent is cancelled
+        try:
+            ride = await transition_ride(db, ride_id, RideStatus.ACCEPTED, accepting_driver_id=current_user.id, **values)
+            await db.commit()
+        except Exception:
+            if "payment_intent_id" in values:
+                cancel_unused_payment_intent(values["payment_intent_id"])
+            raise
         
         # Notify via Socket.IO
-        await sio.emit('accept_ride', {
-            'ride_id': ride.id,
-            'driver_id': current_user.id
-        })
+        await notify_ride_accepted(ride.id, current_user.id)
         
         return {"message": "Ride accepted successfully"}
     except HTTPException:
@@ -180,49 +191,45 @@ async def accept_ride(ride_id: int, current_user: User = Depends(get_current_use
 async def update_ride_status(
     ride_id: int, 
     status_update: RideStatusUpdate, 
-    current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal), 
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update ride status"""
     try:
-        # Get ride
-        ride = db.query(Ride).filter(Ride.id == ride_id).first()
-        if not ride:
+        if status_update.status == RideStatus.ACCEPTED:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Ride not found"
-            )
-        
-        # Verify user is involved in the ride
-        if current_user.id not in [ride.rider_id, ride.driver_id]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to update this ride"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Use the accept endpoint to accept a ride"
             )
         
-        # Update status
-        ride.status = status_update.status
-        
         # Handle specific status updates
+        values = {}
         if status_update.status == RideStatus.STARTED:
-            from datetime import datetime
-            ride.started_at = datetime.utcnow()
+            values["started_at"] = datetime.utcnow()
         elif status_update.status == RideStatus.COMPLETED:
-            from datetime import datetime
-            ride.completed_at = datetime.utcnow()
-            
-            # Capture payment if PaymentIntent exists
-            if ride.payment_intent_id:
-                StripeService.capture_payment_intent(ride.payment_intent_id)
+            values["completed_at"] = datetime.utcnow()
         
-        db.commit()
-        db.refresh(ride)
+        ride = await transition_ride(
+            db,
+            ride_id,
+            status_update.status,
+            actor_id=current_user.id,
+            expected_version=status_update.version,
+            **values
+        )
+        if ride.status == RideStatus.COMPLETED:
+            await record_ride_completed(db, ride)
+            # Capture before committing, so a Stripe failure leaves the ride open for a retry
+            if ride.payment_intent_id:
+                try:
+                    StripeService.capture_payment_intent(ride.payment_intent_id)
+                except Exception:
+                    await db.rollback()
+                    raise
+        await db.commit()
         
         # Notify via Socket.IO
-        await sio.emit('update_ride_status', {
-            'ride_id': ride.id,
-            'status': ride.status.value
-        })
+        await notify_ride_status(ride.id, ride.status.value, ride.driver_id)
         
         return {"message": "Ride status updated successfully"}
     except HTTPException:
@@ -234,37 +241,19 @@ async def update_ride_status(
         )
 
 @router.post("/{ride_id}/cancel")
-async def cancel_ride(ride_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def cancel_ride(ride_id: int, current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_async_db)):
     """Cancel a ride"""
     try:
-        # Get ride
-        ride = db.query(Ride).filter(Ride.id == ride_id).first()
-        if not ride:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Ride not found"
-            )
-        
-        # Verify user is involved in the ride
-        if current_user.id not in [ride.rider_id, ride.driver_id]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to cancel this ride"
-            )
+        # Update ride status
+        ride = await transition_ride(db, ride_id, RideStatus.CANCELLED, actor_id=current_user.id)
+        await db.commit()
         
         # Cancel payment if exists
         if ride.payment_intent_id:
             StripeService.cancel_payment_intent(ride.payment_intent_id)
         
-        # Update ride status
-        ride.status = RideStatus.CANCELLED
-        db.commit()
-        
         # Notify via Socket.IO
-        await sio.emit('update_ride_status', {
-            'ride_id': ride.id,
-            'status': RideStatus.CANCELLED.value
-        })
+        await notify_ride_status(ride.id, RideStatus.CANCELLED.value, ride.driver_id)
         
         return {"message": "Ride cancelled successfully"}
     except HTTPException:
@@ -275,16 +264,24 @@ async def cancel_ride(ride_id: int, current_user: User = Depends(get_current_use
             detail=str(e)
         )
 
-@router.get("/", response_model=List[RideResponse])
-async def get_user_rides(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get user's ride history"""
+@router.get("/", response_model=RidePage)
+async def get_user_rides(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get user's ride history, newest first, one page at a time"""
     try:
-        if current_user.role.value == "rider":
-            rides = db.query(Ride).filter(Ride.rider_id == current_user.id).all()
-        else:
-            rides = db.query(Ride).filter(Ride.driver_id == current_user.id).all()
+        # Finished rides older than RIDE_ARCHIVE_AFTER_DAYS live in rides_archive; read both
+        user_column = "rider_id" if current_user.role.value == "rider" else "driver_id"
+        stmt = ride_history_query(user_column, current_user.id, cursor, limit, columns=list(RideResponse.model_fields))
+        rides = (await db.execute(stmt)).all()
+        items, next_cursor = page_of(rides, limit)
         
-        return [RideResponse.from_orm(ride) for ride in rides]
+        return page_response(RideResponse, items, next_cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -292,10 +289,10 @@ async def get_user_rides(current_user: User = Depends(get_current_user), db: Ses
         )
 
 @router.get("/{ride_id}", response_model=RideResponse)
-async def get_ride(ride_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_ride(ride_id: int, current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_read_db)):
     """Get specific ride details"""
     try:
-        ride = db.query(Ride).filter(Ride.id == ride_id).first()
+        ride = await find_ride(db, ride_id)
         if not ride:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -1,24 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_db
-from ..models import User, Tip, Ride, DriverProfile
-from ..schemas import TipRequest, TipResponse
-from ..auth import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from ..database import get_async_db
+from ..models import Tip, DriverProfile
+from ..schemas import TipRequest, TipResponse, TipPage
+from ..auth import get_current_principal, get_read_db
+from ..principal_cache import Principal
 from ..stripe_service import StripeService
+from ..config import settings
+from ..pagination import keyset_page, page_of
+from ..driver_stats import record_tip
+from ..ride_archive import find_ride
+from ..serialization import columns_of, page_response
 
 router = APIRouter(prefix="/tips", tags=["tips"])
 
 @router.post("/", response_model=TipResponse)
 async def create_tip(
     tip_request: TipRequest, 
-    current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal), 
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a tip for a completed ride"""
     try:
-        # Get the ride
-        ride = db.query(Ride).filter(Ride.id == tip_request.ride_id).first()
+        # Get the ride; tips can come in after it has been archived
+        ride = await find_ride(db, tip_request.ride_id)
         if not ride:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -40,7 +47,7 @@ async def create_tip(
             )
         
         # Get driver profile
-        driver_profile = db.query(DriverProfile).filter(DriverProfile.user_id == ride.driver_id).first()
+        driver_profile = await db.scalar(select(DriverProfile).where(DriverProfile.user_id == ride.driver_id))
         if not driver_profile or not driver_profile.stripe_account_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -69,8 +76,9 @@ async def create_tip(
         )
         
         db.add(tip)
-        db.commit()
-        db.refresh(tip)
+        await record_tip(db, tip)
+        await db.commit()
+        await db.refresh(tip)
         
         return TipResponse.from_orm(tip)
     except HTTPException:
@@ -81,21 +89,29 @@ async def create_tip(
             detail=str(e)
         )
 
-@router.get("/", response_model=List[TipResponse])
-async def get_user_tips(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get user's tip history"""
+@router.get("/", response_model=TipPage)
+async def get_user_tips(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get user's tip history (given and, for drivers, received), newest first"""
     try:
-        # Get tips given by user
-        tips_given = db.query(Tip).filter(Tip.from_user_id == current_user.id).all()
+        stmt = keyset_page(select(*columns_of(TipResponse, Tip)).where(Tip.from_user_id == current_user.id), Tip.created_at, Tip.id, cursor, limit)
         
-        # Get tips received by user (if driver)
-        tips_received = []
         if current_user.role.value == "driver":
-            tips_received = db.query(Tip).filter(Tip.to_user_id == current_user.id).all()
+            # Each side is an ordered, limited scan of its own index; merge them and keep the top of the two
+            received = keyset_page(select(*columns_of(TipResponse, Tip)).where(Tip.to_user_id == current_user.id), Tip.created_at, Tip.id, cursor, limit)
+            merged = union_all(stmt.subquery().select(), received.subquery().select()).subquery()
+            stmt = select(merged).order_by(merged.c.created_at.desc(), merged.c.id.desc()).limit(limit + 1)
         
-        all_tips = tips_given + tips_received
+        tips = (await db.execute(stmt)).all()
+        items, next_cursor = page_of(tips, limit)
         
-        return [TipResponse.from_orm(tip) for tip in all_tips]
+        return page_response(TipResponse, items, next_cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -103,10 +119,10 @@ async def get_user_tips(current_user: User = Depends(get_current_user), db: Sess
         )
 
 @router.get("/{tip_id}", response_model=TipResponse)
-async def get_tip(tip_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_tip(tip_id: int, current_user: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_read_db)):
     """Get specific tip details"""
     try:
-        tip = db.query(Tip).filter(Tip.id == tip_id).first()
+        tip = await db.get(Tip, tip_id)
         if not tip:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
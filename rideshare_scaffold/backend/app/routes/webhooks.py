@@ -1,14 +1,16 @@
 from fastapi import APIRouter, Request, HTTPException, status, Depends
-from sqlalchemy.orm import Session
-from ..database import get_db
-from ..models import Ride, Tip
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db
+from ..models import Tip
+from ..ride_archive import find_ride
 from ..stripe_service import StripeService
 from ..config import settings
 
 router = APIRouter(prefix="/webhooks", tags=["webhooks"])
 
 @router.post("/stripe")
-async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
+async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Handle Stripe webhook events"""
     try:
         # Get the raw body
@@ -53,7 +55,7 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
             detail=str(e)
         )
 
-async def handle_payment_intent_succeeded(payment_intent: dict, db: Session):
+async def handle_payment_intent_succeeded(payment_intent: dict, db: AsyncSession):
     """Handle successful payment intent"""
     try:
         payment_intent_id = payment_intent["id"]
@@ -62,7 +64,7 @@ async def handle_payment_intent_succeeded(payment_intent: dict, db: Session):
         # Check if this is a ride payment
         if "ride_id" in metadata:
             ride_id = metadata["ride_id"]
-            ride = db.query(Ride).filter(Ride.id == ride_id).first()
+            ride = await find_ride(db, int(ride_id))
             
             if ride and ride.payment_intent_id == payment_intent_id:
                 # Payment succeeded for ride
@@ -70,7 +72,7 @@ async def handle_payment_intent_succeeded(payment_intent: dict, db: Session):
         
         # Check if this is a tip payment
         if "tip_amount" in metadata:
-            tip = db.query(Tip).filter(Tip.payment_intent_id == payment_intent_id).first()
+            tip = await db.scalar(select(Tip).where(Tip.payment_intent_id == payment_intent_id))
             
             if tip:
                 # Tip payment succeeded
@@ -79,7 +81,7 @@ async def handle_payment_intent_succeeded(payment_intent: dict, db: Session):
     except Exception as e:
         print(f"Error handling payment_intent.succeeded: {str(e)}")
 
-async def handle_payment_intent_failed(payment_intent: dict, db: Session):
+async def handle_payment_intent_failed(payment_intent: dict, db: AsyncSession):
     """Handle failed payment intent"""
     try:
         payment_intent_id = payment_intent["id"]
@@ -88,7 +90,7 @@ async def handle_payment_intent_failed(payment_intent: dict, db: Session):
         # Check if this is a ride payment
         if "ride_id" in metadata:
             ride_id = metadata["ride_id"]
-            ride = db.query(Ride).filter(Ride.id == ride_id).first()
+            ride = await find_ride(db, int(ride_id))
             
             if ride and ride.payment_intent_id == payment_intent_id:
                 # Payment failed for ride - could update ride status
@@ -96,7 +98,7 @@ async def handle_payment_intent_failed(payment_intent: dict, db: Session):
         
         # Check if this is a tip payment
         if "tip_amount" in metadata:
-            tip = db.query(Tip).filter(Tip.payment_intent_id == payment_intent_id).first()
+            tip = await db.scalar(select(Tip).where(Tip.payment_intent_id == payment_intent_id))
             
             if tip:
                 # Tip payment failed - could delete tip record
@@ -105,7 +107,7 @@ async def handle_payment_intent_failed(payment_intent: dict, db: Session):
     except Exception as e:
         print(f"Error handling payment_intent.payment_failed: {str(e)}")
 
-async def handle_account_updated(account: dict, db: Session):
+async def handle_account_updated(account: dict, db: AsyncSession):
     """Handle Stripe Connect account updates"""
     try:
         account_id = account["id"]
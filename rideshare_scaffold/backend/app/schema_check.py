@@ -0,0 +1,108 @@
+import ast
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Set
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+from .config import settings
+from .database import async_engine
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIR = Path(__file__).resolve().parent.parent / "migrations" / "versions"
+
+def migration_heads() -> Set[str]:
+    """Head revision(s) of migrations/versions, read without importing alembic
+
+    Importing alembic costs more than the rest of startup combined, and the
+    revision graph only needs each script's `revision` and `down_revision`.
+    """
+    revisions, parents = set(), set()
+    for path in VERSIONS_DIR.glob("*.py"):
+        assigned = {}
+        for node in ast.parse(path.read_text()).body:
+            if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+                if node.targets[0].id in ("revision", "down_revision"):
+                    assigned[node.targets[0].id] = ast.literal_eval(node.value)
+        if "revision" not in assigned:
+            continue
+        revisions.add(assigned["revision"])
+        down = assigned.get("down_revision")
+        parents.update(down if isinstance(down, (tuple, list)) else [down] if down else [])
+    return revisions - parents
+
+async def database_revisions() -> Set[str]:
+    """Revision(s) recorded in alembic_version; empty when the database was never migrated"""
+    async with async_engine.connect() as conn:
+        if not await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table("alembic_version")):
+            return set()
+        return set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars())
+
+class SchemaCheck:
+    """Startup check that the database is migrated to the code's head revision.
+
+    Runs once per worker: one has_table lookup and one SELECT. Schema changes
+    are applied by `alembic upgrade head` as a separate deploy step, never by
+    the app. While the database is still coming up the check retries with
+    backoff for up to SCHEMA_CHECK_TIMEOUT_SECONDS instead of failing the boot.
+    """
+
+    def __init__(self):
+        self.mode = settings.SCHEMA_REVISION_CHECK
+        self.timeout = settings.SCHEMA_CHECK_TIMEOUT_SECONDS
+
+        # Metrics
+        self.expected: Set[str] = set()
+        self.found: Set[str] = set()
+        self.ok = None
+        self.attempts = 0
+        self.check_ms = 0.0
+
+    async def run(self) -> None:
+        """Compare alembic_version with the head; raise, warn or skip per SCHEMA_REVISION_CHECK"""
+        if self.mode == "off":
+            return
+        started = time.perf_counter()
+        self.expected = migration_heads()
+        deadline = time.monotonic() + self.timeout
+        delay = 0.5
+        while True:
+            self.attempts += 1
+            try:
+                self.found = await database_revisions()
+                break
+            except (OSError, DBAPIError) as e:
+                if time.monotonic() + delay > deadline:
+                    raise
+                logger.warning(f"Database not reachable yet, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+        self.check_ms = (time.perf_counter() - started) * 1000
+        self.ok = self.found == self.expected
+        if self.ok:
+            return
+
+        if self.found:
+            message = f"Database schema is at revision {', '.join(sorted(self.found))}, this code expects {', '.join(sorted(self.expected))}; run `alembic upgrade head`"
+        else:
+            message = "Database has no alembic_version; run `alembic upgrade head` (or `alembic stamp 0001` first for a database created before migrations)"
+        if self.mode == "warn":
+            logger.warning(message)
+            return
+        raise RuntimeError(message)
+
+    def metrics(self) -> Dict:
+        """Outcome of the startup check"""
+        return {
+            "mode": self.mode,
+            "ok": self.ok,
+            "expected": sorted(self.expected),
+            "found": sorted(self.found),
+            "attempts": self.attempts,
+            "check_ms": round(self.check_ms, 3)
+        }
+
+# Global instance
+schema_check = SchemaCheck()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from .models import UserRole, RideStatus
 
 # User schemas
@@ -79,6 +79,24 @@ class DriverLocationUpdate(BaseModel):
 class DriverOnlineStatus(BaseModel):
     is_online: bool
 
+class DriverDayEarnings(BaseModel):
+    day: date  # UTC
+    rides: int
+    fare_total: float
+    tip_total: float
+    earnings: float
+    online_minutes: float
+
+class DriverEarningsResponse(BaseModel):
+    total_rides: int
+    total_earnings: float
+    rating: float
+    days: int
+    period_rides: int
+    period_earnings: float
+    period_online_minutes: float
+    by_day: List[DriverDayEarnings]  # Newest first; days without activity are omitted
+
 # Ride schemas
 class RideRequest(BaseModel):
     pickup_address: str
@@ -92,6 +110,19 @@ class RideQuoteResponse(BaseModel):
     fare: float
     distance_miles: float
     estimated_time_minutes: int
+    surge_multiplier: float = 1.0
+
+class RideQuotePair(BaseModel):
+    pickup_latitude: float
+    pickup_longitude: float
+    dropoff_latitude: float
+    dropoff_longitude: float
+
+class RideQuoteBatchRequest(BaseModel):
+    pairs: List[RideQuotePair]
+
+class RideQuoteBatchResponse(BaseModel):
+    quotes: List[RideQuoteResponse]
 
 class RideResponse(BaseModel):
     id: int
@@ -104,6 +135,7 @@ class RideResponse(BaseModel):
     dropoff_latitude: float
     dropoff_longitude: float
     status: RideStatus
+    version: int = 0
     fare: float
     distance_miles: float
     payment_intent_id: Optional[str]
@@ -114,8 +146,13 @@ class RideResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class RidePage(BaseModel):
+    items: List[RideResponse]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page; null on the last page
+
 class RideStatusUpdate(BaseModel):
     status: RideStatus
+    version: Optional[int] = None  # Reject the update if the ride has moved past this version
 
 # Tip schemas
 class TipRequest(BaseModel):
@@ -134,6 +171,10 @@ class TipResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class TipPage(BaseModel):
+    items: List[TipResponse]
+    next_cursor: Optional[str] = None
+
 # Stripe schemas
 class StripeConnectResponse(BaseModel):
     account_link: str
@@ -1,5 +1,3 @@
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, To, Content
 from .config import settings
 import logging
 
@@ -9,14 +7,19 @@ class SendGridService:
     def __init__(self):
         self.api_key = settings.SENDGRID_API_KEY
         self.from_email = settings.SENDGRID_FROM_EMAIL
-        self.client = None
-        
-        if self.api_key:
+        self._client = None
+    
+    @property
+    def client(self):
+        """SendGrid API client, created on first use so sendgrid is only imported by workers that send email"""
+        if self._client is None and self.api_key:
             try:
-                self.client = SendGridAPIClient(api_key=self.api_key)
+                from sendgrid import SendGridAPIClient
+                self._client = SendGridAPIClient(api_key=self.api_key)
                 logger.info("SendGrid client initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize SendGrid client: {e}")
+        return self._client
     
     def send_email(self, to_email: str, subject: str, content: str, content_type: str = "text/html") -> bool:
         """Send email via SendGrid"""
@@ -24,6 +27,7 @@ class SendGridService:
             logger.error("SendGrid client not initialized")
             return False
         
+        from sendgrid.helpers.mail import Mail, Email, To, Content
         try:
             from_email = Email(self.from_email)
             to_email = To(to_email)
@@ -1,16 +1,35 @@
 import socketio
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from .models import User, DriverProfile, Ride, RideStatus
+from .config import settings
+from .matching import BatchMatcher
+from .location_store import location_store
+from .location_fanout import LocationFanout
+from .presence import PresenceHeartbeat, create_presence_store
+from .surge import surge_engine
+from .heatmap import HeatmapPublisher
+from .auth import verify_ops_key
+from .pubsub import create_client_manager
+from . import wire
 
-# Create Socket.IO server
+# Create Socket.IO server; with REDIS_URL set, emits and rooms span every worker
 sio = socketio.AsyncServer(
+    client_manager=create_client_manager(),
     cors_allowed_origins="*",
     async_mode='asgi'
 )
 
-# Store connected users
+# Connections owned by this worker (sid -> user info)
 connected_users: Dict[str, Dict] = {}
-online_drivers: Dict[int, Dict] = {}
+
+# Online drivers, user sids and active rides, shared across workers
+presence = create_presence_store()
+
+# Keeps this worker's presence entries from expiring while it is alive
+presence_heartbeat = PresenceHeartbeat(presence, lambda: connected_users.values())
+
+# Ops viewers receiving heatmap deltas
+OPS_HEATMAP_ROOM = "ops:heatmap"
 
 @sio.event
 async def connect(sid, environ):
@@ -29,24 +48,31 @@ async def disconnect(sid):
         role = user_data.get('role')
         
         # Remove from online drivers if applicable
-        if role == 'driver' and user_id in online_drivers:
-            del online_drivers[user_id]
+        if role == 'driver' and await presence.remove_driver(user_id, sid=sid):
+            surge_engine.driver_offline(user_id)
+        
+        await presence.remove_user_sid(user_id, sid)
         
         del connected_users[sid]
 
 @sio.event
 async def authenticate(sid, data):
-    """Authenticate user and store connection info"""
+    """Authenticate user, store connection info and settle the wire encoding"""
     user_id = data.get('user_id')
     role = data.get('role')
+    encoding = data.get('encoding', wire.ENCODING_JSON)
+    if encoding not in wire.ENCODINGS:
+        encoding = wire.ENCODING_JSON
     
     connected_users[sid] = {
         'user_id': user_id,
         'role': role,
-        'sid': sid
+        'sid': sid,
+        'encoding': encoding
     }
+    await presence.add_user_sid(user_id, sid, encoding)
     
-    await sio.emit('authenticated', {'status': 'success'}, room=sid)
+    await sio.emit('authenticated', {'status': 'success', 'encoding': encoding}, room=sid)
 
 @sio.event
 async def driver_online(sid, data):
@@ -55,11 +81,11 @@ async def driver_online(sid, data):
     latitude = data.get('latitude')
     longitude = data.get('longitude')
     
-    online_drivers[user_id] = {
-        'sid': sid,
-        'latitude': latitude,
-        'longitude': longitude
-    }
+    user_data = connected_users.get(sid, {})
+    
+    await presence.set_driver_online(user_id, sid, latitude, longitude, user_data.get('encoding', wire.ENCODING_JSON))
+    if latitude is not None and longitude is not None:
+        surge_engine.driver_online(user_id, latitude, longitude)
     
     await sio.emit('driver_status', {'status': 'online'}, room=sid)
 
@@ -68,44 +94,41 @@ async def driver_offline(sid, data):
     """Handle driver going offline"""
     user_id = data.get('user_id')
     
-    if user_id in online_drivers:
-        del online_drivers[user_id]
+    await presence.remove_driver(user_id)
+    surge_engine.driver_offline(user_id)
     
     await sio.emit('driver_status', {'status': 'offline'}, room=sid)
 
 @sio.event
 async def update_location(sid, data):
-    """Update driver location"""
+    """Update driver location; binary clients send a wire.encode_update_location frame"""
+    if isinstance(data, (bytes, bytearray)):
+        try:
+            data = wire.decode_update_location(bytes(data))
+        except ValueError:
+            return
+    
     user_id = data.get('user_id')
     latitude = data.get('latitude')
     longitude = data.get('longitude')
     
-    if user_id in online_drivers:
-        online_drivers[user_id].update({
-            'latitude': latitude,
-            'longitude': longitude
-        })
+    if latitude is None or longitude is None:
+        return
+    
+    if await presence.update_driver_position(user_id, latitude, longitude):
+        location_store.record(user_id, latitude, longitude)
+        surge_engine.move_driver(user_id, latitude, longitude)
+        await publish_driver_location(user_id, latitude, longitude)
+
+# The ride events below only relay notifications. Socket clients are not verified,
+# so surge counters and presence change only in the REST routes after their commit.
 
 @sio.event
 async def request_ride(sid, data):
-    """Handle ride request and broadcast to nearby drivers"""
-    ride_id = data.get('ride_id')
-    pickup_lat = data.get('pickup_latitude')
-    pickup_lng = data.get('pickup_longitude')
-    dropoff_lat = data.get('dropoff_latitude')
-    dropoff_lng = data.get('dropoff_longitude')
-    fare = data.get('fare')
-    
-    # Broadcast to all online drivers
-    for driver_id, driver_data in online_drivers.items():
-        await sio.emit('ride_request', {
-            'ride_id': ride_id,
-            'pickup_latitude': pickup_lat,
-            'pickup_longitude': pickup_lng,
-            'dropoff_latitude': dropoff_lat,
-            'dropoff_longitude': dropoff_lng,
-            'fare': fare
-        }, room=driver_data['sid'])
+    """Join the rider to their ride's room; POST /rides/request dispatches it"""
+    user_data = connected_users.get(sid)
+    if user_data and data.get('ride_id') is not None:
+        await join_ride_room(data['ride_id'], user_data['user_id'])
 
 @sio.event
 async def accept_ride(sid, data):
@@ -113,19 +136,8 @@ async def accept_ride(sid, data):
     ride_id = data.get('ride_id')
     driver_id = data.get('driver_id')
     
-    # Find rider's sid
-    rider_sid = None
-    for sid, user_data in connected_users.items():
-        if user_data.get('role') == 'rider':
-            # In a real app, you'd check if this rider has the specific ride
-            rider_sid = sid
-            break
-    
-    if rider_sid:
-        await sio.emit('ride_assigned', {
-            'ride_id': ride_id,
-            'driver_id': driver_id
-        }, room=rider_sid)
+    # Notify the rider through the ride's room
+    await _emit_ride_assigned(ride_id, driver_id, skip_sid=sid)
     
     # Notify driver
     await sio.emit('ride_accepted', {
@@ -138,26 +150,8 @@ async def update_ride_status(sid, data):
     """Update ride status and notify relevant parties"""
     ride_id = data.get('ride_id')
     status = data.get('status')
-    driver_id = data.get('driver_id')
-    
-    # Find rider's sid
-    rider_sid = None
-    for sid, user_data in connected_users.items():
-        if user_data.get('role') == 'rider':
-            rider_sid = sid
-            break
     
-    if rider_sid:
-        await sio.emit('ride_status_update', {
-            'ride_id': ride_id,
-            'status': status
-        }, room=rider_sid)
-    
-    # Notify driver
-    await sio.emit('ride_status_update', {
-        'ride_id': ride_id,
-        'status': status
-    }, room=sid)
+    await _emit_ride_status(ride_id, status)
 
 @sio.event
 async def driver_location_update(sid, data):
@@ -165,25 +159,195 @@ async def driver_location_update(sid, data):
     ride_id = data.get('ride_id')
     latitude = data.get('latitude')
     longitude = data.get('longitude')
+    user_data = connected_users.get(sid)
+    
+    if user_data is None or ride_id is None or latitude is None or longitude is None:
+        return
+    
+    # Coalesced and rate-capped before it reaches the rider
+    location_fanout.submit(user_data['user_id'], ride_id, latitude, longitude)
+
+@sio.event
+async def subscribe_heatmap(sid, data):
+    """Join the ops heatmap channel and receive a full snapshot; deltas follow"""
+    if not verify_ops_key((data or {}).get('ops_key')):
+        await sio.emit('heatmap_error', {'detail': 'Invalid ops key'}, room=sid)
+        return
+    
+    await sio.enter_room(sid, OPS_HEATMAP_ROOM)
+    await sio.emit('heatmap_snapshot', await heatmap_publisher.snapshot(), room=sid)
+
+@sio.event
+async def unsubscribe_heatmap(sid, data=None):
+    """Leave the ops heatmap channel"""
+    await sio.leave_room(sid, OPS_HEATMAP_ROOM)
+
+def ride_room(ride_id: int) -> str:
+    """Socket.IO room shared by a ride's rider and assigned driver"""
+    return f"ride:{ride_id}"
+
+def ride_location_room(ride_id: int, encoding: str) -> str:
+    """Room receiving a ride's driver_location stream in one wire encoding"""
+    return f"ride:{ride_id}:location:{encoding}"
+
+async def join_ride_room(ride_id: int, user_id: int) -> None:
+    """Add every connection of a user to a ride's room and its location stream"""
+    for sid, encoding in (await presence.user_sids(user_id)).items():
+        await sio.enter_room(sid, ride_room(ride_id))
+        await sio.enter_room(sid, ride_location_room(ride_id, encoding))
+
+async def _emit_ride_assigned(ride_id: int, driver_id: int, skip_sid: Optional[str] = None) -> None:
+    await sio.emit('ride_assigned', {
+        'ride_id': ride_id,
+        'driver_id': driver_id
+    }, room=ride_room(ride_id), skip_sid=skip_sid)
+
+async def _emit_ride_status(ride_id: int, status: str) -> None:
+    await sio.emit('ride_status_update', {
+        'ride_id': ride_id,
+        'status': status
+    }, room=ride_room(ride_id))
+
+async def notify_ride_accepted(ride_id: int, driver_id: int, skip_sid: Optional[str] = None) -> None:
+    """Put the assigned driver in the ride's room and tell the rider; only after the accept committed"""
+    surge_engine.close_ride(ride_id)
+    if driver_id is not None:
+        surge_engine.driver_busy(driver_id)
+        await presence.set_driver_ride(driver_id, ride_id)
+        await join_ride_room(ride_id, driver_id)
+    
+    await _emit_ride_assigned(ride_id, driver_id, skip_sid)
+
+async def notify_ride_status(ride_id: int, status: str, driver_id: Optional[int] = None) -> None:
+    """Send a committed status change to the ride's room, closing it once the ride ends"""
+    await _emit_ride_status(ride_id, status)
+    
+    if status in (RideStatus.COMPLETED.value, RideStatus.CANCELLED.value):
+        surge_engine.close_ride(ride_id)
+        if driver_id is not None:
+            surge_engine.driver_idle(driver_id)
+        if driver_id is not None and await presence.clear_driver_ride(driver_id, ride_id):
+            location_fanout.forget(driver_id)
+        await sio.close_room(ride_room(ride_id))
+        for encoding in wire.ENCODINGS:
+            await sio.close_room(ride_location_room(ride_id, encoding))
+
+async def publish_driver_location(driver_id: int, latitude: float, longitude: float) -> None:
+    """Forward a driver's position to the rider of their active ride, if any"""
+    ride_id = await presence.get_driver_ride(driver_id)
+    if ride_id is not None:
+        location_fanout.submit(driver_id, ride_id, latitude, longitude)
+
+async def _emit_driver_location(driver_id: int, ride_id: int, latitude: float, longitude: float) -> None:
+    driver_sids = list(await presence.user_sids(driver_id))
+    await sio.emit('driver_location', {
+        'ride_id': ride_id,
+        'latitude': latitude,
+        'longitude': longitude
+    }, room=ride_location_room(ride_id, wire.ENCODING_JSON), skip_sid=driver_sids)
+    await sio.emit(
+        'driver_location',
+        wire.encode_driver_location(ride_id, latitude, longitude),
+        room=ride_location_room(ride_id, wire.ENCODING_BINARY),
+        skip_sid=driver_sids
+    )
+
+async def offer_ride(data: Dict) -> int:
+    """Dispatch a committed ride request, batching it when a matching window is configured"""
+    if data.get('pickup_latitude') is None or data.get('pickup_longitude') is None:
+        return 0
+    
+    if data.get('ride_id') is not None:
+        surge_engine.open_ride(data['ride_id'], data['pickup_latitude'], data['pickup_longitude'])
+    
+    if batch_matcher.window_seconds > 0:
+        await batch_matcher.submit(data)
+        return 0
     
-    # Find rider's sid for this specific ride
-    rider_sid = None
-    for sid, user_data in connected_users.items():
-        if user_data.get('role') == 'rider':
-            rider_sid = sid
-            break
-    
-    if rider_sid:
-        await sio.emit('driver_location', {
-            'ride_id': ride_id,
-            'latitude': latitude,
-            'longitude': longitude
-        }, room=rider_sid)
-
-def get_online_drivers() -> List[Dict]:
+    return await offer_to_nearest_drivers(data)
+
+async def offer_to_nearest_drivers(data: Dict) -> int:
+    """Offer a ride to the K nearest online drivers and return how many were notified"""
+    payload = _ride_request_payload(data)
+    
+    notified = 0
+    for distance_miles, driver_id, _, _ in await find_nearby_drivers(payload['pickup_latitude'], payload['pickup_longitude']):
+        driver_data = await presence.get_driver(driver_id)
+        if driver_data is None:
+            continue
+        await _emit_ride_request(driver_data, payload)
+        notified += 1
+    
+    return notified
+
+async def _offer_matched_ride(data: Dict, driver_id: int, distance_miles: float) -> None:
+    """Offer a batch-matched ride to its assigned driver"""
+    driver_data = await presence.get_driver(driver_id)
+    if driver_data is None:
+        await offer_to_nearest_drivers(data)
+        return
+    
+    payload = _ride_request_payload(data)
+    payload['pickup_distance_miles'] = round(distance_miles, 3)
+    await _emit_ride_request(driver_data, payload)
+
+async def _offer_unmatched_ride(data: Dict) -> None:
+    await offer_to_nearest_drivers(data)
+
+async def _emit_ride_request(driver_data: Dict, payload: Dict) -> None:
+    if driver_data.get('encoding') == wire.ENCODING_BINARY:
+        await sio.emit('ride_request', wire.encode_ride_request(payload), room=driver_data['sid'])
+    else:
+        await sio.emit('ride_request', payload, room=driver_data['sid'])
+
+def _ride_request_payload(data: Dict) -> Dict:
+    return {
+        'ride_id': data.get('ride_id'),
+        'pickup_latitude': data.get('pickup_latitude'),
+        'pickup_longitude': data.get('pickup_longitude'),
+        'dropoff_latitude': data.get('dropoff_latitude'),
+        'dropoff_longitude': data.get('dropoff_longitude'),
+        'fare': data.get('fare')
+    }
+
+async def _matching_candidates(latitude: float, longitude: float) -> List[Tuple[int, float, float]]:
+    nearby = await find_nearby_drivers(latitude, longitude, k=settings.MATCHING_CANDIDATES_PER_RIDE)
+    return [(driver_id, driver_latitude, driver_longitude) for _, driver_id, driver_latitude, driver_longitude in nearby]
+
+async def find_nearby_drivers(
+    latitude: float,
+    longitude: float,
+    k: Optional[int] = None,
+    radius_miles: Optional[float] = None
+) -> List[Tuple[float, int, float, float]]:
+    """Get (distance_miles, driver_id, latitude, longitude) for the nearest online drivers, closest first"""
+    return await presence.nearest_drivers(
+        latitude,
+        longitude,
+        k if k is not None else settings.DISPATCH_MAX_DRIVERS,
+        radius_miles if radius_miles is not None else settings.DISPATCH_RADIUS_MILES
+    )
+
+# Windowed batch matcher for peak-time dispatch (disabled when the window is 0)
+batch_matcher = BatchMatcher(
+    candidate_drivers=_matching_candidates,
+    on_match=_offer_matched_ride,
+    on_unmatched=_offer_unmatched_ride
+)
+
+# Coalesced, rate-capped driver location fan-out to ride rooms
+location_fanout = LocationFanout(emit=_emit_driver_location)
+
+async def _emit_heatmap_delta(delta: Dict) -> None:
+    await sio.emit('heatmap_delta', delta, room=OPS_HEATMAP_ROOM)
+
+# Demand/supply heatmap deltas for the ops channel
+heatmap_publisher = HeatmapPublisher(surge_engine, emit=_emit_heatmap_delta)
+
+async def get_online_drivers() -> List[Dict]:
     """Get list of online drivers"""
-    return list(online_drivers.values())
+    return await presence.online_drivers()
 
-def is_driver_online(driver_id: int) -> bool:
+async def is_driver_online(driver_id: int) -> bool:
     """Check if driver is online"""
-    return driver_id in online_drivers
+    return await presence.get_driver(driver_id) is not None
@@ -1,13 +1,19 @@
-import stripe
+from functools import lru_cache
 from typing import Optional
 from .config import settings
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+@lru_cache(maxsize=None)
+def get_stripe():
+    """The stripe module, imported and keyed on first use; it is one of the slowest imports in the app"""
+    import stripe
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    return stripe
 
 class StripeService:
     @staticmethod
     def create_connect_account(email: str, phone: str) -> dict:
         """Create Stripe Connect Express account for driver"""
+        stripe = get_stripe()
         try:
             account = stripe.Account.create(
                 type="express",
@@ -26,6 +32,7 @@ class StripeService:
     @staticmethod
     def create_account_link(account_id: str, refresh_url: str, return_url: str) -> str:
         """Create account link for driver onboarding"""
+        stripe = get_stripe()
         try:
             account_link = stripe.AccountLink.create(
                 account=account_id,
@@ -46,6 +53,7 @@ class StripeService:
         metadata: Optional[dict] = None
     ) -> dict:
         """Create PaymentIntent for ride payment"""
+        stripe = get_stripe()
         try:
             payment_intent_data = {
                 "amount": amount,
@@ -73,6 +81,7 @@ class StripeService:
     @staticmethod
     def capture_payment_intent(payment_intent_id: str) -> dict:
         """Capture authorized PaymentIntent"""
+        stripe = get_stripe()
         try:
             payment_intent = stripe.PaymentIntent.capture(payment_intent_id)
             return {"status": payment_intent.status}
@@ -82,6 +91,7 @@ class StripeService:
     @staticmethod
     def cancel_payment_intent(payment_intent_id: str) -> dict:
         """Cancel PaymentIntent"""
+        stripe = get_stripe()
         try:
             payment_intent = stripe.PaymentIntent.cancel(payment_intent_id)
             return {"status": payment_intent.status}
@@ -96,6 +106,7 @@ class StripeService:
         metadata: Optional[dict] = None
     ) -> dict:
         """Create PaymentIntent for tip payment"""
+        stripe = get_stripe()
         try:
             payment_intent_data = {
                 "amount": amount,
@@ -121,6 +132,7 @@ class StripeService:
     @staticmethod
     def verify_webhook_signature(payload: bytes, signature: str) -> dict:
         """Verify webhook signature"""
+        stripe = get_stripe()
         try:
             event = stripe.Webhook.construct_event(
                 payload, signature, settings.STRIPE_WEBHOOK_SECRET
@@ -0,0 +1,566 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from .config import settings
+from .geo import Cell, cell_for
+
+logger = logging.getLogger(__name__)
+
+# Lua helper: drop a counter when it reaches zero so HGETALL only returns live cells
+_DECREMENT = """
+local function decrement(key, cell)
+    if redis.call('HINCRBY', key, cell, -1) <= 0 then
+        redis.call('HDEL', key, cell)
+    end
+end
+"""
+
+OPEN_RIDE_SCRIPT = """
+if redis.call('HSETNX', KEYS[1], ARGV[1], ARGV[2]) == 1 then
+    redis.call('HINCRBY', KEYS[2], ARGV[2], 1)
+end
+"""
+
+CLOSE_RIDE_SCRIPT = _DECREMENT + """
+local cell = redis.call('HGET', KEYS[1], ARGV[1])
+if cell then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    decrement(KEYS[2], cell)
+end
+"""
+
+# ARGV: driver_id, mode (online|offline|busy|idle|move), cell; a driver is stored as "<cell>|<1 if idle else 0>"
+SET_DRIVER_SCRIPT = _DECREMENT + """
+local previous = redis.call('HGET', KEYS[1], ARGV[1])
+local cell, idle
+if previous then
+    local sep = string.find(previous, '|', 1, true)
+    cell, idle = string.sub(previous, 1, sep - 1), string.sub(previous, sep + 1)
+end
+local mode = ARGV[2]
+local new_cell, new_idle
+if mode == 'online' then
+    new_cell, new_idle = ARGV[3], '1'
+elseif mode == 'offline' then
+    new_cell = nil
+elseif not previous then
+    return 0
+elseif mode == 'busy' then
+    new_cell, new_idle = cell, '0'
+elseif mode == 'idle' then
+    new_cell, new_idle = cell, '1'
+else
+    new_cell, new_idle = ARGV[3], idle
+end
+if previous and new_cell == cell and new_idle == idle then
+    return 0
+end
+if previous and idle == '1' then
+    decrement(KEYS[2], cell)
+end
+if new_cell then
+    redis.call('HSET', KEYS[1], ARGV[1], new_cell .. '|' .. new_idle)
+    if new_idle == '1' then
+        redis.call('HINCRBY', KEYS[2], new_cell, 1)
+    end
+else
+    redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+# ARGV: holder id, lease ms; returns 1 when renewed, 2 when newly acquired, 0 when someone else holds it
+HOLD_LEASE_SCRIPT = """
+local holder = redis.call('GET', KEYS[1])
+if holder == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+if not holder then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 2
+end
+return 0
+"""
+
+def _encode_cell(cell: Cell) -> str:
+    return f"{cell[0]}:{cell[1]}"
+
+def _decode_cell(value: str) -> Cell:
+    row, col = value.split(":")
+    return (int(row), int(col))
+
+class RedisSurgeCounters:
+    """Surge counters shared by every worker through Redis.
+
+    Rides and drivers are hashes of id -> cell (plus an idle flag for
+    drivers), and demand and supply are hashes of cell -> count kept in step
+    with them by one Lua script per event, so a ride opened on one worker
+    drains when another closes it. The smoothed multipliers live in a hash
+    too, written by whichever worker claims the recompute each interval.
+    A lease and a sequence counter let one worker at a time publish the ops
+    heatmap.
+    """
+
+    def __init__(self, url: str, prefix: str = "valey"):
+        from redis import asyncio as aioredis
+
+        self.redis = aioredis.from_url(url, decode_responses=True)
+        self._rides_key = f"{prefix}:surge:rides"
+        self._drivers_key = f"{prefix}:surge:drivers"
+        self._demand_key = f"{prefix}:surge:demand"
+        self._supply_key = f"{prefix}:surge:supply"
+        self._multipliers_key = f"{prefix}:surge:multipliers"
+        self._recompute_key = f"{prefix}:surge:recompute"
+        self._rebuild_key = f"{prefix}:surge:rebuild"
+        self._heatmap_lease_key = f"{prefix}:heatmap:publisher"
+        self._heatmap_sequence_key = f"{prefix}:heatmap:sequence"
+        self._open_ride = self.redis.register_script(OPEN_RIDE_SCRIPT)
+        self._close_ride = self.redis.register_script(CLOSE_RIDE_SCRIPT)
+        self._set_driver = self.redis.register_script(SET_DRIVER_SCRIPT)
+        self._hold_lease = self.redis.register_script(HOLD_LEASE_SCRIPT)
+
+    async def apply(self, event: Tuple) -> None:
+        """Apply one (kind, id, mode/cell, cell) event recorded by SurgeEngine"""
+        kind = event[0]
+        if kind == "open_ride":
+            await self._open_ride(keys=[self._rides_key, self._demand_key], args=[event[1], _encode_cell(event[2])], client=self.redis)
+        elif kind == "close_ride":
+            await self._close_ride(keys=[self._rides_key, self._demand_key], args=[event[1]], client=self.redis)
+        else:
+            cell = _encode_cell(event[3]) if event[3] is not None else ""
+            await self._set_driver(keys=[self._drivers_key, self._supply_key], args=[event[1], event[2], cell], client=self.redis)
+
+    async def read(self) -> Tuple[Dict[Cell, int], Dict[Cell, int], Dict[Cell, float]]:
+        """Current demand, supply and published multipliers"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self._demand_key)
+            pipe.hgetall(self._supply_key)
+            pipe.hgetall(self._multipliers_key)
+            demand, supply, multipliers = await pipe.execute()
+        return (
+            {_decode_cell(cell): int(count) for cell, count in demand.items()},
+            {_decode_cell(cell): int(count) for cell, count in supply.items()},
+            {_decode_cell(cell): float(value) for cell, value in multipliers.items()}
+        )
+
+    async def states(self, ride_ids: Iterable[int], driver_ids: Iterable[int]) -> Tuple[Dict[int, Cell], Dict[int, Tuple[Cell, bool]]]:
+        """Shared cell of each given ride and (cell, idle) of each given driver; closed or offline ids are left out"""
+        ride_ids, driver_ids = list(ride_ids), list(driver_ids)
+        rides, drivers = {}, {}
+        if ride_ids:
+            for ride_id, cell in zip(ride_ids, await self.redis.hmget(self._rides_key, ride_ids)):
+                if cell is not None:
+                    rides[ride_id] = _decode_cell(cell)
+        if driver_ids:
+            for driver_id, state in zip(driver_ids, await self.redis.hmget(self._drivers_key, driver_ids)):
+                if state is not None:
+                    cell, idle = state.split("|")
+                    drivers[driver_id] = (_decode_cell(cell), idle == "1")
+        return rides, drivers
+
+    async def claim(self, key: str, seconds: float) -> bool:
+        """True for the one worker that gets `key` for the next `seconds`"""
+        return bool(await self.redis.set(key, 1, nx=True, px=max(1, int(seconds * 1000))))
+
+    async def claim_recompute(self, seconds: float) -> bool:
+        return await self.claim(self._recompute_key, seconds)
+
+    async def claim_rebuild(self, seconds: float) -> bool:
+        return await self.claim(self._rebuild_key, seconds)
+
+    async def hold_heatmap_lease(self, holder: str, seconds: float) -> int:
+        """Renew (1) or take (2) the heatmap publisher lease for `holder`; 0 while another worker has it"""
+        return int(await self._hold_lease(
+            keys=[self._heatmap_lease_key], args=[holder, max(1, int(seconds * 1000))], client=self.redis
+        ))
+
+    async def heatmap_sequence(self) -> int:
+        return int(await self.redis.get(self._heatmap_sequence_key) or 0)
+
+    async def next_heatmap_sequence(self) -> int:
+        return await self.redis.incr(self._heatmap_sequence_key)
+
+    async def publish_multipliers(self, multipliers: Dict[Cell, float]) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._multipliers_key)
+            if multipliers:
+                pipe.hset(self._multipliers_key, mapping={_encode_cell(cell): value for cell, value in multipliers.items()})
+            await pipe.execute()
+
+    async def replace(
+        self,
+        rides: Dict[int, Cell],
+        drivers: Dict[int, Tuple[Cell, bool]],
+        demand: Dict[Cell, int],
+        supply: Dict[Cell, int]
+    ) -> None:
+        """Overwrite the shared counters with a rebuilt state in one transaction"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._rides_key, self._drivers_key, self._demand_key, self._supply_key)
+            if rides:
+                pipe.hset(self._rides_key, mapping={ride_id: _encode_cell(cell) for ride_id, cell in rides.items()})
+            if drivers:
+                pipe.hset(self._drivers_key, mapping={
+                    driver_id: f"{_encode_cell(cell)}|{int(idle)}" for driver_id, (cell, idle) in drivers.items()
+                })
+            if demand:
+                pipe.hset(self._demand_key, mapping={_encode_cell(cell): count for cell, count in demand.items()})
+            if supply:
+                pipe.hset(self._supply_key, mapping={_encode_cell(cell): count for cell, count in supply.items()})
+            await pipe.execute()
+
+def create_surge_counters() -> Optional[RedisSurgeCounters]:
+    """Shared counters for a Redis REDIS_URL; None keeps them in this process"""
+    if settings.REDIS_URL and not settings.REDIS_URL.startswith("memory://"):
+        return RedisSurgeCounters(settings.REDIS_URL)
+    return None
+
+class SurgeEngine:
+    """Per-cell demand/supply counters and the surge multipliers derived from them.
+
+    Demand is open REQUESTED rides by pickup cell and supply is idle online
+    drivers by current cell. Every event handler sets the state of one ride or
+    driver, so repeating an event is harmless and each one touches at most two
+    counters. Multipliers are recomputed from the counters every `interval`
+    seconds, exponentially smoothed, and published as a fresh dict that fare
+    calculation reads without locking.
+
+    Cells whose counters or multiplier changed are remembered until
+    `take_changed_cells` is called, which lets the ops heatmap push deltas.
+
+    With `shared` counters (REDIS_URL set) every event is also queued for
+    Redis, where the counters span all workers. Each interval one worker
+    smooths and publishes the multipliers there, and every worker then
+    replaces its local counters and multipliers with the shared ones, so all
+    workers quote the same surge. The local counters only bridge the gap
+    between two syncs, and each sync drops the local rides and drivers that
+    another worker has since closed or taken offline.
+    """
+
+    def __init__(
+        self,
+        cell_deg: Optional[float] = None,
+        interval: Optional[float] = None,
+        smoothing: Optional[float] = None,
+        sensitivity: Optional[float] = None,
+        max_multiplier: Optional[float] = None,
+        shared: Optional[RedisSurgeCounters] = None
+    ):
+        self.cell_deg = cell_deg or settings.SURGE_CELL_DEG
+        self.interval = interval or settings.SURGE_INTERVAL_SECONDS
+        self.smoothing = smoothing or settings.SURGE_SMOOTHING
+        self.sensitivity = sensitivity or settings.SURGE_SENSITIVITY
+        self.max_multiplier = max_multiplier or settings.SURGE_MAX_MULTIPLIER
+        self.shared = shared
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._writer: Optional[asyncio.Task] = None
+
+        self.demand: Dict[Cell, int] = defaultdict(int)
+        self.supply: Dict[Cell, int] = defaultdict(int)
+        self._ride_cells: Dict[int, Cell] = {}
+        self._drivers: Dict[int, Tuple[Cell, bool]] = {}  # driver_id -> (cell, idle)
+
+        self.multipliers: Dict[Cell, float] = {}
+        self.version = 0
+        self._changed: Set[Cell] = set()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.events = 0
+        self.shared_errors = 0
+        self.last_recompute_ms = 0.0
+
+    def _cell(self, latitude: float, longitude: float) -> Cell:
+        return cell_for(latitude, longitude, self.cell_deg)
+
+    def _increment(self, counters: Dict[Cell, int], cell: Cell) -> None:
+        counters[cell] += 1
+        self._changed.add(cell)
+
+    def _decrement(self, counters: Dict[Cell, int], cell: Cell) -> None:
+        counters[cell] -= 1
+        if counters[cell] <= 0:
+            del counters[cell]
+        self._changed.add(cell)
+
+    def _share(self, *event) -> None:
+        if self.shared is not None:
+            self._outbox.put_nowait(event)
+
+    # Demand
+
+    def open_ride(self, ride_id: int, latitude: float, longitude: float) -> None:
+        """Count a REQUESTED ride at its pickup cell"""
+        self.events += 1
+        cell = self._cell(latitude, longitude)
+        self._share("open_ride", ride_id, cell)
+        if ride_id in self._ride_cells:
+            return
+        self._ride_cells[ride_id] = cell
+        self._increment(self.demand, cell)
+
+    def close_ride(self, ride_id: int) -> None:
+        """Stop counting a ride once it is accepted or cancelled"""
+        self.events += 1
+        self._share("close_ride", ride_id)
+        cell = self._ride_cells.pop(ride_id, None)
+        if cell is not None:
+            self._decrement(self.demand, cell)
+
+    # Supply
+
+    def _set_driver(self, driver_id: int, cell: Optional[Cell], idle: bool) -> None:
+        self.events += 1
+        previous = self._drivers.get(driver_id)
+        if previous is not None and previous[1]:
+            self._decrement(self.supply, previous[0])
+        if cell is None:
+            self._drivers.pop(driver_id, None)
+            return
+        self._drivers[driver_id] = (cell, idle)
+        if idle:
+            self._increment(self.supply, cell)
+
+    def driver_online(self, driver_id: int, latitude: float, longitude: float) -> None:
+        """Count a driver as idle supply at their position"""
+        cell = self._cell(latitude, longitude)
+        self._share("driver", driver_id, "online", cell)
+        self._set_driver(driver_id, cell, True)
+
+    def driver_offline(self, driver_id: int) -> None:
+        self._share("driver", driver_id, "offline", None)
+        self._set_driver(driver_id, None, False)
+
+    def driver_busy(self, driver_id: int) -> None:
+        """Take a driver out of supply while they are on a ride"""
+        self._share("driver", driver_id, "busy", None)
+        state = self._drivers.get(driver_id)
+        if state is not None:
+            self._set_driver(driver_id, state[0], False)
+
+    def driver_idle(self, driver_id: int) -> None:
+        """Return a driver to supply at their last known cell"""
+        self._share("driver", driver_id, "idle", None)
+        state = self._drivers.get(driver_id)
+        if state is not None:
+            self._set_driver(driver_id, state[0], True)
+
+    def move_driver(self, driver_id: int, latitude: float, longitude: float) -> None:
+        """Track an online driver's cell; counters change only when the cell does"""
+        cell = self._cell(latitude, longitude)
+        state = self._drivers.get(driver_id)
+        if self.shared is not None and (state is None or cell != state[0]):
+            # The driver may have gone online on another worker
+            self._share("driver", driver_id, "move", cell)
+        if state is None:
+            return
+        if cell != state[0]:
+            self._set_driver(driver_id, cell, state[1])
+
+    # Multipliers
+
+    def target_multiplier(self, demand: int, supply: int) -> float:
+        """Unsmoothed multiplier for a cell's current counters"""
+        shortfall = demand - supply
+        if shortfall <= 0:
+            return 1.0
+        return min(self.max_multiplier, 1.0 + self.sensitivity * shortfall / max(supply, 1))
+
+    def smooth(self, demand: Dict[Cell, int], supply: Dict[Cell, int], previous: Dict[Cell, float]) -> Dict[Cell, float]:
+        """Move every active cell's multiplier one smoothing step toward its target"""
+        multipliers = {}
+        for cell in set(demand) | set(previous):
+            current = previous.get(cell, 1.0)
+            target = self.target_multiplier(demand.get(cell, 0), supply.get(cell, 0))
+            smoothed = current + self.smoothing * (target - current)
+            if smoothed >= 1.01:
+                multipliers[cell] = round(smoothed, 2)
+        return multipliers
+
+    def _publish(self, multipliers: Dict[Cell, float]) -> None:
+        for cell in set(multipliers) | set(self.multipliers):
+            if multipliers.get(cell) != self.multipliers.get(cell):
+                self._changed.add(cell)
+        self.multipliers = multipliers
+        self.version += 1
+
+    def recompute(self) -> int:
+        """Smooth every active cell toward its target and publish; returns the number of surging cells"""
+        started = time.perf_counter()
+        self._publish(self.smooth(self.demand, self.supply, self.multipliers))
+        self.last_recompute_ms = (time.perf_counter() - started) * 1000
+        return len(self.multipliers)
+
+    async def sync(self) -> int:
+        """Recompute in Redis if this worker's turn, then adopt the shared counters and multipliers"""
+        started = time.perf_counter()
+        demand, supply, multipliers = await self.shared.read()
+        if await self.shared.claim_recompute(self.interval * 0.9):
+            multipliers = self.smooth(demand, supply, multipliers)
+            await self.shared.publish_multipliers(multipliers)
+
+        for counters, fresh in ((self.demand, demand), (self.supply, supply)):
+            for cell in set(counters) | set(fresh):
+                if counters.get(cell, 0) != fresh.get(cell, 0):
+                    self._changed.add(cell)
+        self.demand = defaultdict(int, demand)
+        self.supply = defaultdict(int, supply)
+        self._ride_cells, self._drivers = await self.shared.states(self._ride_cells, self._drivers)
+        self._publish(multipliers)
+        self.last_recompute_ms = (time.perf_counter() - started) * 1000
+        return len(multipliers)
+
+    def rebuild(self, rides: Iterable[Tuple[int, float, float]], drivers: Iterable[Tuple[int, float, float, bool]]) -> None:
+        """Reset the local counters to the given open rides and online (driver_id, lat, lng, idle) drivers"""
+        self.demand, self.supply = defaultdict(int), defaultdict(int)
+        self._ride_cells, self._drivers = {}, {}
+        for ride_id, latitude, longitude in rides:
+            cell = self._cell(latitude, longitude)
+            self._ride_cells[ride_id] = cell
+            self.demand[cell] += 1
+        for driver_id, latitude, longitude, idle in drivers:
+            cell = self._cell(latitude, longitude)
+            self._drivers[driver_id] = (cell, idle)
+            if idle:
+                self.supply[cell] += 1
+        self._changed.update(self.demand, self.supply)
+
+    async def rebuild_from_database(self) -> None:
+        """Recount REQUESTED rides and online drivers, so a restart does not start from zero
+
+        Only rides requested within SURGE_DEMAND_WINDOW_SECONDS count; older
+        ones were abandoned rather than still waiting. Drivers with an accepted or started ride count as busy. With shared
+        counters only the first worker to boot in a deploy overwrites Redis;
+        the others adopt its state on their first sync.
+        """
+        # Imported here so the engine itself stays importable without a database
+        from sqlalchemy import select
+        from .database import AsyncSessionLocal
+        from .models import DriverProfile, Ride, RideStatus
+
+        since = datetime.now(timezone.utc) - timedelta(seconds=settings.SURGE_DEMAND_WINDOW_SECONDS)
+        async with AsyncSessionLocal() as db:
+            rides = (await db.execute(
+                select(Ride.id, Ride.pickup_latitude, Ride.pickup_longitude)
+                .where(
+                    Ride.status == RideStatus.REQUESTED,
+                    Ride.created_at >= since,
+                    Ride.pickup_latitude.is_not(None),
+                    Ride.pickup_longitude.is_not(None)
+                )
+            )).all()
+            busy = set((await db.scalars(
+                select(Ride.driver_id)
+                .where(Ride.status.in_([RideStatus.ACCEPTED, RideStatus.ARRIVED, RideStatus.STARTED]), Ride.driver_id.is_not(None))
+            )).all())
+            drivers = (await db.execute(
+                select(DriverProfile.user_id, DriverProfile.current_latitude, DriverProfile.current_longitude)
+                .where(DriverProfile.is_online, DriverProfile.current_latitude.is_not(None), DriverProfile.current_longitude.is_not(None))
+            )).all()
+
+        self.rebuild(rides, [(driver_id, latitude, longitude, driver_id not in busy) for driver_id, latitude, longitude in drivers])
+        self.recompute()
+        if self.shared is not None and await self.shared.claim_rebuild(60):
+            await self.shared.replace(self._ride_cells, self._drivers, self.demand, self.supply)
+
+    def multiplier(self, latitude: float, longitude: float) -> float:
+        """Published multiplier for the cell containing a point"""
+        return self.multipliers.get(self._cell(latitude, longitude), 1.0)
+
+    def multiplier_array(self, latitudes, longitudes) -> np.ndarray:
+        """Published multipliers for many points"""
+        multipliers = self.multipliers
+        if not multipliers:
+            return np.ones(np.shape(latitudes))
+        return np.array([
+            multipliers.get(self._cell(latitude, longitude), 1.0)
+            for latitude, longitude in zip(np.ravel(latitudes).tolist(), np.ravel(longitudes).tolist())
+        ])
+
+    def summarize(self, cell: Cell, demand: Dict[Cell, int], supply: Dict[Cell, int], multipliers: Dict[Cell, float]) -> Dict:
+        """Counts and multiplier for one cell of the given state, keyed by its center point"""
+        return {
+            "cell": list(cell),
+            "latitude": round((cell[0] + 0.5) * self.cell_deg, 6),
+            "longitude": round((cell[1] + 0.5) * self.cell_deg, 6),
+            "open_rides": demand.get(cell, 0),
+            "idle_drivers": supply.get(cell, 0),
+            "multiplier": multipliers.get(cell, 1.0)
+        }
+
+    def cell_summary(self, cell: Cell) -> Dict:
+        """Counts and multiplier for one cell, keyed by its center point"""
+        return self.summarize(cell, self.demand, self.supply, self.multipliers)
+
+    def snapshot(self) -> List[Dict]:
+        """Every non-empty cell; O(cells), independent of ride and driver counts"""
+        cells = set(self.demand) | set(self.supply) | set(self.multipliers)
+        return [self.cell_summary(cell) for cell in cells]
+
+    def take_changed_cells(self) -> List[Dict]:
+        """Current state of every cell changed since the last call (zeros mean the cell emptied)"""
+        changed, self._changed = self._changed, set()
+        return [self.cell_summary(cell) for cell in changed]
+
+    async def run(self) -> None:
+        """Recompute (or sync) multipliers on the configured interval until cancelled"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if self.shared is not None:
+                    await self.sync()
+                else:
+                    self.recompute()
+            except Exception as e:
+                logger.error(f"Surge recompute failed: {e}")
+
+    async def write_shared(self) -> None:
+        """Apply queued events to the shared counters, in the order they happened"""
+        while True:
+            event = await self._outbox.get()
+            try:
+                await self.shared.apply(event)
+            except Exception as e:
+                self.shared_errors += 1
+                logger.error(f"Failed to apply surge event {event[0]} to shared counters: {e}")
+
+    def start(self) -> None:
+        """Start the background recompute loop, and the shared-counter writer if any"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        if self.shared is not None and self._writer is None:
+            self._writer = asyncio.create_task(self.write_shared())
+
+    async def stop(self) -> None:
+        """Stop the recompute loop and the writer"""
+        for task in (self._task, self._writer):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._writer = None
+
+    def metrics(self) -> Dict:
+        """Counter sizes and the current surge snapshot"""
+        return {
+            "version": self.version,
+            "shared": self.shared is not None,
+            "events": self.events,
+            "shared_errors": self.shared_errors,
+            "pending_shared_events": self._outbox.qsize(),
+            "open_rides": sum(self.demand.values()),
+            "idle_drivers": sum(self.supply.values()),
+            "surging_cells": len(self.multipliers),
+            "max_multiplier": max(self.multipliers.values(), default=1.0),
+            "last_recompute_ms": round(self.last_recompute_ms, 3)
+        }
+
+# Global instance
+surge_engine = SurgeEngine(shared=create_surge_counters())
@@ -1,5 +1,3 @@
-from twilio.rest import Client
-from twilio.base.exceptions import TwilioException
 from .config import settings
 import logging
 
@@ -10,14 +8,19 @@ class TwilioService:
         self.account_sid = settings.TWILIO_ACCOUNT_SID
         self.auth_token = settings.TWILIO_AUTH_TOKEN
         self.phone_number = settings.TWILIO_PHONE_NUMBER
-        self.client = None
-        
-        if self.account_sid and self.auth_token:
+        self._client = None
+    
+    @property
+    def client(self):
+        """Twilio REST client, created on first use so twilio is only imported by workers that send SMS"""
+        if self._client is None and self.account_sid and self.auth_token:
             try:
-                self.client = Client(self.account_sid, self.auth_token)
+                from twilio.rest import Client
+                self._client = Client(self.account_sid, self.auth_token)
                 logger.info("Twilio client initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize Twilio client: {e}")
+        return self._client
     
     def send_sms(self, to_phone: str, message: str) -> bool:
         """Send SMS message"""
@@ -25,6 +28,7 @@ class TwilioService:
             logger.error("Twilio client not initialized")
             return False
         
+        from twilio.base.exceptions import TwilioException
         try:
             message = self.client.messages.create(
                 body=message,
@@ -0,0 +1,87 @@
+import struct
+from typing import Dict, Optional
+from .geo import METERS_PER_MILE
+
+# Encodings a client can negotiate at `authenticate`
+ENCODING_JSON = "json"
+ENCODING_BINARY = "binary"
+ENCODINGS = (ENCODING_JSON, ENCODING_BINARY)
+
+# Coordinates travel as signed 32-bit microdegrees (~0.11 m resolution)
+COORD_SCALE = 1_000_000
+
+# Message type tags, the first byte of every binary frame
+MSG_UPDATE_LOCATION = 1
+MSG_DRIVER_LOCATION = 2
+MSG_RIDE_REQUEST = 3
+
+# Sentinels for absent fields
+MISSING = 0xFFFFFFFF
+MISSING_COORD = -0x80000000
+
+# type, id, latitude, longitude
+_POSITION = struct.Struct("<BIii")
+# type, ride_id, pickup lat/lng, dropoff lat/lng, fare_cents, pickup_distance_meters
+_RIDE_REQUEST = struct.Struct("<BIiiiiII")
+
+def _to_fixed(degrees: Optional[float]) -> int:
+    return MISSING_COORD if degrees is None else round(degrees * COORD_SCALE)
+
+def _from_fixed(value: int) -> Optional[float]:
+    return None if value == MISSING_COORD else value / COORD_SCALE
+
+def _to_unsigned(value: Optional[float], scale: float) -> int:
+    return MISSING if value is None else round(value * scale)
+
+def _from_unsigned(value: int, scale: float) -> Optional[float]:
+    return None if value == MISSING else value / scale
+
+def _unpack(layout: struct.Struct, msg_type: int, data: bytes) -> tuple:
+    if len(data) != layout.size or data[0] != msg_type:
+        raise ValueError(f"Not a type {msg_type} frame of {layout.size} bytes")
+    return layout.unpack(data)
+
+def encode_update_location(user_id: int, latitude: float, longitude: float) -> bytes:
+    """Pack a driver's own location ping (client -> server)"""
+    return _POSITION.pack(MSG_UPDATE_LOCATION, user_id, _to_fixed(latitude), _to_fixed(longitude))
+
+def decode_update_location(data: bytes) -> Dict:
+    _, user_id, latitude, longitude = _unpack(_POSITION, MSG_UPDATE_LOCATION, data)
+    return {'user_id': user_id, 'latitude': _from_fixed(latitude), 'longitude': _from_fixed(longitude)}
+
+def encode_driver_location(ride_id: int, latitude: float, longitude: float) -> bytes:
+    """Pack a driver position for the riders of a ride (server -> client)"""
+    return _POSITION.pack(MSG_DRIVER_LOCATION, ride_id, _to_fixed(latitude), _to_fixed(longitude))
+
+def decode_driver_location(data: bytes) -> Dict:
+    _, ride_id, latitude, longitude = _unpack(_POSITION, MSG_DRIVER_LOCATION, data)
+    return {'ride_id': ride_id, 'latitude': _from_fixed(latitude), 'longitude': _from_fixed(longitude)}
+
+def encode_ride_request(payload: Dict) -> bytes:
+    """Pack a ride offer built by socket_manager._ride_request_payload"""
+    return _RIDE_REQUEST.pack(
+        MSG_RIDE_REQUEST,
+        _to_unsigned(payload['ride_id'], 1),
+        _to_fixed(payload['pickup_latitude']),
+        _to_fixed(payload['pickup_longitude']),
+        _to_fixed(payload['dropoff_latitude']),
+        _to_fixed(payload['dropoff_longitude']),
+        _to_unsigned(payload.get('fare'), 100),
+        _to_unsigned(payload.get('pickup_distance_miles'), METERS_PER_MILE)
+    )
+
+def decode_ride_request(data: bytes) -> Dict:
+    (_, ride_id, pickup_latitude, pickup_longitude, dropoff_latitude, dropoff_longitude,
+     fare_cents, pickup_distance_meters) = _unpack(_RIDE_REQUEST, MSG_RIDE_REQUEST, data)
+    payload = {
+        'ride_id': None if ride_id == MISSING else ride_id,
+        'pickup_latitude': _from_fixed(pickup_latitude),
+        'pickup_longitude': _from_fixed(pickup_longitude),
+        'dropoff_latitude': _from_fixed(dropoff_latitude),
+        'dropoff_longitude': _from_fixed(dropoff_longitude),
+        'fare': _from_unsigned(fare_cents, 100)
+    }
+    pickup_distance_miles = _from_unsigned(pickup_distance_meters, METERS_PER_MILE)
+    if pickup_distance_miles is not None:
+        payload['pickup_distance_miles'] = pickup_distance_miles
+    return payload
@@ -0,0 +1,104 @@
+import logging
+import time
+from typing import Dict, Optional
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+class _WritePinCounters:
+    """Counters shared by both pin stores, reported on /metrics"""
+
+    def __init__(self):
+        self.pins = 0
+        self.pin_failures = 0
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.pinned_reads = 0
+
+    def record_read(self, replica: bool, pinned: bool = False) -> None:
+        if replica:
+            self.replica_reads += 1
+        else:
+            self.primary_reads += 1
+            if pinned:
+                self.pinned_reads += 1
+
+    def metrics(self) -> Dict:
+        reads = self.replica_reads + self.primary_reads
+        return {
+            "replica_configured": bool(settings.DATABASE_REPLICA_URL),
+            "pin_seconds": settings.READ_YOUR_WRITES_SECONDS,
+            "pins": self.pins,
+            "pin_failures": self.pin_failures,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "pinned_reads": self.pinned_reads,
+            "replica_share": round(self.replica_reads / reads, 4) if reads else 0.0
+        }
+
+class InMemoryWritePins(_WritePinCounters):
+    """Users who wrote recently, so their reads stay on the primary until the replica catches up.
+
+    Single-process only: with several workers and no Redis, a read served by a
+    different worker than the write may still see the replica's lag.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        super().__init__()
+        self.seconds = seconds if seconds is not None else settings.READ_YOUR_WRITES_SECONDS
+        self._until: Dict[int, float] = {}
+        self._next_sweep = 1024
+
+    async def pin(self, user_id: int) -> None:
+        now = time.monotonic()
+        self._until[user_id] = now + self.seconds
+        self.pins += 1
+        if len(self._until) > self._next_sweep:
+            self._until = {uid: until for uid, until in self._until.items() if until > now}
+            self._next_sweep = max(1024, 2 * len(self._until))
+
+    async def is_pinned(self, user_id: int) -> bool:
+        until = self._until.get(user_id)
+        return until is not None and until > time.monotonic()
+
+    def metrics(self) -> Dict:
+        metrics = super().metrics()
+        metrics["tracked_users"] = len(self._until)
+        return metrics
+
+class RedisWritePins(_WritePinCounters):
+    """Write pins shared by every worker; one expiring key per recent writer"""
+
+    def __init__(self, url: str, seconds: Optional[float] = None, prefix: str = "valey"):
+        from redis import asyncio as aioredis
+
+        super().__init__()
+        self.seconds = seconds if seconds is not None else settings.READ_YOUR_WRITES_SECONDS
+        self.redis = aioredis.from_url(url, decode_responses=True)
+        self._prefix = f"{prefix}:write_pin:"
+
+    async def pin(self, user_id: int) -> None:
+        # Runs after the write committed; losing the pin only risks one stale replica read
+        try:
+            await self.redis.set(f"{self._prefix}{user_id}", 1, px=int(self.seconds * 1000))
+        except Exception as e:
+            self.pin_failures += 1
+            logger.warning(f"Failed to pin user {user_id} to the primary: {e}")
+            return
+        self.pins += 1
+
+    async def is_pinned(self, user_id: int) -> bool:
+        try:
+            return bool(await self.redis.exists(f"{self._prefix}{user_id}"))
+        except Exception:
+            # Without the pin store we cannot rule out a recent write; the primary is always safe
+            return True
+
+def create_write_pins():
+    """Pick the pin store for REDIS_URL (in-process when unset or memory://)"""
+    if settings.REDIS_URL and not settings.REDIS_URL.startswith("memory://"):
+        return RedisWritePins(settings.REDIS_URL)
+    return InMemoryWritePins()
+
+# Global instance
+write_pins = create_write_pins()
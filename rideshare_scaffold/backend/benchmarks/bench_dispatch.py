@@ -0,0 +1,59 @@
+"""
+Dispatch lookup benchmark
+
+Compares broadcast-to-all dispatch with nearest-K lookups on the driver grid
+index at increasing fleet sizes. Run from the backend directory:
+
+    python -m benchmarks.bench_dispatch
+"""
+import random
+import time
+from app.config import settings
+from app.driver_index import DriverIndex
+from app.geo import haversine_miles
+
+# Rough bounding box around the East Bay and San Francisco
+LAT_RANGE = (37.60, 38.00)
+LNG_RANGE = (-122.55, -122.15)
+QUERIES = 1000
+
+def random_point(rng: random.Random):
+    return rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)
+
+def run(driver_count: int, rng: random.Random) -> None:
+    index = DriverIndex()
+    positions = {}
+    for driver_id in range(driver_count):
+        lat, lng = random_point(rng)
+        index.upsert(driver_id, lat, lng)
+        positions[driver_id] = (lat, lng)
+
+    pickups = [random_point(rng) for _ in range(QUERIES)]
+    k = settings.DISPATCH_MAX_DRIVERS
+    radius = settings.DISPATCH_RADIUS_MILES
+
+    start = time.perf_counter()
+    emits = 0
+    for lat, lng in pickups:
+        emits += len(index.nearest(lat, lng, k, radius))
+    indexed_ms = (time.perf_counter() - start) * 1000 / QUERIES
+
+    # Brute-force scan for the same K, as a lower bound on what a naive filter costs
+    start = time.perf_counter()
+    for lat, lng in pickups[:100]:
+        sorted(
+            (haversine_miles(lat, lng, d_lat, d_lng), driver_id)
+            for driver_id, (d_lat, d_lng) in positions.items()
+        )[:k]
+    scan_ms = (time.perf_counter() - start) * 1000 / 100
+
+    print(
+        f"{driver_count:>7} drivers | emits/request broadcast={driver_count:>7} "
+        f"nearest-k={emits / QUERIES:5.1f} | lookup indexed={indexed_ms:7.3f} ms "
+        f"scan={scan_ms:8.3f} ms"
+    )
+
+if __name__ == "__main__":
+    rng = random.Random(42)
+    for count in (1_000, 10_000, 100_000):
+        run(count, rng)
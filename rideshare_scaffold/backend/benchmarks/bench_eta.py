@@ -0,0 +1,82 @@
+"""
+ETA table rebuild benchmark
+
+Streams 10M synthetic completed rides through EtaTableBuilder in chunks, the
+way the rebuild job reads them from the database, then times build(), save()
+and the per-quote table lookup. Database fetch time is not included. Run from
+the backend directory:
+
+    python -m benchmarks.bench_eta [rides]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+from app.config import settings
+from app.eta import EtaTable, EtaTableBuilder, parse_bounds
+from app.pricing import haversine_miles_array
+
+RIDES = 10_000_000
+YEAR_SECONDS = 365 * 24 * 3600
+START_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+
+def synthetic_chunk(size: int, rng: np.random.Generator):
+    min_lat, min_lng, max_lat, max_lng = parse_bounds(settings.ETA_BOUNDS)
+    pickup_lat = rng.uniform(min_lat, max_lat, size)
+    pickup_lng = rng.uniform(min_lng, max_lng, size)
+    dropoff_lat = rng.uniform(min_lat, max_lat, size)
+    dropoff_lng = rng.uniform(min_lng, max_lng, size)
+    distance = haversine_miles_array(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng) * 1.3
+    started = START_EPOCH + rng.uniform(0, YEAR_SECONDS, size)
+    completed = started + distance * rng.uniform(1.5, 5.0, size) * 60
+    return started, completed, distance, pickup_lat, pickup_lng, dropoff_lat, dropoff_lng
+
+def main() -> None:
+    rides = int(sys.argv[1]) if len(sys.argv) > 1 else RIDES
+    chunk_size = settings.ETA_REBUILD_CHUNK_SIZE
+    rng = np.random.default_rng(7)
+    builder = EtaTableBuilder()
+
+    generate_s = 0.0
+    add_s = 0.0
+    for offset in range(0, rides, chunk_size):
+        started = time.perf_counter()
+        chunk = synthetic_chunk(min(chunk_size, rides - offset), rng)
+        generate_s += time.perf_counter() - started
+
+        started = time.perf_counter()
+        builder.add(*chunk)
+        add_s += time.perf_counter() - started
+
+    started = time.perf_counter()
+    table = builder.build()
+    build_s = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "eta_table.npz")
+        started = time.perf_counter()
+        table.save(path)
+        save_s = time.perf_counter() - started
+        file_mb = os.path.getsize(path) / 1e6
+        started = time.perf_counter()
+        EtaTable.load(path)
+        load_s = time.perf_counter() - started
+
+    lookups = 10_000
+    when = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    for _ in range(lookups):
+        table.pace_array([37.87], [-122.26], [37.80], [-122.27], when)
+    lookup_us = (time.perf_counter() - started) * 1_000_000 / lookups
+
+    grid = table.grid
+    print(f"grid: {grid.rows}x{grid.cols} cells x 168 hours = {table.pace.size:,} buckets ({table.pace.nbytes / 1e6:.1f} MB in memory, {file_mb:.1f} MB on disk)")
+    print(f"rides: {builder.rides_used:,}/{builder.rides_seen:,} used, chunk size {chunk_size:,}, coverage {table.coverage():.1%}")
+    print(f"accumulate: {add_s:.2f}s ({rides / add_s:,.0f} rides/s)  [synthetic data generation {generate_s:.2f}s not counted]")
+    print(f"build: {build_s:.2f}s  save: {save_s:.2f}s  load: {load_s:.2f}s")
+    print(f"single-trip lookup: {lookup_us:.1f} us")
+
+if __name__ == "__main__":
+    main()
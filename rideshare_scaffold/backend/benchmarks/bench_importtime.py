@@ -0,0 +1,130 @@
+"""
+Import-time check
+
+Imports app.main and every router module in a fresh interpreter under
+`python -X importtime`, prints the slowest packages, and fails
+(exits non-zero) when:
+
+- the total import time is over IMPORT_BUDGET_MS, or
+- one of the lazily loaded SDKs (stripe, twilio, sendgrid, langchain,
+  openai, scipy.optimize) was imported just by importing the app, or
+- one of them is *not* imported after its accessor is first used, i.e.
+  the lazy path is broken rather than merely unused.
+
+SDKs that are not installed are skipped in the last check;
+tests/test_rag_lazy.py checks RAGService's laziness with stub modules
+either way. Run from the backend directory:
+
+    python -m benchmarks.bench_importtime
+
+    IMPORT_BUDGET_MS=1500 python -m benchmarks.bench_importtime
+"""
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "2500"))
+TOP = 12
+
+APP_MODULES = [
+    "app.main", "app.routes.auth", "app.routes.ops", "app.routes.rides", "app.routes.drivers",
+    "app.routes.tips", "app.routes.webhooks", "app.routes.exports", "app.routes.ai"
+]
+LAZY = ["stripe", "twilio", "sendgrid", "langchain", "openai", "scipy.optimize"]
+
+# Runs in the child interpreter after the app is imported; uses each accessor once
+FIRST_USE = """
+import json, sys
+import numpy as np
+from app.stripe_service import get_stripe
+from app.twilio_service import TwilioService
+from app.sendgrid_service import SendGridService
+from app.matching import solve_assignment
+from app.ai.rag import RAGService
+
+def loaded(name):
+    return name in sys.modules
+
+results = {}
+get_stripe()
+results["stripe"] = loaded("stripe")
+sms = TwilioService()
+sms.account_sid, sms.auth_token = "AC" + "0" * 32, "token"
+sms.client
+results["twilio"] = loaded("twilio.rest")
+email = SendGridService()
+email.api_key = "SG.bench"
+email.client
+results["sendgrid"] = loaded("sendgrid")
+solve_assignment(np.array([[37.87, -122.26]]), np.array([[37.871, -122.259]]), 5.0)
+results["scipy.optimize"] = loaded("scipy.optimize")
+if {available!r}:
+    RAGService().embeddings
+    results["langchain"] = loaded("langchain")
+    results["openai"] = loaded("openai")
+print(json.dumps(results))
+"""
+
+def env() -> dict:
+    return dict(os.environ, PYTHONPATH=os.getcwd(), DATABASE_URL=os.getenv("DATABASE_URL", "sqlite://"), OPENAI_API_KEY="sk-bench")
+
+def import_profile() -> list:
+    """(depth, cumulative_us, module) for every import made by importing the app"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(APP_MODULES)}"],
+        env=env(), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"importing the app failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append(((len(name) - len(name.lstrip())) // 2, int(cumulative), name.strip()))
+    return rows
+
+def is_lazy(module: str, lazy: str) -> bool:
+    return module == lazy or module.startswith(lazy + ".")
+
+def main() -> None:
+    failures = []
+    rows = import_profile()
+    top_level = [row for row in rows if row[0] == 0]
+    total_ms = sum(cumulative for _, cumulative, _ in top_level) / 1000
+
+    # A package's first import is the one that pays for its whole subtree
+    packages = [row for row in rows if "." not in row[2] and not row[2].startswith("_")]
+    print(f"slowest packages (of {len(rows)} modules imported)")
+    for _, cumulative, name in sorted(packages, reverse=True, key=lambda row: row[1])[:TOP]:
+        print(f"  {name:<24} {cumulative / 1000:8.1f} ms")
+    print(f"total {total_ms:.0f} ms (budget {BUDGET_MS:.0f} ms)")
+    if total_ms > BUDGET_MS:
+        failures.append(f"import took {total_ms:.0f} ms, over the {BUDGET_MS:.0f} ms budget")
+
+    imported = {name for _, _, name in rows}
+    for lazy in LAZY:
+        eager = sorted(name for name in imported if is_lazy(name, lazy))
+        if eager:
+            failures.append(f"{lazy} is imported with the app ({', '.join(eager[:3])})")
+
+    available = all(importlib.util.find_spec(name) for name in ("langchain", "openai"))
+    script = f"import {', '.join(APP_MODULES)}\n" + FIRST_USE.replace("{available!r}", repr(available))
+    result = subprocess.run([sys.executable, "-c", script], env=env(), capture_output=True, text=True)
+    if result.returncode != 0:
+        failures.append(f"first use of the lazy SDKs failed:\n{result.stderr[-2000:]}")
+    else:
+        loaded = json.loads(result.stdout.strip().splitlines()[-1])
+        print("loaded on first use: " + ", ".join(f"{name}={ok}" for name, ok in loaded.items()))
+        if not available:
+            print("langchain/openai not installed; their first-use check was skipped")
+        failures += [f"{name} was not loaded by its accessor" for name, ok in loaded.items() if not ok]
+
+    if failures:
+        sys.exit("\n".join(["FAILED:"] + failures))
+    print("ok")
+
+if __name__ == "__main__":
+    main()
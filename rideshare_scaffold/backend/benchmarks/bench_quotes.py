@@ -0,0 +1,77 @@
+"""
+Ride quote throughput benchmark
+
+Measures quotes/sec for batches of 1, 100 and 10k pairs: the vectorized
+kernel alone, the full batch handler (kernel plus response models), and the
+scalar per-pair math it replaces. Run from the backend directory:
+
+    python -m benchmarks.bench_quotes
+"""
+import asyncio
+import random
+import time
+from app.geo import haversine_miles
+from app.pricing import quote_arrays, scalar_fare
+from app.routes.rides import get_ride_quote_batch
+from app.schemas import RideQuoteBatchRequest
+
+LAT_RANGE = (37.60, 38.00)
+LNG_RANGE = (-122.55, -122.15)
+
+def make_request(size: int, rng: random.Random) -> RideQuoteBatchRequest:
+    return RideQuoteBatchRequest(pairs=[
+        {
+            "pickup_latitude": rng.uniform(*LAT_RANGE),
+            "pickup_longitude": rng.uniform(*LNG_RANGE),
+            "dropoff_latitude": rng.uniform(*LAT_RANGE),
+            "dropoff_longitude": rng.uniform(*LNG_RANGE),
+        }
+        for _ in range(size)
+    ])
+
+def time_per_round(fn, min_seconds: float = 0.5) -> float:
+    rounds = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / rounds
+
+def scalar_quotes(request: RideQuoteBatchRequest) -> None:
+    for pair in request.pairs:
+        distance = haversine_miles(
+            pair.pickup_latitude, pair.pickup_longitude,
+            pair.dropoff_latitude, pair.dropoff_longitude
+        )
+        scalar_fare(distance)
+        int(distance * 2)
+
+async def main() -> None:
+    rng = random.Random(7)
+    loop = asyncio.get_running_loop()
+    for size in (1, 100, 10_000):
+        request = make_request(size, rng)
+        columns = [
+            [getattr(pair, field) for pair in request.pairs]
+            for field in ("pickup_latitude", "pickup_longitude", "dropoff_latitude", "dropoff_longitude")
+        ]
+        kernel = time_per_round(lambda: quote_arrays(*columns))
+        scalar = time_per_round(lambda: scalar_quotes(request))
+
+        rounds = 0
+        start = loop.time()
+        while loop.time() - start < 0.5:
+            await get_ride_quote_batch(request, current_user=None)
+            rounds += 1
+        handler = (loop.time() - start) / rounds
+
+        print(
+            f"batch={size:>6} | kernel {size / kernel:>12,.0f} quotes/s "
+            f"| handler {size / handler:>10,.0f} quotes/s "
+            f"| scalar math {size / scalar:>10,.0f} quotes/s"
+        )
+
+if __name__ == "__main__":
+    asyncio.run(main())
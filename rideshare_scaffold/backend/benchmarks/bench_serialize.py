@@ -0,0 +1,103 @@
+"""
+List serialization benchmark
+
+Seeds SERIALIZE_BENCH_RIDES rides (10k by default) into an in-memory SQLite
+database and times one list response both ways:
+
+- before: load Ride entities, build RidePage with RideResponse.from_orm per
+  row, then FastAPI's response_model pass and JSONResponse
+- after: load column-only row tuples and hand them to
+  serialization.page_response (one TypeAdapter pass, orjson)
+
+Load and serialize are timed separately, and the two bodies are checked to
+decode to the same JSON. Run from the backend directory:
+
+    python -m benchmarks.bench_serialize
+
+    SERIALIZE_BENCH_RIDES=1000 python -m benchmarks.bench_serialize
+"""
+import asyncio
+import json
+import os
+import statistics
+import time
+import warnings
+from datetime import datetime, timedelta
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from app.models import Base, Ride, RideStatus, User, UserRole
+from app.schemas import RidePage, RideResponse
+from app.serialization import columns_of, page_response
+
+RIDES = int(os.getenv("SERIALIZE_BENCH_RIDES", "10000"))
+ITERATIONS = 20
+
+engine = create_engine("sqlite://")
+page_field = create_response_field(name="Response_get_user_rides", type_=RidePage)
+
+def seed() -> None:
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": 1, "email": "rider@example.com", "phone": "r", "role": UserRole.RIDER, "is_verified": True},
+            {"id": 2, "email": "driver@example.com", "phone": "d", "role": UserRole.DRIVER, "is_verified": True}
+        ])
+        conn.execute(insert(Ride), [
+            {
+                "rider_id": 1, "driver_id": 2,
+                "pickup_address": "Sather Gate", "pickup_latitude": 37.8703, "pickup_longitude": -122.2595,
+                "dropoff_address": "Rockridge BART", "dropoff_latitude": 37.8447, "dropoff_longitude": -122.2513,
+                "status": RideStatus.COMPLETED, "version": 4, "fare": 8.5 + i % 7, "distance_miles": 2.0,
+                "payment_intent_id": f"pi_{i:08d}",
+                "started_at": now - timedelta(minutes=5 * i + 15), "completed_at": now - timedelta(minutes=5 * i),
+                "created_at": now - timedelta(minutes=5 * i + 20)
+            }
+            for i in range(RIDES)
+        ])
+
+def load_entities() -> list:
+    with Session(engine) as db:
+        return db.scalars(select(Ride).order_by(Ride.created_at.desc(), Ride.id.desc())).all()
+
+def load_rows() -> list:
+    with Session(engine) as db:
+        return db.execute(select(*columns_of(RideResponse, Ride)).order_by(Ride.created_at.desc(), Ride.id.desc())).all()
+
+def serialize_before(rides) -> bytes:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)  # from_orm
+        page = RidePage(items=[RideResponse.from_orm(ride) for ride in rides], next_cursor=None)
+    content = asyncio.run(serialize_response(field=page_field, response_content=page))
+    return JSONResponse(content).body
+
+def serialize_after(rows) -> bytes:
+    return page_response(RideResponse, rows, None).body
+
+def timed(fn, *args) -> tuple:
+    latencies = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        result = fn(*args)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(latencies), max(latencies)
+
+def main() -> None:
+    seed()
+    rides, load_before, _ = timed(load_entities)
+    rows, load_after, _ = timed(load_rows)
+    body_before, before, before_max = timed(serialize_before, rides)
+    body_after, after, after_max = timed(serialize_after, rows)
+    assert json.loads(body_before) == json.loads(body_after), "bodies differ"
+
+    print(f"{RIDES:,} rides, median of {ITERATIONS} runs")
+    print(f"{'':<28} {'load ms':>9} {'serialize ms':>13} {'max ms':>8} {'body KB':>8}")
+    print(f"{'entities + from_orm + json':<28} {load_before:>9.1f} {before:>13.1f} {before_max:>8.1f} {len(body_before) / 1024:>8.0f}")
+    print(f"{'rows + TypeAdapter + orjson':<28} {load_after:>9.1f} {after:>13.1f} {after_max:>8.1f} {len(body_after) / 1024:>8.0f}")
+    print(f"serialize speedup: {before / after:.1f}x")
+
+if __name__ == "__main__":
+    main()
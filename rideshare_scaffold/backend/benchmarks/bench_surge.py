@@ -0,0 +1,55 @@
+"""
+Surge counter benchmark
+
+Measures the cost per event of the incremental SurgeEngine counters (ride
+open/close, driver online/offline/busy/idle and moves within or across
+cells), a full multiplier recompute over the active cells, and the O(1)
+multiplier read used by fare calculation. Run from the backend directory:
+
+    python -m benchmarks.bench_surge
+"""
+import random
+import time
+from app.surge import SurgeEngine
+
+DRIVERS = 20_000
+RIDES = 50_000
+LAT_RANGE = (37.60, 38.00)
+LNG_RANGE = (-122.55, -122.15)
+
+def per_event_us(label: str, events, handler) -> None:
+    start = time.perf_counter()
+    for event in events:
+        handler(*event)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed * 1_000_000 / len(events):7.3f} us/event")
+
+def main() -> None:
+    rng = random.Random(11)
+    engine = SurgeEngine()
+    point = lambda: (rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE))
+
+    per_event_us("driver_online", [(d, *point()) for d in range(DRIVERS)], engine.driver_online)
+    per_event_us("open_ride", [(r, *point()) for r in range(RIDES)], engine.open_ride)
+
+    # GPS jitter that stays within the cell, then moves that cross into new cells
+    jitter = []
+    for d in range(DRIVERS):
+        cell = engine._drivers[d][0]
+        jitter.append((d, (cell[0] + 0.5) * engine.cell_deg, (cell[1] + 0.5) * engine.cell_deg))
+    per_event_us("move_driver (same)", jitter, engine.move_driver)
+    per_event_us("move_driver (new)", [(d, *point()) for d in range(DRIVERS)], engine.move_driver)
+
+    per_event_us("driver_busy", [(d,) for d in range(0, DRIVERS, 2)], engine.driver_busy)
+    per_event_us("driver_idle", [(d,) for d in range(0, DRIVERS, 2)], engine.driver_idle)
+    per_event_us("close_ride", [(r,) for r in range(0, RIDES, 2)], engine.close_ride)
+    per_event_us("driver_offline", [(d,) for d in range(0, DRIVERS, 2)], engine.driver_offline)
+
+    surging = engine.recompute()
+    print(f"recompute              {engine.last_recompute_ms:7.3f} ms over {len(engine.demand):,} demand cells ({surging:,} surging)")
+
+    points = [point() for _ in range(RIDES)]
+    per_event_us("multiplier read", points, engine.multiplier)
+
+if __name__ == "__main__":
+    main()
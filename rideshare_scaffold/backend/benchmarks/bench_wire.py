@@ -0,0 +1,72 @@
+"""
+Socket event encoding benchmark
+
+Compares JSON dicts with the binary frames in app.wire for update_location,
+driver_location and ride_request: payload bytes, full Socket.IO packet bytes
+(binary events carry a small text header plus the attachment), and encode /
+decode time per event. Run from the backend directory:
+
+    python -m benchmarks.bench_wire
+"""
+import json
+import time
+from socketio import packet
+from app import wire
+
+ITERATIONS = 100_000
+
+EVENTS = {
+    'update_location': (
+        {'user_id': 18342, 'latitude': 37.871234, 'longitude': -122.259876},
+        lambda p: wire.encode_update_location(p['user_id'], p['latitude'], p['longitude']),
+        wire.decode_update_location
+    ),
+    'driver_location': (
+        {'ride_id': 903311, 'latitude': 37.871234, 'longitude': -122.259876},
+        lambda p: wire.encode_driver_location(p['ride_id'], p['latitude'], p['longitude']),
+        wire.decode_driver_location
+    ),
+    'ride_request': (
+        {
+            'ride_id': 903311,
+            'pickup_latitude': 37.871234,
+            'pickup_longitude': -122.259876,
+            'dropoff_latitude': 37.802139,
+            'dropoff_longitude': -122.271151,
+            'fare': 12.37,
+            'pickup_distance_miles': 0.812
+        },
+        wire.encode_ride_request,
+        wire.decode_ride_request
+    ),
+}
+
+def per_event_us(fn, arg) -> float:
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn(arg)
+    return (time.perf_counter() - start) * 1_000_000 / ITERATIONS
+
+def packet_bytes(event: str, data) -> int:
+    encoded = packet.Packet(packet.EVENT, data=[event, data]).encode()
+    if isinstance(encoded, list):
+        return sum(len(part) for part in encoded)
+    return len(encoded)
+
+def json_dumps(payload) -> str:
+    return json.dumps(payload, separators=(',', ':'))
+
+def main() -> None:
+    print(f"{'event':<16} {'format':<7} {'payload B':>9} {'packet B':>9} {'encode us':>10} {'decode us':>10}")
+    for event, (payload, encode, decode) in EVENTS.items():
+        text = json_dumps(payload)
+        frame = encode(payload)
+        rows = [
+            ('json', len(text.encode()), packet_bytes(event, payload), per_event_us(json_dumps, payload), per_event_us(json.loads, text)),
+            ('binary', len(frame), packet_bytes(event, frame), per_event_us(encode, payload), per_event_us(decode, frame)),
+        ]
+        for fmt, payload_size, packet_size, encode_us, decode_us in rows:
+            print(f"{event:<16} {fmt:<7} {payload_size:>9} {packet_size:>9} {encode_us:>10.2f} {decode_us:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Initial schema
+
+The tables as Base.metadata.create_all built them before migrations existed.
+Databases created that way already match this revision; mark them with
+`alembic stamp 0001` and then `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+user_role = sa.Enum("RIDER", "DRIVER", name="userrole")
+ride_status = sa.Enum("REQUESTED", "ACCEPTED", "ARRIVED", "STARTED", "COMPLETED", "CANCELLED", name="ridestatus")
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String()),
+        sa.Column("phone", sa.String()),
+        sa.Column("password_hash", sa.String(), nullable=True),
+        sa.Column("role", user_role, nullable=False),
+        sa.Column("is_verified", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True))
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_phone", "users", ["phone"], unique=True)
+
+    op.create_table(
+        "driver_profiles",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), unique=True),
+        sa.Column("vehicle_make", sa.String()),
+        sa.Column("vehicle_model", sa.String()),
+        sa.Column("vehicle_year", sa.Integer()),
+        sa.Column("license_plate", sa.String()),
+        sa.Column("stripe_account_id", sa.String()),
+        sa.Column("is_online", sa.Boolean()),
+        sa.Column("current_latitude", sa.Float()),
+        sa.Column("current_longitude", sa.Float()),
+        sa.Column("total_rides", sa.Integer()),
+        sa.Column("total_earnings", sa.Float()),
+        sa.Column("rating", sa.Float()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True))
+    )
+    op.create_index("ix_driver_profiles_id", "driver_profiles", ["id"])
+
+    op.create_table(
+        "rides",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("rider_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("driver_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("pickup_address", sa.String()),
+        sa.Column("pickup_latitude", sa.Float()),
+        sa.Column("pickup_longitude", sa.Float()),
+        sa.Column("dropoff_address", sa.String()),
+        sa.Column("dropoff_latitude", sa.Float()),
+        sa.Column("dropoff_longitude", sa.Float()),
+        sa.Column("status", ride_status),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("fare", sa.Float()),
+        sa.Column("distance_miles", sa.Float()),
+        sa.Column("payment_intent_id", sa.String()),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True))
+    )
+    op.create_index("ix_rides_id", "rides", ["id"])
+
+    op.create_table(
+        "tips",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ride_id", sa.Integer(), sa.ForeignKey("rides.id")),
+        sa.Column("from_user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("to_user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("amount", sa.Float()),
+        sa.Column("payment_intent_id", sa.String()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+    op.create_index("ix_tips_id", "tips", ["id"])
+
+def downgrade() -> None:
+    op.drop_table("tips")
+    op.drop_table("rides")
+    op.drop_table("driver_profiles")
+    op.drop_table("users")
+    ride_status.drop(op.get_bind(), checkfirst=True)
+    user_role.drop(op.get_bind(), checkfirst=True)
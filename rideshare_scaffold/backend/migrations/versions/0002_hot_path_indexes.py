@@ -0,0 +1,51 @@
+"""Indexes for the hot query paths
+
+Ride and tip history are filtered by user and read newest first, dispatch
+and ops look at REQUESTED rides only, and dispatch lists online drivers, so
+the indexes are composite on (user, created_at DESC) and partial on the
+status/online flag. Enum columns store member names, hence 'REQUESTED'.
+
+On Postgres the indexes are built CONCURRENTLY so a live rides table is not
+locked for writes; that cannot run inside a transaction, so each one runs
+in an autocommit block. If a concurrent build fails it leaves an INVALID
+index behind: drop it and rerun the upgrade.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# name, table, columns, partial predicate
+INDEXES = [
+    ("ix_rides_rider_created", "rides", ["rider_id", sa.text("created_at DESC")], None),
+    ("ix_rides_driver_created", "rides", ["driver_id", sa.text("created_at DESC")], "driver_id IS NOT NULL"),
+    ("ix_rides_requested", "rides", ["created_at"], "status = 'REQUESTED'"),
+    ("ix_driver_profiles_online", "driver_profiles", ["user_id"], "is_online"),
+    ("ix_tips_payment_intent", "tips", ["payment_intent_id"], None),
+    ("ix_tips_from_user_created", "tips", ["from_user_id", sa.text("created_at DESC")], None),
+    ("ix_tips_to_user_created", "tips", ["to_user_id", sa.text("created_at DESC")], None),
+]
+
+def upgrade() -> None:
+    for name, table, columns, where in INDEXES:
+        predicate = sa.text(where) if where else None
+        with op.get_context().autocommit_block():
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True,
+                postgresql_where=predicate,
+                sqlite_where=predicate,
+                if_not_exists=True
+            )
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
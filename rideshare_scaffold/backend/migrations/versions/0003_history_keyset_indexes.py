@@ -0,0 +1,52 @@
+"""Add id to the history indexes for keyset pagination
+
+Ride and tip history page on (created_at, id) descending, so the
+(user, created_at DESC) indexes from 0002 gain id DESC as a tiebreak and
+a page is a single ordered index range scan. The new indexes are built
+CONCURRENTLY before the old ones are dropped, so history reads stay
+indexed throughout.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# new name, old name, table, user column, partial predicate
+INDEXES = [
+    ("ix_rides_rider_created_id", "ix_rides_rider_created", "rides", "rider_id", None),
+    ("ix_rides_driver_created_id", "ix_rides_driver_created", "rides", "driver_id", "driver_id IS NOT NULL"),
+    ("ix_tips_from_user_created_id", "ix_tips_from_user_created", "tips", "from_user_id", None),
+    ("ix_tips_to_user_created_id", "ix_tips_to_user_created", "tips", "to_user_id", None),
+]
+
+def _create(name: str, table: str, columns: list, where) -> None:
+    predicate = sa.text(where) if where else None
+    with op.get_context().autocommit_block():
+        op.create_index(
+            name, table, columns,
+            postgresql_concurrently=True,
+            postgresql_where=predicate,
+            sqlite_where=predicate,
+            if_not_exists=True
+        )
+
+def _drop(name: str, table: str) -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+def upgrade() -> None:
+    for name, old_name, table, column, where in INDEXES:
+        _create(name, table, [column, sa.text("created_at DESC"), sa.text("id DESC")], where)
+        _drop(old_name, table)
+
+def downgrade() -> None:
+    for name, old_name, table, column, where in reversed(INDEXES):
+        _create(old_name, table, [column, sa.text("created_at DESC")], where)
+        _drop(name, table)
@@ -0,0 +1,69 @@
+"""Driver daily stats rollup and online session start
+
+driver_daily_stats holds one row per driver per UTC day (rides, fares,
+tips, online seconds); the app upserts it in the same transaction as the
+ride completion or tip it counts. driver_profiles.online_since marks the
+open online session, which is added to the rollup when the driver goes
+offline.
+
+The upgrade backfills the rollups from existing completed rides and tips
+and recomputes driver_profiles.total_rides/total_earnings from them, since
+nothing maintained those counters before. Online time before this
+revision was never recorded and stays zero.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def _utc_day(column: str, dialect: str) -> str:
+    if dialect == "postgresql":
+        return f"CAST(({column}) AT TIME ZONE 'UTC' AS date)"
+    return f"date({column})"
+
+def upgrade() -> None:
+    op.create_table(
+        "driver_daily_stats",
+        sa.Column("driver_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("rides", sa.Integer(), nullable=False),
+        sa.Column("fare_total", sa.Float(), nullable=False),
+        sa.Column("tip_total", sa.Float(), nullable=False),
+        sa.Column("online_seconds", sa.Integer(), nullable=False),
+    )
+    with op.batch_alter_table("driver_profiles") as batch:
+        batch.add_column(sa.Column("online_since", sa.DateTime(timezone=True), nullable=True))
+
+    dialect = op.get_bind().dialect.name
+    op.execute(f"""
+        INSERT INTO driver_daily_stats (driver_id, day, rides, fare_total, tip_total, online_seconds)
+        SELECT driver_id, {_utc_day("COALESCE(completed_at, created_at)", dialect)}, COUNT(*), COALESCE(SUM(fare), 0), 0, 0
+        FROM rides
+        WHERE status = 'COMPLETED' AND driver_id IS NOT NULL
+        GROUP BY 1, 2
+    """)
+    op.execute(f"""
+        INSERT INTO driver_daily_stats (driver_id, day, rides, fare_total, tip_total, online_seconds)
+        SELECT to_user_id, {_utc_day("created_at", dialect)}, 0, 0, COALESCE(SUM(amount), 0), 0
+        FROM tips
+        WHERE to_user_id IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (driver_id, day) DO UPDATE SET tip_total = driver_daily_stats.tip_total + excluded.tip_total
+    """)
+    op.execute("""
+        UPDATE driver_profiles SET
+            total_rides = COALESCE((SELECT SUM(s.rides) FROM driver_daily_stats s WHERE s.driver_id = driver_profiles.user_id), 0),
+            total_earnings = COALESCE((SELECT SUM(s.fare_total + s.tip_total) FROM driver_daily_stats s WHERE s.driver_id = driver_profiles.user_id), 0)
+    """)
+
+def downgrade() -> None:
+    with op.batch_alter_table("driver_profiles") as batch:
+        batch.drop_column("online_since")
+    op.drop_table("driver_daily_stats")
@@ -0,0 +1,84 @@
+"""Archive table for finished rides
+
+rides_archive has the same columns as rides and takes COMPLETED and
+CANCELLED rides once they are older than RIDE_ARCHIVE_AFTER_DAYS, moved
+in batches by app.ride_archive.RideArchiver, so the hot table only holds
+recent and in-flight rides. History reads union both tables, hence the
+same (user, created_at DESC, id DESC) indexes on the archive.
+
+tips.ride_id loses its foreign key to rides, since a tipped ride can move
+to the archive. Downgrading moves every archived ride back into rides
+before restoring the key.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# The type already exists from 0001
+ride_status = postgresql.ENUM(
+    "REQUESTED", "ACCEPTED", "ARRIVED", "STARTED", "COMPLETED", "CANCELLED",
+    name="ridestatus", create_type=False
+)
+
+COLUMNS = (
+    "id, rider_id, driver_id, pickup_address, pickup_latitude, pickup_longitude, "
+    "dropoff_address, dropoff_latitude, dropoff_longitude, status, version, fare, "
+    "distance_miles, payment_intent_id, started_at, completed_at, created_at, updated_at"
+)
+
+# SQLite's foreign key is unnamed; batch mode finds it through this convention
+SQLITE_NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+def _tips_ride_fk() -> str:
+    return "tips_ride_id_fkey" if op.get_bind().dialect.name == "postgresql" else "fk_tips_ride_id_rides"
+
+def upgrade() -> None:
+    op.create_table(
+        "rides_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("rider_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("driver_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("pickup_address", sa.String()),
+        sa.Column("pickup_latitude", sa.Float()),
+        sa.Column("pickup_longitude", sa.Float()),
+        sa.Column("dropoff_address", sa.String()),
+        sa.Column("dropoff_latitude", sa.Float()),
+        sa.Column("dropoff_longitude", sa.Float()),
+        sa.Column("status", ride_status),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("fare", sa.Float()),
+        sa.Column("distance_miles", sa.Float()),
+        sa.Column("payment_intent_id", sa.String()),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+        sa.Column("updated_at", sa.DateTime(timezone=True))
+    )
+    op.create_index(
+        "ix_rides_archive_rider_created_id", "rides_archive",
+        ["rider_id", sa.text("created_at DESC"), sa.text("id DESC")]
+    )
+    op.create_index(
+        "ix_rides_archive_driver_created_id", "rides_archive",
+        ["driver_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        postgresql_where=sa.text("driver_id IS NOT NULL"),
+        sqlite_where=sa.text("driver_id IS NOT NULL")
+    )
+
+    with op.batch_alter_table("tips", naming_convention=SQLITE_NAMING) as batch:
+        batch.drop_constraint(_tips_ride_fk(), type_="foreignkey")
+
+def downgrade() -> None:
+    op.execute(f"INSERT INTO rides ({COLUMNS}) SELECT {COLUMNS} FROM rides_archive")
+    with op.batch_alter_table("tips", naming_convention=SQLITE_NAMING) as batch:
+        batch.create_foreign_key(_tips_ride_fk(), "rides", ["ride_id"], ["id"])
+    op.drop_table("rides_archive")
@@ -0,0 +1,23 @@
+import os
+import pytest
+
+# Settings are read at import; keep the app off any real database or Redis by default
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "")
+
+async def sqlite_sessions(path):
+    """(engine, sessionmaker) for a fresh SQLite file with every table created"""
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.database import Base, PrimaryAsyncSession
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, class_=PrimaryAsyncSession, autoflush=False, expire_on_commit=False)
+
+@pytest.fixture
+async def sessions(tmp_path):
+    """Session factory bound to a throwaway SQLite database"""
+    engine, factory = await sqlite_sessions(tmp_path / "app.db")
+    yield factory
+    await engine.dispose()
@@ -0,0 +1,84 @@
+"""accept_ride creates the PaymentIntent before claiming the ride"""
+import pytest
+from fastapi import HTTPException
+from app.models import DriverProfile, Ride, RideStatus, User, UserRole
+from app.principal_cache import Principal
+from app.routes import rides
+from app.stripe_service import StripeService
+
+@pytest.fixture
+async def ride(sessions, monkeypatch):
+    """A REQUESTED ride and two drivers with Stripe accounts; returns (ride_id, driver, rival)"""
+    async def notify(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(rides, "notify_ride_accepted", notify)
+    async with sessions() as db:
+        rider = User(email="r@example.com", phone="1", role=UserRole.RIDER)
+        driver = User(email="d@example.com", phone="2", role=UserRole.DRIVER)
+        rival = User(email="x@example.com", phone="3", role=UserRole.DRIVER)
+        db.add_all([rider, driver, rival])
+        await db.flush()
+        ride = Ride(rider_id=rider.id, status=RideStatus.REQUESTED, fare=12.5)
+        db.add_all([
+            ride,
+            DriverProfile(user_id=driver.id, stripe_account_id="acct_driver"),
+            DriverProfile(user_id=rival.id, stripe_account_id="acct_rival")
+        ])
+        await db.commit()
+        return ride.id, Principal.from_user(driver), Principal.from_user(rival)
+
+async def accept(sessions, ride_id: int, principal: Principal):
+    async with sessions() as db:
+        return await rides.accept_ride(ride_id, principal, db)
+
+async def load(sessions, ride_id: int) -> Ride:
+    async with sessions() as db:
+        return await db.get(Ride, ride_id)
+
+async def test_stripe_failure_leaves_the_ride_requested_for_a_retry(sessions, ride, monkeypatch):
+    ride_id, driver, _ = ride
+
+    def stripe_down(**kwargs):
+        raise Exception("Failed to create payment intent: connection error")
+
+    monkeypatch.setattr(StripeService, "create_payment_intent", stripe_down)
+    with pytest.raises(HTTPException) as failure:
+        await accept(sessions, ride_id, driver)
+    assert failure.value.status_code == 500
+    unchanged = await load(sessions, ride_id)
+    assert (unchanged.status, unchanged.driver_id, unchanged.version) == (RideStatus.REQUESTED, None, 0)
+
+    monkeypatch.setattr(StripeService, "create_payment_intent", lambda **kwargs: {"payment_intent_id": "pi_1", "client_secret": "s"})
+    await accept(sessions, ride_id, driver)
+    accepted = await load(sessions, ride_id)
+    assert (accepted.status, accepted.driver_id, accepted.payment_intent_id) == (RideStatus.ACCEPTED, driver.id, "pi_1")
+
+async def test_losing_the_claim_cancels_the_new_intent(sessions, ride, monkeypatch):
+    ride_id, driver, rival = ride
+    cancelled = []
+
+    def intent_for_account(**kwargs):
+        if kwargs["driver_account_id"] == "acct_driver":
+            return {"payment_intent_id": "pi_driver", "client_secret": "s"}
+        return {"payment_intent_id": "pi_rival", "client_secret": "s"}
+
+    monkeypatch.setattr(StripeService, "create_payment_intent", intent_for_account)
+    monkeypatch.setattr(StripeService, "cancel_payment_intent", cancelled.append)
+
+    # The rival claims the ride between the driver's intent and the driver's claim
+    original = rides.transition_ride
+
+    async def rival_first(db, ride_id, *args, **kwargs):
+        if kwargs.get("accepting_driver_id") == driver.id:
+            await accept(sessions, ride_id, rival)
+        return await original(db, ride_id, *args, **kwargs)
+
+    monkeypatch.setattr(rides, "transition_ride", rival_first)
+    with pytest.raises(HTTPException) as lost:
+        await accept(sessions, ride_id, driver)
+
+    assert lost.value.status_code == 409
+    assert cancelled == ["pi_driver"]
+    accepted = await load(sessions, ride_id)
+    assert (accepted.driver_id, accepted.payment_intent_id) == (rival.id, "pi_rival")
@@ -0,0 +1,55 @@
+"""Completing a ride captures its PaymentIntent in the same transaction"""
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from app.models import DriverProfile, Ride, RideStatus, User, UserRole
+from app.principal_cache import Principal
+from app.routes import rides
+from app.schemas import RideStatusUpdate
+from app.stripe_service import StripeService
+
+@pytest.fixture
+async def ride(sessions, monkeypatch):
+    """A STARTED ride with an authorized PaymentIntent; returns (ride_id, driver)"""
+    async def notify(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(rides, "notify_ride_status", notify)
+    async with sessions() as db:
+        rider = User(email="r@example.com", phone="1", role=UserRole.RIDER)
+        driver = User(email="d@example.com", phone="2", role=UserRole.DRIVER)
+        db.add_all([rider, driver])
+        await db.flush()
+        ride = Ride(rider_id=rider.id, driver_id=driver.id, status=RideStatus.STARTED, fare=12.5, payment_intent_id="pi_1")
+        db.add_all([ride, DriverProfile(user_id=driver.id, stripe_account_id="acct_driver")])
+        await db.commit()
+        return ride.id, Principal.from_user(driver)
+
+async def complete(sessions, ride_id: int, principal: Principal):
+    async with sessions() as db:
+        return await rides.update_ride_status(ride_id, RideStatusUpdate(status=RideStatus.COMPLETED), principal, db)
+
+async def load(sessions, ride_id: int):
+    """(ride status, rides counted toward its driver)"""
+    async with sessions() as db:
+        ride = await db.get(Ride, ride_id)
+        profile = await db.scalar(select(DriverProfile).where(DriverProfile.user_id == ride.driver_id))
+        return ride.status, profile.total_rides or 0
+
+async def test_capture_failure_leaves_the_ride_started_for_a_retry(sessions, ride, monkeypatch):
+    ride_id, driver = ride
+    captured = []
+
+    def stripe_down(payment_intent_id):
+        raise Exception("Failed to capture payment intent: connection error")
+
+    monkeypatch.setattr(StripeService, "capture_payment_intent", stripe_down)
+    with pytest.raises(HTTPException) as failure:
+        await complete(sessions, ride_id, driver)
+    assert failure.value.status_code == 500
+    assert await load(sessions, ride_id) == (RideStatus.STARTED, 0)
+
+    monkeypatch.setattr(StripeService, "capture_payment_intent", captured.append)
+    await complete(sessions, ride_id, driver)
+    assert captured == ["pi_1"]
+    assert await load(sessions, ride_id) == (RideStatus.COMPLETED, 1)
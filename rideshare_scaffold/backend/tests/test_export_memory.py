@@ -0,0 +1,20 @@
+"""Streaming export memory budget, enforced by running benchmarks/bench_export"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+@pytest.mark.slow
+@pytest.mark.skipif(not Path("/proc/self/status").exists(), reason="samples worker RSS from /proc")
+def test_five_million_row_export_stays_within_rss_budget(tmp_path):
+    # A scratch SQLite file, so the seeded rides never touch the suite's database
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'export.db'}", REDIS_URL="", PYTHONPATH=str(BACKEND))
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_export"],
+        cwd=BACKEND, env=env, capture_output=True, text=True, timeout=1800
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr[-2000:]
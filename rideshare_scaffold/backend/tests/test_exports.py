@@ -0,0 +1,20 @@
+"""Export routes release the request session before streaming"""
+from app.models import User, UserRole
+from app.principal_cache import Principal
+from app.routes.exports import get_export_principal
+
+async def test_auth_session_is_closed_before_the_stream(sessions):
+    async with sessions() as db:
+        user = User(email="r@example.com", phone="1", role=UserRole.RIDER)
+        db.add(user)
+        await db.commit()
+
+    pool = sessions.kw["bind"].pool
+    async with sessions() as db:
+        # What get_current_principal does on a principal cache miss
+        principal = Principal.from_user(await db.get(User, user.id))
+        assert db.in_transaction() and pool.checkedout() == 1
+
+        assert await get_export_principal(principal, db) == principal
+        assert not db.in_transaction()
+        assert pool.checkedout() == 0
@@ -0,0 +1,72 @@
+"""Ops heatmap published by one worker from the shared surge counters"""
+import pytest
+from app.heatmap import HeatmapPublisher
+from app.surge import RedisSurgeCounters, SurgeEngine
+
+SATHER_GATE = (37.8703, -122.2595)
+
+class Viewer:
+    """Collects the deltas one publisher emits"""
+
+    def __init__(self):
+        self.deltas = []
+
+    async def __call__(self, delta):
+        self.deltas.append(delta)
+
+@pytest.fixture
+async def workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    pair = []
+    for _ in range(2):
+        counters = RedisSurgeCounters("redis://unused")
+        counters.redis = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        engine = SurgeEngine(shared=counters)
+        viewer = Viewer()
+        pair.append((engine, HeatmapPublisher(engine, emit=viewer, interval=2), viewer))
+    yield pair
+    for engine, _, _ in pair:
+        await engine.shared.redis.aclose()
+
+async def open_ride(engine: SurgeEngine, ride_id: int) -> None:
+    engine.open_ride(ride_id, *SATHER_GATE)
+    while not engine._outbox.empty():
+        await engine.shared.apply(engine._outbox.get_nowait())
+
+async def test_only_the_lease_holder_publishes(workers):
+    (a, pub_a, seen_a), (b, pub_b, seen_b) = workers
+    await pub_a.tick()
+    await pub_b.tick()
+
+    await open_ride(b, 1)
+    await pub_a.tick()
+    await pub_b.tick()
+
+    assert seen_b.deltas == []
+    assert [cell["open_rides"] for cell in seen_a.deltas[-1]["cells"]] == [1]
+    assert (pub_a.leading, pub_b.leading) == (True, False)
+
+async def test_snapshot_from_any_worker_matches_the_published_sequence(workers):
+    (a, pub_a, seen_a), (b, pub_b, _) = workers
+    await open_ride(a, 1)
+    await pub_a.tick()
+
+    snapshot = await pub_b.snapshot()
+
+    assert snapshot["sequence"] == seen_a.deltas[-1]["sequence"]
+    assert [cell["open_rides"] for cell in snapshot["cells"]] == [1]
+
+async def test_new_publisher_leaves_a_gap_so_viewers_refetch(workers):
+    (a, pub_a, seen_a), (b, pub_b, seen_b) = workers
+    await open_ride(a, 1)
+    await pub_a.tick()
+    last = seen_a.deltas[-1]["sequence"]
+
+    # A stops renewing; B takes over once the lease lapses
+    await a.shared.redis.delete("valey:heatmap:publisher")
+    await open_ride(a, 2)
+    await pub_b.tick()
+
+    assert seen_b.deltas[0]["sequence"] == last + 2
+    assert [cell["open_rides"] for cell in seen_b.deltas[0]["cells"]] == [2]
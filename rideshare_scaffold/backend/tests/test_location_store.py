@@ -0,0 +1,62 @@
+"""LocationStore flush timing"""
+import asyncio
+import time
+from sqlalchemy import delete
+from app.location_store import LocationStore
+from app.models import DriverProfile, User, UserRole
+
+def fake_flush(store: LocationStore, flushed: list):
+    """Stand-in for the database flush that records which drivers it wrote and when"""
+    def flush() -> int:
+        with store._lock:
+            batch, store._pending, store._oldest_pending = store._pending, {}, None
+        flushed.append((time.monotonic(), sorted(batch)))
+        return len(batch)
+    return flush
+
+async def test_ping_is_flushed_at_max_staleness_not_the_interval():
+    store = LocationStore(flush_interval=30, max_staleness=0.05)
+    flushed = []
+    store.flush = fake_flush(store, flushed)
+    store.start()
+    await asyncio.sleep(0.01)
+
+    recorded = time.monotonic()
+    store.record(2, 37.87, -122.26)
+    await asyncio.sleep(0.3)
+    await store.stop()
+
+    assert [drivers for _, drivers in flushed if drivers] == [[2]]
+    assert flushed[0][0] - recorded < 0.25
+
+async def test_zero_settings_are_kept():
+    store = LocationStore(flush_interval=0, max_staleness=0)
+
+    assert (store.flush_interval, store.max_staleness) == (0, 0)
+
+async def test_zero_interval_does_not_spin_on_an_empty_buffer():
+    store = LocationStore(flush_interval=0, max_staleness=0)
+    flushed = []
+    store.flush = fake_flush(store, flushed)
+    store.start()
+    await asyncio.sleep(0.3)
+    await store.stop()
+
+    assert len(flushed) <= 0.3 / LocationStore.MIN_FLUSH_DELAY_SECONDS + 1
+
+async def test_profile_lookups_are_cached_once_found(sessions):
+    store = LocationStore()
+    async with sessions() as db:
+        driver = User(email="d@example.com", phone="1", role=UserRole.DRIVER)
+        db.add(driver)
+        await db.flush()
+        assert not await store.has_profile(db, driver.id)
+
+        db.add(DriverProfile(user_id=driver.id))
+        await db.commit()
+        assert await store.has_profile(db, driver.id)
+
+    async with sessions() as db:
+        await db.execute(delete(DriverProfile))
+        await db.commit()
+        assert await store.has_profile(db, driver.id)
@@ -0,0 +1,52 @@
+"""BatchMatcher falls back to direct offers only for rides it had not dispatched"""
+from app.matching import BatchMatcher
+
+def ride(ride_id: int, latitude: float) -> dict:
+    return {'ride_id': ride_id, 'pickup_latitude': latitude, 'pickup_longitude': -122.2595}
+
+async def run_window(matcher: BatchMatcher, rides) -> None:
+    for request in rides:
+        await matcher.submit(request)
+    await matcher._flush_task
+
+async def test_failure_mid_batch_only_re_offers_undispatched_rides():
+    matched, offered = [], []
+
+    async def candidates(latitude, longitude):
+        return [(7, 37.8703, -122.2595), (8, 37.8800, -122.2595)]
+
+    async def on_match(request, driver_id, distance_miles):
+        if matched:
+            raise RuntimeError("offer emit failed")
+        matched.append(request['ride_id'])
+
+    async def on_unmatched(request):
+        offered.append(request['ride_id'])
+
+    matcher = BatchMatcher(candidates, on_match, on_unmatched, window_seconds=0)
+    await run_window(matcher, [ride(1, 37.8703), ride(2, 37.8800), ride(3, 37.8900)])
+
+    # One ride was matched before the failure; only the other two fall back
+    assert len(matched) == 1
+    assert sorted(offered + matched) == [1, 2, 3]
+    assert matcher.metrics()["dispatch_errors"] == 1
+
+async def test_one_failing_fallback_does_not_stop_the_rest():
+    offered = []
+
+    async def candidates(latitude, longitude):
+        raise RuntimeError("presence unavailable")
+
+    async def on_match(request, driver_id, distance_miles):
+        pass
+
+    async def on_unmatched(request):
+        if request['ride_id'] == 1:
+            raise RuntimeError("emit failed")
+        offered.append(request['ride_id'])
+
+    matcher = BatchMatcher(candidates, on_match, on_unmatched, window_seconds=0)
+    await run_window(matcher, [ride(1, 37.8703), ride(2, 37.8800)])
+
+    assert offered == [2]
+    assert matcher.metrics()["dispatch_errors"] == 2
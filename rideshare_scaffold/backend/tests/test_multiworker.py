@@ -0,0 +1,117 @@
+"""Two socket_manager workers wired together the way REDIS_URL wires real ones
+
+Each worker is a separate copy of app.socket_manager with its own
+AsyncServer; the copies share one InMemoryPubSubManager channel and one
+InMemoryPresence, standing in for Redis. Clients are attached at the
+Socket.IO manager level and outgoing packets are captured per worker.
+"""
+import asyncio
+import importlib.util
+from pathlib import Path
+import pytest
+from socketio import packet
+from app.config import settings
+from app.presence import InMemoryPresence
+from app.pubsub import InMemoryPubSubManager
+from app.surge import SurgeEngine
+
+SOCKET_MANAGER = Path(__file__).resolve().parent.parent / "app" / "socket_manager.py"
+
+class Worker:
+    def __init__(self, name: str, presence: InMemoryPresence):
+        spec = importlib.util.spec_from_file_location(f"app._test_worker_{name}", SOCKET_MANAGER)
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+        self.module.presence = presence
+        self.sio = self.module.sio
+        self.sent = []  # (eio_sid, event, data)
+
+        # Direct emits go through _send_packet, room emits through _send_eio_packet
+        async def capture(eio_sid, pkt):
+            self.sent.append((eio_sid, pkt.data[0], pkt.data[1] if len(pkt.data) > 1 else None))
+
+        async def capture_encoded(eio_sid, eio_pkt):
+            await capture(eio_sid, packet.Packet(encoded_packet=eio_pkt.data))
+
+        self.sio._send_packet = capture
+        self.sio._send_eio_packet = capture_encoded
+
+    async def connect(self, eio_sid: str, user_id: int, role: str) -> str:
+        """Attach a client to this worker and authenticate it; returns its sid"""
+        await self.sio._handle_eio_connect(eio_sid, {})
+        sid = await self.sio.manager.connect(eio_sid, "/")
+        await self.module.authenticate(sid, {"user_id": user_id, "role": role})
+        return sid
+
+    def received(self, eio_sid: str, event: str) -> list:
+        return [data for to, name, data in self.sent if to == eio_sid and name == event]
+
+    async def stop(self) -> None:
+        thread = getattr(self.sio.manager, "thread", None)
+        if thread is not None:
+            thread.cancel()
+
+@pytest.fixture
+async def workers(monkeypatch):
+    monkeypatch.setattr(settings, "REDIS_URL", "memory://")
+    monkeypatch.setattr(InMemoryPubSubManager, "_channels", {})
+    presence = InMemoryPresence()
+    pair = Worker("a", presence), Worker("b", presence)
+    yield pair
+    for worker in pair:
+        await worker.stop()
+
+async def settle() -> None:
+    """Let the pub/sub listener tasks deliver what has been published"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+async def test_ride_event_from_worker_a_reaches_sid_on_worker_b(workers):
+    a, b = workers
+    await a.connect("eio-driver", user_id=2, role="driver")
+    await b.connect("eio-rider", user_id=1, role="rider")
+
+    # The rider's sid lives on B; A joins it to the ride room and emits there
+    await a.module.join_ride_room(7, 1)
+    await a.module.notify_ride_status(7, "started")
+    await settle()
+
+    assert b.received("eio-rider", "ride_status_update") == [{"ride_id": 7, "status": "started"}]
+    assert a.received("eio-rider", "ride_status_update") == []
+
+async def test_driver_registered_on_a_is_found_from_b(workers):
+    a, b = workers
+    sid = await a.connect("eio-driver", user_id=2, role="driver")
+    await a.module.driver_online(sid, {"user_id": 2, "latitude": 37.8719, "longitude": -122.2585})
+
+    nearby = await b.module.find_nearby_drivers(37.8703, -122.2595)
+
+    assert [driver_id for _, driver_id, _, _ in nearby] == [2]
+
+async def test_driver_disconnecting_from_a_drops_out_of_b(workers):
+    a, b = workers
+    sid = await a.connect("eio-driver", user_id=2, role="driver")
+    await a.module.driver_online(sid, {"user_id": 2, "latitude": 37.8719, "longitude": -122.2585})
+    assert await b.module.is_driver_online(2)
+
+    await a.module.disconnect(sid)
+
+    assert not await b.module.is_driver_online(2)
+    assert await b.module.find_nearby_drivers(37.8703, -122.2595) == []
+
+async def test_client_ride_events_leave_surge_and_presence_alone(workers, monkeypatch):
+    a, _ = workers
+    engine = SurgeEngine()
+    monkeypatch.setattr(a.module, "surge_engine", engine)
+    sid = await a.connect("eio-driver", user_id=2, role="driver")
+    await a.module.driver_online(sid, {"user_id": 2, "latitude": 37.8719, "longitude": -122.2585})
+    await a.module.presence.set_driver_ride(2, 7)
+    demand, supply = dict(engine.demand), dict(engine.supply)
+
+    # Unverified clients can relay notifications but not open, claim or finish rides
+    await a.module.request_ride(sid, {"ride_id": 99, "pickup_latitude": 37.8719, "pickup_longitude": -122.2585})
+    await a.module.accept_ride(sid, {"ride_id": 8, "driver_id": 2})
+    await a.module.update_ride_status(sid, {"ride_id": 7, "status": "completed", "driver_id": 2})
+
+    assert (engine.demand, engine.supply) == (demand, supply)
+    assert await a.module.presence.get_driver_ride(2) == 7
@@ -0,0 +1,83 @@
+"""RedisPresence against fakeredis: atomic moves, TTLs and the heartbeat"""
+import pytest
+from app.presence import InMemoryPresence, PresenceHeartbeat, RedisPresence
+
+fakeredis = pytest.importorskip("fakeredis")
+
+BERKELEY = (37.8719, -122.2585)
+
+@pytest.fixture
+async def store():
+    presence = RedisPresence("redis://unused", ttl=60)
+    presence.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    yield presence
+    await presence.redis.aclose()
+
+async def test_update_after_remove_does_not_bring_the_driver_back(store):
+    await store.set_driver_online(2, "sid-a", *BERKELEY)
+    await store.remove_driver(2)
+
+    assert not await store.update_driver_position(2, 37.87, -122.26)
+    assert await store.get_driver(2) is None
+    assert await store.nearest_drivers(*BERKELEY, k=5, radius_miles=5) == []
+
+async def test_update_moves_the_driver_and_renews_its_ttl(store):
+    await store.set_driver_online(2, "sid-a", *BERKELEY)
+    await store.redis.expire("valey:driver:2", 5)
+
+    assert await store.update_driver_position(2, 37.8703, -122.2595)
+
+    driver = await store.get_driver(2)
+    assert (driver["sid"], driver["latitude"], driver["longitude"]) == ("sid-a", 37.8703, -122.2595)
+    assert await store.redis.ttl("valey:driver:2") > 5
+
+async def test_remove_with_a_stale_sid_keeps_the_newer_connection(store):
+    await store.set_driver_online(2, "sid-new", *BERKELEY)
+
+    assert not await store.remove_driver(2, sid="sid-old")
+    assert await store.get_driver(2) is not None
+
+async def test_expired_driver_is_dropped_from_lookups(store):
+    await store.set_driver_online(2, "sid-a", *BERKELEY)
+    await store.set_driver_online(3, "sid-b", 37.8703, -122.2595)
+
+    # What the TTL does when the worker holding driver 2 stops beating
+    await store.redis.delete("valey:driver:2")
+
+    nearby = await store.nearest_drivers(*BERKELEY, k=1, radius_miles=5)
+    assert [driver_id for _, driver_id, _, _ in nearby] == [3]
+    assert [driver["sid"] for driver in await store.online_drivers()] == ["sid-b"]
+    assert await store.redis.smembers("valey:drivers") == {"3"}
+
+async def test_heartbeat_refreshes_this_workers_connections(store):
+    await store.set_driver_online(2, "sid-a", *BERKELEY)
+    await store.add_user_sid(2, "sid-a")
+    await store.redis.expire("valey:driver:2", 5)
+    await store.redis.expire("valey:user_sids:2", 5)
+    heartbeat = PresenceHeartbeat(store, lambda: [{"user_id": 2, "role": "driver"}])
+
+    await heartbeat.beat()
+
+    assert await store.redis.ttl("valey:driver:2") > 5
+    assert await store.redis.ttl("valey:user_sids:2") > 5
+    assert heartbeat.metrics()["beats"] == 1
+
+async def check_busy_drivers_are_skipped(store) -> None:
+    # Drivers 2-4 are closest but busy; driver 5 is further out and idle
+    for driver_id in (2, 3, 4):
+        await store.set_driver_online(driver_id, f"sid-{driver_id}", *BERKELEY)
+        await store.set_driver_ride(driver_id, 10 + driver_id)
+    await store.set_driver_online(5, "sid-5", 37.8703, -122.2595)
+
+    nearby = await store.nearest_drivers(*BERKELEY, k=1, radius_miles=5)
+    assert [driver_id for _, driver_id, _, _ in nearby] == [5]
+
+    await store.clear_driver_ride(2, 12)
+    nearby = await store.nearest_drivers(*BERKELEY, k=2, radius_miles=5)
+    assert [driver_id for _, driver_id, _, _ in nearby] == [2, 5]
+
+async def test_drivers_on_a_ride_do_not_fill_the_nearest_slots(store):
+    await check_busy_drivers_are_skipped(store)
+
+async def test_in_memory_lookups_skip_drivers_on_a_ride_too():
+    await check_busy_drivers_are_skipped(InMemoryPresence())
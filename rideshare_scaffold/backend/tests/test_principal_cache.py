@@ -0,0 +1,52 @@
+"""PrincipalCache expiry and invalidation on committed User changes"""
+from sqlalchemy import select
+from app import principal_cache as cache_module
+from app.models import User, UserRole
+from app.principal_cache import Principal, PrincipalCache, principal_cache
+
+async def add_user(sessions) -> User:
+    async with sessions() as db:
+        user = User(email="u@example.com", phone="1", role=UserRole.RIDER)
+        db.add(user)
+        await db.commit()
+        return user
+
+async def test_role_change_drops_the_cached_principal_on_commit(sessions):
+    user = await add_user(sessions)
+    principal_cache.put("token", Principal.from_user(user), None)
+
+    async with sessions() as db:
+        row = await db.scalar(select(User).where(User.id == user.id))
+        row.role = UserRole.DRIVER
+        await db.flush()
+        # Not committed yet: the old role is still what the database serves
+        assert principal_cache.get("token") is not None
+        await db.commit()
+
+    assert principal_cache.get("token") is None
+
+async def test_rolled_back_change_keeps_the_cached_principal(sessions):
+    user = await add_user(sessions)
+    principal_cache.put("token", Principal.from_user(user), None)
+
+    async with sessions() as db:
+        row = await db.scalar(select(User).where(User.id == user.id))
+        row.role = UserRole.DRIVER
+        await db.flush()
+        await db.rollback()
+
+    assert principal_cache.get("token") == Principal.from_user(user)
+    principal_cache.clear()
+
+def test_entry_expires_at_the_token_exp(monkeypatch):
+    cache = PrincipalCache(max_entries=10, ttl=3600)
+    principal = Principal(id=1, role=UserRole.RIDER, is_verified=True)
+    now = 1_000_000.0
+    monkeypatch.setattr(cache_module.time, "time", lambda: now)
+    cache.put("token", principal, token_expires_at=now + 30)
+
+    now += 29.9
+    assert cache.get("token") == principal
+    now += 0.1
+    assert cache.get("token") is None
+    assert cache.metrics()["expired"] == 1
@@ -0,0 +1,51 @@
+"""RAGService builds its langchain/OpenAI pieces on first use, never at import"""
+import importlib
+import sys
+import types
+import pytest
+
+LAZY = ["openai", "langchain", "langchain.embeddings", "langchain.text_splitter"]
+
+@pytest.fixture
+def built(monkeypatch):
+    """Stub the SDKs in sys.modules; returns the names of the stub classes constructed"""
+    built = []
+
+    def stub_class(name):
+        return type(name, (), {"__init__": lambda self, **kwargs: built.append(name)})
+
+    modules = {name: types.ModuleType(name) for name in LAZY}
+    modules["langchain.embeddings"].OpenAIEmbeddings = stub_class("OpenAIEmbeddings")
+    modules["langchain.text_splitter"].RecursiveCharacterTextSplitter = stub_class("RecursiveCharacterTextSplitter")
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    return built
+
+def test_importing_the_service_needs_no_sdk(monkeypatch):
+    # None in sys.modules makes any import of these raise ImportError
+    for name in LAZY:
+        monkeypatch.setitem(sys.modules, name, None)
+    for name in ("app.ai.rag", "app.routes.ai"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+
+    rag = importlib.import_module("app.ai.rag")
+    importlib.import_module("app.routes.ai")
+
+    with pytest.raises(ImportError):
+        rag.RAGService().embeddings
+
+def test_embeddings_are_built_once_on_first_use(built):
+    from app.ai.rag import RAGService
+
+    service = RAGService()
+    assert built == []
+
+    assert service.embeddings is service.embeddings
+    assert built == ["OpenAIEmbeddings"]
+
+def test_text_splitter_is_built_once_on_first_use(built):
+    from app.ai.rag import RAGService
+
+    service = RAGService()
+    assert service.text_splitter is service.text_splitter
+    assert built == ["RecursiveCharacterTextSplitter"]
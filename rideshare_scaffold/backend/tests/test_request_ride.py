@@ -0,0 +1,32 @@
+"""request_ride charges the fare /rides/quote showed"""
+from app.models import User, UserRole
+from app.principal_cache import Principal
+from app.routes import rides
+from app.schemas import RideRequest
+
+async def test_requested_fare_matches_the_quote(sessions, monkeypatch):
+    async def dispatch(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(rides, "join_ride_room", dispatch)
+    monkeypatch.setattr(rides, "offer_ride", dispatch)
+    async with sessions() as db:
+        rider = User(email="r@example.com", phone="1", role=UserRole.RIDER)
+        db.add(rider)
+        await db.commit()
+        principal = Principal.from_user(rider)
+
+    # Off the quote cache's cell centers, where an exact recompute would differ
+    request = RideRequest(
+        pickup_address="Sather Gate",
+        pickup_latitude=37.87034,
+        pickup_longitude=-122.25953,
+        dropoff_address="Rockridge BART",
+        dropoff_latitude=37.84468,
+        dropoff_longitude=-122.25141
+    )
+    quote = await rides.get_ride_quote(request, principal)
+    async with sessions() as db:
+        ride = await rides.request_ride(request, principal, db)
+
+    assert ride.fare == quote.fare
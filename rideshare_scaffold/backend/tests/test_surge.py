@@ -0,0 +1,110 @@
+"""SurgeEngine counters: shared across workers through Redis, and rebuilt at startup"""
+from datetime import datetime, timedelta, timezone
+import pytest
+from app import database
+from app.models import DriverProfile, Ride, RideStatus, User, UserRole
+from app.surge import RedisSurgeCounters, SurgeEngine
+
+SATHER_GATE = (37.8703, -122.2595)
+CELL = (3787, -12226)
+
+async def flush(engine: SurgeEngine) -> None:
+    """Apply the events a worker has queued, as its writer task would"""
+    while not engine._outbox.empty():
+        await engine.shared.apply(engine._outbox.get_nowait())
+
+@pytest.fixture
+async def workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    pair = []
+    for _ in range(2):
+        counters = RedisSurgeCounters("redis://unused")
+        counters.redis = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        pair.append(SurgeEngine(interval=10, smoothing=1.0, sensitivity=1.0, shared=counters))
+    yield pair
+    for engine in pair:
+        await engine.shared.redis.aclose()
+
+async def test_ride_opened_on_one_worker_drains_when_closed_on_another(workers):
+    a, b = workers
+    a.open_ride(1, *SATHER_GATE)
+    a.open_ride(2, *SATHER_GATE)
+    await flush(a)
+    b.close_ride(1)
+    await flush(b)
+
+    await a.sync()
+    await b.sync()
+
+    assert a.demand == b.demand == {CELL: 1}
+
+async def test_workers_publish_the_same_multipliers(workers):
+    a, b = workers
+    a.open_ride(1, *SATHER_GATE)
+    a.open_ride(2, *SATHER_GATE)
+    b.driver_online(9, *SATHER_GATE)
+    await flush(a)
+    await flush(b)
+
+    await a.sync()
+    await b.sync()
+
+    assert a.multipliers == b.multipliers == {CELL: 2.0}
+    assert a.supply == b.supply == {CELL: 1}
+
+async def test_driver_busy_on_another_worker_leaves_supply(workers):
+    a, b = workers
+    a.driver_online(9, *SATHER_GATE)
+    await flush(a)
+    b.driver_busy(9)
+    await flush(b)
+
+    await a.sync()
+
+    assert a.supply == {}
+
+async def test_sync_drops_rides_and_drivers_closed_on_another_worker(workers):
+    a, b = workers
+    a.open_ride(1, *SATHER_GATE)
+    a.open_ride(2, *SATHER_GATE)
+    a.driver_online(8, *SATHER_GATE)
+    a.driver_online(9, *SATHER_GATE)
+    await flush(a)
+    b.close_ride(1)
+    b.driver_offline(8)
+    b.driver_busy(9)
+    await flush(b)
+
+    await a.sync()
+
+    assert a._ride_cells == {2: CELL}
+    assert a._drivers == {9: (CELL, False)}
+
+async def test_rebuild_counts_recent_requested_rides_and_idle_online_drivers(sessions, monkeypatch):
+    async with sessions() as db:
+        rider = User(email="r@example.com", phone="1", role=UserRole.RIDER)
+        idle = User(email="i@example.com", phone="2", role=UserRole.DRIVER)
+        busy = User(email="b@example.com", phone="3", role=UserRole.DRIVER)
+        db.add_all([rider, idle, busy])
+        await db.flush()
+        db.add_all([
+            DriverProfile(user_id=idle.id, is_online=True, current_latitude=SATHER_GATE[0], current_longitude=SATHER_GATE[1]),
+            DriverProfile(user_id=busy.id, is_online=True, current_latitude=SATHER_GATE[0], current_longitude=SATHER_GATE[1]),
+            Ride(rider_id=rider.id, status=RideStatus.REQUESTED, pickup_latitude=SATHER_GATE[0], pickup_longitude=SATHER_GATE[1]),
+            Ride(rider_id=rider.id, status=RideStatus.REQUESTED, pickup_latitude=SATHER_GATE[0], pickup_longitude=SATHER_GATE[1]),
+            Ride(rider_id=rider.id, driver_id=busy.id, status=RideStatus.STARTED, pickup_latitude=SATHER_GATE[0], pickup_longitude=SATHER_GATE[1]),
+            Ride(rider_id=rider.id, status=RideStatus.CANCELLED, pickup_latitude=SATHER_GATE[0], pickup_longitude=SATHER_GATE[1]),
+            # Requested yesterday and never accepted or cancelled
+            Ride(rider_id=rider.id, status=RideStatus.REQUESTED, pickup_latitude=SATHER_GATE[0], pickup_longitude=SATHER_GATE[1],
+                 created_at=datetime.now(timezone.utc) - timedelta(days=1))
+        ])
+        await db.commit()
+    monkeypatch.setattr(database, "AsyncSessionLocal", sessions)
+    engine = SurgeEngine()
+
+    await engine.rebuild_from_database()
+    engine.driver_idle(busy.id)
+
+    assert engine.demand == {CELL: 2}
+    assert engine.supply == {CELL: 2}
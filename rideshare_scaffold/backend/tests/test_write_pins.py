@@ -0,0 +1,66 @@
+"""Read-your-writes routing over a primary and a replica, each its own SQLite file"""
+import pytest
+from app import auth, database
+from app.config import settings
+from app.models import User, UserRole
+from app.principal_cache import Principal
+from app.write_pins import InMemoryWritePins, RedisWritePins
+from conftest import sqlite_sessions
+
+@pytest.fixture
+async def databases(tmp_path, monkeypatch):
+    """(primary, replica) session factories; the replica never sees the primary's writes"""
+    primary_engine, primary = await sqlite_sessions(tmp_path / "primary.db")
+    replica_engine, replica = await sqlite_sessions(tmp_path / "replica.db")
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URL", f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(auth, "ReplicaSessionLocal", replica)
+    yield primary, replica
+    await primary_engine.dispose()
+    await replica_engine.dispose()
+
+def use_pins(monkeypatch, pins) -> None:
+    monkeypatch.setattr(database, "write_pins", pins)
+    monkeypatch.setattr(auth, "write_pins", pins)
+
+async def write_user(primary, email: str) -> Principal:
+    async with primary() as db:
+        user = User(email=email, phone=email, role=UserRole.RIDER)
+        db.add(user)
+        await db.flush()
+        db.info["user_id"] = user.id
+        await db.commit()
+        return Principal.from_user(user)
+
+async def sees(principal: Principal, primary, email: str) -> bool:
+    """Whether the session get_read_db hands this principal can see the user row"""
+    async with primary() as db:
+        reads = auth.get_read_db(principal, db)
+        session = await reads.__anext__()
+        found = await session.scalar(User.__table__.select().where(User.email == email)) is not None
+        await reads.aclose()
+        return found
+
+async def test_writer_reads_from_primary_and_others_from_replica(databases, monkeypatch):
+    primary, _ = databases
+    pins = InMemoryWritePins(seconds=60)
+    use_pins(monkeypatch, pins)
+
+    writer = await write_user(primary, "w@example.com")
+    other = Principal(id=writer.id + 1, role=UserRole.RIDER, is_verified=False)
+
+    assert await sees(writer, primary, "w@example.com")
+    assert not await sees(other, primary, "w@example.com")
+    assert pins.metrics()["pinned_reads"] == 1
+
+async def test_commit_survives_an_unreachable_pin_store(databases, monkeypatch):
+    primary, _ = databases
+    pins = RedisWritePins("redis://127.0.0.1:1/0", seconds=60)
+    use_pins(monkeypatch, pins)
+
+    writer = await write_user(primary, "w@example.com")
+
+    assert pins.metrics()["pin_failures"] == 1
+    assert pins.metrics()["pins"] == 0
+    # The write is committed, and with the pin store down reads stay on the primary
+    assert await sees(writer, primary, "w@example.com")
+    await pins.redis.aclose()